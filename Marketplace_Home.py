@@ -1,6 +1,11 @@
+import math
 import streamlit as st
-import json
-from google_ai_services import translate_text # Import the translation function
+from catalog import get_catalog, PRICE_BUCKETS, SORT_OPTIONS, DEFAULT_PAGE_SIZE
+from page_flows import search_results, recommendations_for, localized, prefetch_page_translations
+from google_ai_services import translate_text, prefetch_translations # Live translation for user content
+from i18n import ui_text # Compiled catalog for static UI strings
+from image_store import thumbnail_path
+import render_profiler
 
 # --- Page Configuration ---
 st.set_page_config(
@@ -9,77 +14,121 @@ st.set_page_config(
     layout="wide"
 )
 
-# --- Database Function ---
-def load_db():
-    try:
-        with open('database.json', 'r') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return {}
-
-# --- Language Selection & State Management ---
-st.sidebar.header(translate_text("Language Selection", st.session_state.get('language', 'en')))
-languages = {"English": "en", "Hindi": "hi", "Gujarati": "gu"}
-selected_lang_name = st.sidebar.selectbox(
-    translate_text("Choose a language:", st.session_state.get('language', 'en')),
-    languages.keys()
-)
+# Opt-in timing of this rerun (RENDER_PROFILE=all, or ?profile=1); see the admin metrics page
+with render_profiler.page_run("Marketplace_Home", st.query_params):
+    # --- Language Selection & State Management ---
+    st.sidebar.header(ui_text("Language Selection", st.session_state.get('language', 'en')))
+    languages = {"English": "en", "Hindi": "hi", "Gujarati": "gu"}
+    selected_lang_name = st.sidebar.selectbox(
+        ui_text("Choose a language:", st.session_state.get('language', 'en')),
+        languages.keys()
+    )
+
+    # Store the chosen language code (e.g., 'hi') in the session state
+    if 'language' not in st.session_state or st.session_state['language'] != languages[selected_lang_name]:
+        st.session_state['language'] = languages[selected_lang_name]
+        st.rerun() # Rerun the app to apply the new language
+
+    # Get the current language for this run
+    lang = st.session_state.get('language', 'en')
+
+    # --- Main Page Content ---
+    st.title(ui_text("KalaKriti AI Marketplace", lang))
+    st.markdown(ui_text("Discover unique, handcrafted treasures from the heart of India.", lang))
+
+    # Shared, incrementally refreshed view of every listing (with artisan info attached)
+    with render_profiler.section("catalog"):
+        catalog = get_catalog()
+
+    # --- Search and Filter ---
+    search_query = st.text_input(ui_text("Search for a craft or product", lang), "")
+
+    with render_profiler.section("filters"), st.sidebar:
+        st.header(ui_text("Filters", lang))
+        craft_counts = catalog.facet_counts("craft_type")
+        # Craft names are entered by artisans, so they are translated live (in one cached batch)
+        if lang != 'en':
+            prefetch_translations(list(craft_counts), lang)
+        selected_crafts = st.multiselect(
+            ui_text("Craft", lang), list(craft_counts),
+            format_func=lambda c: f"{translate_text(c, lang) if lang != 'en' else c} ({craft_counts[c]})"
+        )
+        bucket_counts = catalog.facet_counts("price_bucket")
+        bucket_labels = [label for label, _, _ in PRICE_BUCKETS if label in bucket_counts]
+        # Options stay the English labels the catalog filters on; only their display is translated
+        selected_buckets = st.multiselect(
+            ui_text("Price", lang), bucket_labels,
+            format_func=lambda b: f"{ui_text(b, lang)} ({bucket_counts[b]})"
+        )
+        artisan_counts = catalog.facet_counts("artisan")
+        selected_artisans = st.multiselect(
+            ui_text("Artisan", lang), list(artisan_counts),
+            format_func=lambda a: f"{a} ({artisan_counts[a]})"
+        )
+        sort_by = st.selectbox(ui_text("Sort by", lang), SORT_OPTIONS, format_func=lambda option: ui_text(option, lang))
+
+    result_ids = search_results(
+        catalog, search_query,
+        craft_types=selected_crafts,
+        price_buckets=selected_buckets,
+        artisans=selected_artisans,
+        sort=sort_by,
+    )
+
+    # --- Pagination ---
+    # Only one page of listings is rendered (and translated) per rerun
+    page_count = max(1, math.ceil(len(result_ids) / DEFAULT_PAGE_SIZE))
+    page_number = 1
+    if page_count > 1:
+        page_number = st.number_input(
+            ui_text("Page", lang), min_value=1, max_value=page_count, value=1, step=1
+        )
+        st.caption(f"{len(result_ids)} · {page_number} / {page_count}")
+    with render_profiler.section("query"):
+        all_products = catalog.page(result_ids, page_number)
+
+    recommendations = recommendations_for(catalog, all_products, k=3)
+
+    # --- Batch Translation ---
+    # Gather every user-generated string this page of results needs and translate them in
+    # a few batched, de-duplicated requests; the localized() calls below then hit the cache.
+    # (Static labels come from the compiled i18n catalog and need no API calls.)
+    prefetch_page_translations(all_products, recommendations, lang)
+
+    # --- Display Products ---
+    with render_profiler.section("render"):
+        if not all_products:
+            st.info(ui_text("No products found. Artisans, please log in to add your creations!", lang))
+        else:
+            # Create a grid of 3 columns
+            cols = st.columns(3)
+            for i, product in enumerate(all_products):
+                col = cols[i % 3]
+                with col:
+                    with st.container(border=True):
+                        # Display product details, translating each piece of text
+                        st.subheader(localized(product, 'name', lang))
+                        st.caption(f"{ui_text('by', lang)} {localized(product, 'artisan_name', lang)}")
+
+                        # Small pre-computed WebP thumbnail from the local image store
+                        thumbnail = thumbnail_path(product['image_hash']) if product.get('image_hash') else None
+                        if thumbnail:
+                            st.image(thumbnail, width="stretch")
+                        st.info(f"{ui_text('Price', lang)}: ₹{product['price']:.2f}")
+
+                        with st.expander(ui_text("View Details & Artisan's Story", lang)):
+                            st.markdown(f"**{ui_text('About this item:', lang)}**")
+                            st.write(localized(product, 'description_story', lang, 'No description available.'))
+
+                            st.markdown(f"**{ui_text('Features:', lang)}**")
+                            st.write(localized(product, 'description_bullets', lang))
+
+                            st.divider()
+                            st.markdown(f"**{ui_text('The Story of', lang)} {localized(product, 'artisan_name', lang)}**")
+                            st.write(localized(product, 'artisan_story', lang))
 
-# Store the chosen language code (e.g., 'hi') in the session state
-if 'language' not in st.session_state or st.session_state['language'] != languages[selected_lang_name]:
-    st.session_state['language'] = languages[selected_lang_name]
-    st.rerun() # Rerun the app to apply the new language
-
-# Get the current language for this run
-lang = st.session_state.get('language', 'en')
-
-# --- Main Page Content ---
-st.title(translate_text("KalaKriti AI Marketplace", lang))
-st.markdown(translate_text("Discover unique, handcrafted treasures from the heart of India.", lang))
-
-db = load_db()
-all_products = []
-
-# Aggregate all products from all artisans
-for username, data in db.items():
-    if "products" in data:
-        for product_id, product_details in data["products"].items():
-            # Attach artisan info to each product for easy access
-            product_details['artisan_name'] = data.get('name', username)
-            product_details['artisan_story'] = data.get('art_description', 'No story provided.')
-            product_details['product_id'] = product_id
-            all_products.append(product_details)
-
-# --- Search and Filter ---
-search_query = st.text_input(translate_text("Search for a craft or product", lang), "")
-if search_query:
-    all_products = [p for p in all_products if search_query.lower() in p['name'].lower() or search_query.lower() in p.get('craft_type', '').lower()]
-
-# --- Display Products ---
-if not all_products:
-    st.info(translate_text("No products found. Artisans, please log in to add your creations!", lang))
-else:
-    # Create a grid of 3 columns
-    cols = st.columns(3)
-    for i, product in enumerate(all_products):
-        col = cols[i % 3]
-        with col:
-            with st.container(border=True):
-                # Display product details, translating each piece of text
-                st.subheader(translate_text(product['name'], lang))
-                st.caption(f"{translate_text('by', lang)} {translate_text(product['artisan_name'], lang)}")
-                
-                # In a real app, you would display an image here:
-                # st.image(product['image_url']) 
-                st.info(f"{translate_text('Price', lang)}: ₹{product['price']:.2f}")
-
-                with st.expander(translate_text("View Details & Artisan's Story", lang)):
-                    st.markdown(f"**{translate_text('About this item:', lang)}**")
-                    st.write(translate_text(product.get('description_story', 'No description available.'), lang))
-                    
-                    st.markdown(f"**{translate_text('Features:', lang)}**")
-                    st.write(translate_text(product.get('description_bullets', ''), lang))
-                    
-                    st.divider()
-                    st.markdown(f"**{translate_text('The Story of', lang)} {translate_text(product['artisan_name'], lang)}**")
-                    st.write(translate_text(product['artisan_story'], lang))
\ No newline at end of file
+                            if recommendations[product['product_id']]:
+                                st.divider()
+                                st.markdown(f"**{ui_text('You may also like', lang)}**")
+                                for other in recommendations[product['product_id']]:
+                                    st.write(f"{localized(other, 'name', lang)} · ₹{other['price']:.2f}")
@@ -0,0 +1,242 @@
+import os
+import time
+import random
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import metrics
+import render_profiler
+
+# --- Shared execution layer for every AI provider call ---
+# All Gemini, Translate and DALL-E requests go through here so that, across
+# every Streamlit session in the process, each provider gets:
+#   - a concurrency limit (semaphore) and its own worker pool, so a backlog
+#     for one provider never holds up calls to the others
+#   - a token-bucket rate limit matched to its quota
+#   - jittered exponential backoff on 429 / 5xx responses
+#   - a per-call deadline (checked between chunks for streaming calls)
+#   - single-flight coalescing of identical in-flight requests
+
+
+def _env_number(name, default):
+    return float(os.getenv(name, default))
+
+
+# Per-provider limits. Override with e.g. GEMINI_MAX_CONCURRENCY, GEMINI_RATE_PER_MINUTE.
+PROVIDER_LIMITS = {
+    "gemini": {
+        "max_concurrency": int(_env_number("GEMINI_MAX_CONCURRENCY", 4)),
+        "rate_per_minute": _env_number("GEMINI_RATE_PER_MINUTE", 60),
+        "deadline_seconds": _env_number("GEMINI_DEADLINE_SECONDS", 60),
+    },
+    "translate": {
+        "max_concurrency": int(_env_number("TRANSLATE_MAX_CONCURRENCY", 8)),
+        "rate_per_minute": _env_number("TRANSLATE_RATE_PER_MINUTE", 600),
+        "deadline_seconds": _env_number("TRANSLATE_DEADLINE_SECONDS", 15),
+    },
+    "openai": {
+        "max_concurrency": int(_env_number("OPENAI_MAX_CONCURRENCY", 2)),
+        "rate_per_minute": _env_number("OPENAI_RATE_PER_MINUTE", 5),
+        "deadline_seconds": _env_number("OPENAI_DEADLINE_SECONDS", 120),
+    },
+}
+
+MAX_RETRIES = int(_env_number("AI_MAX_RETRIES", 3))
+BACKOFF_BASE_SECONDS = _env_number("AI_BACKOFF_BASE_SECONDS", 1.0)
+BACKOFF_MAX_SECONDS = _env_number("AI_BACKOFF_MAX_SECONDS", 20.0)
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+# Exception class names used by google-api-core and openai for throttling / server errors
+RETRYABLE_ERROR_NAMES = {
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "InternalServerError",
+    "DeadlineExceeded", "BadGateway", "GatewayTimeout", "RateLimitError", "APITimeoutError",
+    "APIConnectionError",
+}
+
+
+class AICallTimeout(TimeoutError):
+    """Raised when a provider call does not finish before its deadline."""
+
+
+# --- Section 1: Rate Limiting ---
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, bursts of up to `capacity`."""
+
+    def __init__(self, rate_per_second, capacity):
+        self.rate = rate_per_second
+        self.capacity = max(capacity, 1)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline=None):
+        """Blocks until a token is available. Returns False if the deadline passes first."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class _Provider:
+    def __init__(self, name, max_concurrency, rate_per_minute, deadline_seconds):
+        self.name = name
+        self.semaphore = threading.BoundedSemaphore(max_concurrency)
+        rate = rate_per_minute / 60.0
+        # Allow a short burst (a few seconds' worth) without exceeding the per-minute quota
+        self.bucket = TokenBucket(rate, capacity=max(1, min(max_concurrency, rate * 5)))
+        self.deadline_seconds = deadline_seconds
+        # One worker per slot: queued calls wait in the pool's queue, not in a thread blocked on the semaphore
+        self.executor = ThreadPoolExecutor(max_workers=max(1, max_concurrency), thread_name_prefix=f"ai-{name}")
+
+
+_providers = {name: _Provider(name, **limits) for name, limits in PROVIDER_LIMITS.items()}
+
+
+def _provider(name):
+    if name not in _providers:
+        raise ValueError(f"Unknown AI provider: {name}")
+    return _providers[name]
+
+
+# --- Section 2: Retries ---
+
+def is_retryable(error):
+    """True for throttling (429) and server-side (5xx) errors."""
+    for attribute in ("code", "status_code", "http_status"):
+        status = getattr(error, attribute, None)
+        if isinstance(status, int) and status in RETRYABLE_STATUS_CODES:
+            return True
+    return type(error).__name__ in RETRYABLE_ERROR_NAMES
+
+
+def backoff_delay(attempt):
+    """Full-jitter exponential backoff: a random delay up to base * 2^attempt (capped)."""
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt)))
+
+
+@contextmanager
+def provider_slot(provider, deadline=None):
+    """Holds one concurrency slot and one rate-limit token for the provider.
+
+    Used by stream_ai_call for streaming calls, which must be consumed in the caller's thread.
+    """
+    p = _provider(provider)
+    timeout = None if deadline is None else max(0, deadline - time.monotonic())
+    with render_profiler.span(f"{provider}.queue", render_profiler.AI):
+        acquired = p.semaphore.acquire(timeout=timeout)
+    if not acquired:
+        raise AICallTimeout(f"{provider}: timed out waiting for a free slot")
+    try:
+        with render_profiler.span(f"{provider}.rate_limit", render_profiler.AI):
+            allowed = p.bucket.acquire(deadline)
+        if not allowed:
+            raise AICallTimeout(f"{provider}: rate limit would exceed the deadline")
+        metrics.inc("kalakriti_provider_attempts_total", provider=provider)
+        yield
+    finally:
+        p.semaphore.release()
+
+
+def call_with_retries(provider, fn, *args, deadline=None, **kwargs):
+    """Runs fn in the current thread with the provider's limits, retrying 429/5xx errors."""
+    attempt = 0
+    while True:
+        try:
+            with provider_slot(provider, deadline):
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    metrics.observe("kalakriti_provider_request_seconds", time.perf_counter() - start, provider=provider)
+        except AICallTimeout:
+            metrics.inc("kalakriti_provider_errors_total", provider=provider, error="AICallTimeout")
+            raise
+        except Exception as e:
+            metrics.inc("kalakriti_provider_errors_total", provider=provider, error=type(e).__name__)
+            if attempt >= MAX_RETRIES or not is_retryable(e):
+                raise
+            delay = backoff_delay(attempt)
+            if deadline is not None and time.monotonic() + delay > deadline:
+                raise
+            print(f"{provider} call failed ({type(e).__name__}), retrying in {delay:.1f}s")
+            metrics.inc("kalakriti_provider_retries_total", provider=provider)
+            time.sleep(delay)
+            attempt += 1
+
+
+def stream_ai_call(provider, fn, *args, deadline_seconds=None, **kwargs):
+    """Yields the chunks of a streaming provider call, read in the caller's thread.
+
+    The stream holds a provider slot until it ends. The deadline covers the
+    whole stream and is checked as each chunk arrives, so a stream still
+    running past it raises AICallTimeout instead of holding the slot on.
+    """
+    deadline_seconds = deadline_seconds or _provider(provider).deadline_seconds
+    deadline = time.monotonic() + deadline_seconds
+    try:
+        with provider_slot(provider, deadline):
+            for chunk in fn(*args, **kwargs):
+                if time.monotonic() > deadline:
+                    raise AICallTimeout(f"{provider}: stream did not finish within {deadline_seconds:g}s")
+                yield chunk
+    except AICallTimeout:
+        metrics.inc("kalakriti_provider_errors_total", provider=provider, error="AICallTimeout")
+        raise
+
+
+# --- Section 3: Executor with Deadlines & Single-Flight ---
+
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+
+def submit_ai_call(provider, fn, *args, key=None, deadline_seconds=None, **kwargs):
+    """Schedules a provider call on the provider's pool and returns its Future.
+
+    Calls submitted with the same key while one is already running share that
+    call's Future instead of making a second upstream request.
+    """
+    deadline_seconds = deadline_seconds or _provider(provider).deadline_seconds
+    deadline = time.monotonic() + deadline_seconds
+    flight_key = (provider, key) if key is not None else None
+
+    with _in_flight_lock:
+        if flight_key is not None and flight_key in _in_flight:
+            return _in_flight[flight_key]
+        future = _provider(provider).executor.submit(call_with_retries, provider, fn, *args, deadline=deadline, **kwargs)
+        if flight_key is not None:
+            _in_flight[flight_key] = future
+
+    if flight_key is not None:
+        def _forget(_):
+            with _in_flight_lock:
+                if _in_flight.get(flight_key) is future:
+                    del _in_flight[flight_key]
+        future.add_done_callback(_forget)
+    return future
+
+
+def run_ai_call(provider, fn, *args, key=None, deadline_seconds=None, **kwargs):
+    """Runs a provider call through the shared layer and waits for its result.
+
+    Raises AICallTimeout if the deadline passes; provider errors are re-raised
+    after retries are exhausted, so callers keep their existing error handling.
+    """
+    deadline_seconds = deadline_seconds or _provider(provider).deadline_seconds
+    future = submit_ai_call(provider, fn, *args, key=key, deadline_seconds=deadline_seconds, **kwargs)
+    try:
+        # The request itself runs on the pool; the rerun's profile sees the wait for it
+        with render_profiler.span(f"{provider}.upstream", render_profiler.AI):
+            return future.result(timeout=deadline_seconds)
+    except FutureTimeoutError:
+        raise AICallTimeout(f"{provider}: no response within {deadline_seconds:g}s") from None
@@ -0,0 +1,258 @@
+import os
+import re
+import math
+import threading
+from collections import OrderedDict
+
+# --- Bounded prompt context for the Sahayak assistant bot ---
+# Keeps the prompt size flat over long chats: the latest turns go in verbatim,
+# older turns are compacted into a short rolling summary, and the whole history
+# is trimmed to a token budget.
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("SAHAYAK_CONTEXT_TOKENS", "1500"))
+VERBATIM_TURNS = int(os.getenv("SAHAYAK_VERBATIM_TURNS", "4"))
+SUMMARY_SNIPPET_CHARS = 160
+
+# Product fields sent to the model, in order, with their prompt labels
+PRODUCT_FIELDS = [
+    ("name", "Name"),
+    ("price", "Price (INR)"),
+    ("materials", "Materials"),
+    ("craft_type", "Craft"),
+    ("description_story", "Description"),
+    ("description_bullets", "Features"),
+]
+
+
+def estimate_tokens(text):
+    """Rough token count (about 4 characters per token), good enough for budgeting."""
+    return (len(text) + 3) // 4
+
+
+def serialize_product(product_details):
+    """Renders product details as compact 'Label: value' lines instead of a dict repr."""
+    if not isinstance(product_details, dict):
+        return str(product_details or "")
+    lines = []
+    for field, label in PRODUCT_FIELDS:
+        value = product_details.get(field)
+        if value in (None, ""):
+            continue
+        if field == "price":
+            value = f"₹{float(value):.2f}"
+        lines.append(f"{label}: {str(value).strip()}")
+    return "\n".join(lines)
+
+
+def _first_sentence(text, limit=SUMMARY_SNIPPET_CHARS):
+    text = " ".join(str(text).split())
+    match = re.search(r"(.+?[.!?।])(\s|$)", text)
+    sentence = match.group(1) if match else text
+    return sentence if len(sentence) <= limit else sentence[:limit - 1].rstrip() + "…"
+
+
+def _format_turn(message):
+    speaker = "Customer" if message.get("role") == "user" else "Sahayak Bot"
+    return f"{speaker}: {message.get('content', '').strip()}"
+
+
+def _summarize_turn(message):
+    speaker = "Customer asked" if message.get("role") == "user" else "Bot answered"
+    return f"- {speaker}: {_first_sentence(message.get('content', ''))}"
+
+
+def build_conversation_context(messages, token_budget=CONTEXT_TOKEN_BUDGET, verbatim_turns=VERBATIM_TURNS):
+    """Splits a chat history into (history_text, question) that fits the token budget.
+
+    The last message is the question. Of the rest, the most recent verbatim_turns
+    messages are kept word for word; older ones become one-line summaries. If the
+    result is still over budget, the oldest summary lines and then the oldest
+    verbatim turns are dropped.
+    """
+    if isinstance(messages, str):
+        return "", messages
+    messages = list(messages or [])
+    if not messages:
+        return "", ""
+
+    question = messages[-1].get("content", "")
+    history = messages[:-1]
+    if verbatim_turns > 0:
+        older, recent = history[:-verbatim_turns], history[-verbatim_turns:]
+    else:
+        older, recent = history, []
+
+    summary_lines = [_summarize_turn(m) for m in older]
+    recent_lines = [_format_turn(m) for m in recent]
+
+    budget = token_budget - estimate_tokens(question)
+
+    def total_tokens():
+        return sum(estimate_tokens(line) + 1 for line in summary_lines + recent_lines)
+
+    while summary_lines and total_tokens() > budget:
+        summary_lines.pop(0)
+    while recent_lines and total_tokens() > budget:
+        recent_lines.pop(0)
+
+    parts = []
+    if summary_lines:
+        parts.append("Summary of earlier conversation:\n" + "\n".join(summary_lines))
+    if recent_lines:
+        parts.append("Recent messages:\n" + "\n".join(recent_lines))
+    return "\n\n".join(parts), question
+
+
+# --- Retrieval over the artisan's whole catalog ---
+# Customers ask about other products too ("Do you also make lamps?"). Instead of
+# putting every listing in the prompt, the artisan's story and all product
+# descriptions are split into short passages, and only the passages most
+# relevant to the question are added, within a fixed token budget.
+
+RETRIEVAL_TOKEN_BUDGET = int(os.getenv("SAHAYAK_RETRIEVAL_TOKENS", "600"))
+RETRIEVAL_TOP_K = int(os.getenv("SAHAYAK_RETRIEVAL_TOP_K", "6"))
+PASSAGE_TOKENS = int(os.getenv("SAHAYAK_PASSAGE_TOKENS", "120"))
+# Stories up to this size are sent whole; longer ones are retrieved like listings
+FULL_STORY_TOKENS = int(os.getenv("SAHAYAK_FULL_STORY_TOKENS", "400"))
+# Passage indexes kept in memory; the least recently used artisan's is dropped first
+MAX_PASSAGE_INDEXES = int(os.getenv("SAHAYAK_MAX_PASSAGE_INDEXES", "256"))
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?।])\s+|\n+")
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def split_passages(text, max_tokens=PASSAGE_TOKENS):
+    """Groups consecutive sentences into passages of at most max_tokens (roughly)."""
+    passages, current = [], []
+    for sentence in _SENTENCE_SPLIT.split(str(text or "")):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if current and estimate_tokens(" ".join(current + [sentence])) > max_tokens:
+            passages.append(" ".join(current))
+            current = []
+        current.append(sentence)
+    if current:
+        passages.append(" ".join(current))
+    return passages
+
+
+def _product_passages(product_id, product):
+    name = product.get("name", "")
+    summary = serialize_product({k: product.get(k) for k in ("name", "price", "materials", "craft_type")})
+    passages = [(product_id, summary.replace("\n", "; "))]
+    for field in ("description_story", "description_bullets"):
+        for passage in split_passages(product.get(field)):
+            passages.append((product_id, f"{name}: {passage}"))
+    return passages
+
+
+class PassageIndex:
+    """BM25 ranking over one artisan's story and product passages."""
+
+    def __init__(self, story, products):
+        from search_index import tokenize
+
+        self._tokenize = tokenize
+        self.passages = [("story", passage) for passage in split_passages(story)]
+        for product_id, product in products.items():
+            self.passages.extend(_product_passages(product_id, product))
+        self.term_counts = []
+        self.doc_freq = {}
+        for _, text in self.passages:
+            counts = {}
+            for token in tokenize(text):
+                counts[token] = counts.get(token, 0) + 1
+            self.term_counts.append(counts)
+            for token in counts:
+                self.doc_freq[token] = self.doc_freq.get(token, 0) + 1
+        lengths = [sum(counts.values()) for counts in self.term_counts]
+        self.lengths = lengths
+        self.average_length = (sum(lengths) / len(lengths)) if lengths else 1.0
+
+    def search(self, query, include=lambda source: True):
+        """Returns [(score, index)] of matching passages, best first."""
+        count = len(self.passages)
+        query_tokens = set(self._tokenize(query))
+        results = []
+        for index, counts in enumerate(self.term_counts):
+            if not include(self.passages[index][0]):
+                continue
+            score = 0.0
+            for token in query_tokens:
+                tf = counts.get(token)
+                if not tf:
+                    continue
+                df = self.doc_freq[token]
+                idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[index] / self.average_length)
+                score += idf * tf * (BM25_K1 + 1) / (tf + norm)
+            if score > 0:
+                results.append((score, index))
+        results.sort(key=lambda item: (-item[0], item[1]))
+        return results
+
+    def select(self, query, token_budget=RETRIEVAL_TOKEN_BUDGET, k=RETRIEVAL_TOP_K, include=lambda source: True):
+        """Picks up to k of the best passages whose combined size fits the token budget."""
+        chosen, used = [], 0
+        for _, index in self.search(query, include):
+            tokens = estimate_tokens(self.passages[index][1])
+            if used + tokens > token_budget:
+                continue
+            chosen.append(self.passages[index])
+            used += tokens
+            if len(chosen) >= k:
+                break
+        return chosen
+
+
+# username -> (record version, PassageIndex), least recently used first
+_passage_indexes = OrderedDict()
+_passage_lock = threading.Lock()
+
+
+def get_passage_index(username):
+    """Returns the artisan's passage index, rebuilt only after that artisan's record changes."""
+    import shared_records
+
+    artisan = shared_records.get_artisan(username) or {}
+    version = artisan.get("version")
+    with _passage_lock:
+        cached = _passage_indexes.get(username)
+        if cached and version is not None and cached[0] == version:
+            _passage_indexes.move_to_end(username)
+            return cached[1]
+    index = PassageIndex(artisan.get("art_description", ""), artisan.get("products", {}))
+    with _passage_lock:
+        _passage_indexes[username] = (version, index)
+        _passage_indexes.move_to_end(username)
+        while len(_passage_indexes) > MAX_PASSAGE_INDEXES:
+            _passage_indexes.popitem(last=False)
+    return index
+
+
+def build_catalog_context(username, question, artisan_context, exclude_product_id=None):
+    """Returns (story_text, catalog_text) for the prompt, both bounded in size.
+
+    The selected product is sent in full elsewhere, so its passages are skipped.
+    Short stories are sent whole; a long story is cut to its opening passage
+    plus whichever story passages are relevant to the question.
+    """
+    index = get_passage_index(username)
+    story_fits = estimate_tokens(artisan_context or "") <= FULL_STORY_TOKENS
+
+    def include(source):
+        if source == "story":
+            return not story_fits
+        return source != exclude_product_id
+
+    chosen = index.select(question, include=include)
+    if story_fits:
+        story_text = artisan_context
+    else:
+        opening = split_passages(artisan_context)[:1]
+        story_text = "\n".join(opening + [text for source, text in chosen if source == "story" and text not in opening])
+    catalog_text = "\n".join(f"- {text}" for source, text in chosen if source != "story")
+    return story_text, catalog_text
@@ -0,0 +1,291 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import statistics
+import subprocess
+import tracemalloc
+
+# --- End-to-end page benchmark ---
+# Renders every page with Streamlit's AppTest against synthetic catalogs of
+# different sizes, using the offline provider stand-ins (AI_BACKEND=fake), and
+# reports render time, AI calls per render and peak memory. Each catalog size
+# runs in a fresh interpreter with its own temporary database and caches, so
+# results do not leak between sizes and cold-start costs are included.
+#
+#   python benchmark_pages.py --sizes 10,1000,50000
+#   FAKE_GEMINI_LATENCY_MS=800 python benchmark_pages.py --pages marketplace_search
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SIZES = "10,100,1000,10000,50000"
+PRODUCTS_PER_ARTISAN = 200
+
+CRAFTS = ["Handloom Weaving", "Pottery", "Block Printing", "Brass Work", "Wood Carving", "Embroidery"]
+MATERIALS = ["silk", "cotton", "terracotta clay", "brass", "sheesham wood", "natural dyes", "zari thread"]
+WORDS = ["handwoven", "indigo", "heritage", "festive", "village", "patterns", "timeless", "gift",
+         "motifs", "texture", "saree", "lamp", "bowl", "stole", "mirror", "peacock", "lotus", "temple"]
+
+
+# --- Section 1: Synthetic Catalog ---
+
+def _sentence(rng, count):
+    return " ".join(rng.choice(WORDS) for _ in range(count)).capitalize() + "."
+
+
+def build_synthetic_catalog(product_count, seed=0, with_translations=True):
+    """Fills the (temporary) database with artisans and product_count products.
+
+    Returns the username of the first artisan. Listings get stored Hindi and
+    Gujarati translations, as they would after background pre-translation.
+    """
+    import storage
+
+    rng = random.Random(seed)
+    artisan_count = max(1, -(-product_count // PRODUCTS_PER_ARTISAN))
+    product_number = 0
+    for a in range(artisan_count):
+        username = f"artisan{a}"
+        storage.create_artisan(username, "x")
+        craft = CRAFTS[a % len(CRAFTS)]
+        story = " ".join(_sentence(rng, 14) for _ in range(6))
+        storage.update_artisan_profile(username, name=f"Artisan {a}", craft=craft, art_description=story)
+        products = {}
+        for _ in range(min(PRODUCTS_PER_ARTISAN, product_count - product_number)):
+            name = f"{rng.choice(WORDS).capitalize()} {rng.choice(WORDS)} {product_number}"
+            product = {
+                "name": name,
+                "price": round(rng.uniform(150, 25000), 2),
+                "materials": rng.choice(MATERIALS),
+                "description_story": " ".join(_sentence(rng, 16) for _ in range(3)),
+                "description_bullets": "\n".join(f"- {_sentence(rng, 5)}" for _ in range(4)),
+                "description_social": _sentence(rng, 12),
+                "craft_type": craft,
+            }
+            if with_translations:
+                product["translations"] = {
+                    lang: {field: f"[{lang}] {product[field]}" for field in ("name", "description_story", "description_bullets")}
+                    for lang in ("hi", "gu")
+                }
+            products[f"p{product_number}"] = product
+            product_number += 1
+        storage.add_products(username, products)
+    return "artisan0"
+
+
+# --- Section 2: Page Scenarios ---
+
+def _logged_in(username):
+    import shared_records
+
+    def setup(at):
+        at.session_state["logged_in"] = True
+        at.session_state["username"] = username
+        at.session_state["artisan_view"] = shared_records.artisan_view(username)
+    return setup
+
+
+def _admin(username):
+    import metrics
+
+    logged_in = _logged_in(username)
+
+    def setup(at):
+        logged_in(at)
+        # Renders the provider table the way it looks when a provider key is missing
+        metrics.inc("kalakriti_provider_unavailable_total", provider="openai")
+    return setup
+
+
+def _select_language(name):
+    def interact(at):
+        at.selectbox[0].select(name).run()
+    return interact
+
+
+def _search(query):
+    def interact(at):
+        at.text_input[0].input(query).run()
+    return interact
+
+
+def _ask(question):
+    def interact(at):
+        at.chat_input[0].set_value(question).run()
+    return interact
+
+
+def scenarios(username):
+    """(name, page file, session setup, interaction after the first run) for every benchmarked view."""
+    logged_in = _logged_in(username)
+    return [
+        ("marketplace_en", "Marketplace_Home.py", None, None),
+        ("marketplace_hi", "Marketplace_Home.py", None, _select_language("Hindi")),
+        ("marketplace_search", "Marketplace_Home.py", None, _search("indigo saree")),
+        ("artisan_dashboard", "pages/Artisan_Dashboard.py", logged_in, None),
+        ("add_new_product", "pages/Add_New_Product.py", logged_in, None),
+        ("ai_post_planner", "pages/AI_Post_Planner.py", logged_in, None),
+        ("assistant_bot_question", "pages/Automated_Assistant_Bot.py", logged_in, _ask("Do you have any blue lamps?")),
+        ("bulk_import", "pages/Bulk_Import.py", logged_in, None),
+        ("campaign_batch", "pages/Campaign_Batch.py", logged_in, None),
+        ("admin_metrics", "pages/Admin_Metrics.py", _admin(username), None),
+    ]
+
+
+def _api_calls():
+    import metrics
+
+    calls = {"gemini": 0, "translate": 0, "openai": 0}
+    for row in metrics.provider_summary():
+        calls[row["provider"]] = row["attempts"]
+    return calls
+
+
+def _render(page, setup, interact, timeout):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(APP_DIR, page), default_timeout=timeout)
+    if setup:
+        setup(at)
+    at.run()
+    if interact and not at.exception:
+        interact(at)
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    return at
+
+
+def measure_scenario(page, setup, interact, repeats, timeout):
+    """Returns first/warm render times, AI calls per render and peak traced memory."""
+    before = _api_calls()
+    start = time.perf_counter()
+    _render(page, setup, interact, timeout)
+    first_ms = (time.perf_counter() - start) * 1000
+    first_calls = {p: n - before[p] for p, n in _api_calls().items()}
+
+    warm = []
+    before = _api_calls()
+    for _ in range(repeats):
+        start = time.perf_counter()
+        _render(page, setup, interact, timeout)
+        warm.append((time.perf_counter() - start) * 1000)
+    warm_calls = {p: (n - before[p]) / max(repeats, 1) for p, n in _api_calls().items()}
+
+    # Memory is traced on a separate run, since tracing slows the render down
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    _render(page, setup, interact, timeout)
+    peak_kb = tracemalloc.get_traced_memory()[1] / 1024
+    tracemalloc.stop()
+
+    return {
+        "first_ms": round(first_ms, 1),
+        "warm_ms": round(statistics.median(warm), 1) if warm else None,
+        "first_api_calls": first_calls,
+        "warm_api_calls": warm_calls,
+        "peak_kb": round(peak_kb),
+    }
+
+
+def run_worker(size, page_filter, repeats, timeout):
+    """Runs in the child interpreter: builds the catalog, then measures each page."""
+    sys.path.insert(0, APP_DIR)
+    start = time.perf_counter()
+    username = build_synthetic_catalog(size)
+    from similar_products import get_similarity_index
+    get_similarity_index(refresh=False).refresh()  # Steady state: every listing already embedded
+    setup_seconds = time.perf_counter() - start
+
+    results = []
+    for name, page, setup, interact in scenarios(username):
+        if page_filter and name not in page_filter:
+            continue
+        try:
+            result = measure_scenario(page, setup, interact, repeats, timeout)
+        except Exception as e:
+            result = {"error": str(e)}
+        results.append({"size": size, "scenario": name, **result})
+    print(json.dumps({"size": size, "setup_seconds": round(setup_seconds, 2), "results": results}))
+
+
+# --- Section 3: Runner ---
+
+def run_size(size, args):
+    """Benchmarks one catalog size in a fresh interpreter with its own temporary data files."""
+    with tempfile.TemporaryDirectory(prefix=f"kalakriti-bench-{size}-") as workdir:
+        env = dict(
+            os.environ,
+            AI_BACKEND="fake",
+            KALAKRITI_DB=os.path.join(workdir, "marketplace.db"),
+            KALAKRITI_CACHE_DB=os.path.join(workdir, "cache.db"),
+            KALAKRITI_LEGACY_JSON=os.path.join(workdir, "none.json"),
+            SIMILARITY_INDEX_DIR=os.path.join(workdir, "similarity_index"),
+            IMAGE_STORE_DIR=os.path.join(workdir, "images"),
+            BULK_IMPORT_CHECKPOINT_DIR=os.path.join(workdir, "checkpoints"),
+            ADMIN_USERNAMES="artisan0",  # The synthetic artisan the logged-in scenarios use
+        )
+        command = [sys.executable, os.path.abspath(__file__), "--worker", str(size),
+                   "--repeats", str(args.repeats), "--timeout", str(args.timeout)]
+        if args.pages:
+            command += ["--pages", args.pages]
+        completed = subprocess.run(command, cwd=APP_DIR, env=env, capture_output=True, text=True)
+        if completed.returncode != 0:
+            last_line = completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "unknown error"
+            raise RuntimeError(f"benchmark for {size} products failed: {last_line}")
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def _format_calls(calls):
+    return " ".join(f"{provider[0]}={count:g}" for provider, count in calls.items() if count) or "-"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark page renders offline with synthetic catalogs.")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="comma-separated catalog sizes")
+    parser.add_argument("--pages", default="", help="comma-separated scenario names (default: all)")
+    parser.add_argument("--repeats", type=int, default=3, help="warm renders per scenario")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds allowed per render")
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="exit with status 1 if any warm render takes longer than this")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    page_filter = {name for name in args.pages.split(",") if name}
+    if args.worker is not None:
+        run_worker(args.worker, page_filter, args.repeats, args.timeout)
+        return
+
+    reports, failed = [], False
+    print(f"{'products':>8}  {'scenario':<24} {'first ms':>9} {'warm ms':>9} {'peak KB':>8}  api calls (first / warm)")
+    for size in (int(s) for s in args.sizes.split(",") if s):
+        try:
+            report = run_size(size, args)
+        except RuntimeError as e:
+            print(f"{size:>8}  ERROR  {e}")
+            failed = True
+            continue
+        reports.append(report)
+        for row in report["results"]:
+            if "error" in row:
+                print(f"{size:>8}  {row['scenario']:<24} ERROR  {row['error']}")
+                failed = True
+                continue
+            flag = ""
+            if args.budget_ms is not None and row["warm_ms"] is not None and row["warm_ms"] > args.budget_ms:
+                flag, failed = "  OVER BUDGET", True
+            print(f"{size:>8}  {row['scenario']:<24} {row['first_ms']:>9.1f} {row['warm_ms']:>9.1f} "
+                  f"{row['peak_kb']:>8}  {_format_calls(row['first_api_calls'])} / "
+                  f"{_format_calls(row['warm_api_calls'])}{flag}")
+        print(f"{size:>8}  (catalog setup took {report['setup_seconds']}s)")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(reports, f, indent=2)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
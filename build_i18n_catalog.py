@@ -0,0 +1,75 @@
+import os
+import ast
+import sys
+import json
+import glob
+
+from i18n import CATALOG_PATH
+
+# --- Build step: compile static UI strings into i18n_catalog.json ---
+# Finds every string literal passed to ui_text (or translate_text) in the app's
+# pages, plus the fixed option labels the pages show through ui_text (price
+# buckets and sort orders), translates the ones not yet in the catalog, and
+# writes the catalog that ships with the app. Existing entries are kept, so hand-reviewed translations
+# survive a rebuild; pass --refresh to re-translate everything.
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+PAGE_FILES = [os.path.join(APP_DIR, "Marketplace_Home.py")] + sorted(glob.glob(os.path.join(APP_DIR, "pages", "*.py")))
+TRANSLATION_FUNCTIONS = {"ui_text", "translate_text"}
+CATALOG_LANGUAGES = ("hi", "gu")
+
+
+def option_labels():
+    """Returns the fixed option labels that pages pass to ui_text as variables."""
+    from catalog import PRICE_BUCKETS, SORT_OPTIONS
+
+    return [label for label, _, _ in PRICE_BUCKETS] + list(SORT_OPTIONS)
+
+
+def find_ui_strings(paths=PAGE_FILES):
+    """Returns the literal first arguments of ui_text/translate_text calls in source order, then the option labels."""
+    found = {}
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            tree = ast.parse(f.read(), filename=path)
+        for node in ast.walk(tree):
+            if not isinstance(node, ast.Call) or not node.args:
+                continue
+            name = getattr(node.func, "id", None) or getattr(node.func, "attr", None)
+            first = node.args[0]
+            if name in TRANSLATION_FUNCTIONS and isinstance(first, ast.Constant) and isinstance(first.value, str):
+                found.setdefault(first.value, (PAGE_FILES.index(path) if path in PAGE_FILES else 0, first.lineno))
+    strings = sorted(found, key=found.get)
+    return strings + [label for label in option_labels() if label not in found]
+
+
+def build_catalog(refresh=False):
+    """Translates missing strings and writes the catalog. Returns the number of new entries."""
+    from google_ai_services import translate_many
+
+    strings = find_ui_strings()
+    try:
+        with open(CATALOG_PATH, "r", encoding="utf-8") as f:
+            catalog = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        catalog = {}
+
+    added = 0
+    for lang in CATALOG_LANGUAGES:
+        entries = {} if refresh else catalog.get(lang, {})
+        missing = [s for s in strings if s not in entries]
+        if missing:
+            entries.update(zip(missing, translate_many(missing, lang, raise_errors=True)))
+            added += len(missing)
+        # Drop strings that are no longer used by any page
+        catalog[lang] = {s: entries[s] for s in strings}
+
+    with open(CATALOG_PATH, "w", encoding="utf-8") as f:
+        json.dump(catalog, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write("\n")
+    return added
+
+
+if __name__ == "__main__":
+    added = build_catalog(refresh="--refresh" in sys.argv)
+    print(f"Wrote {CATALOG_PATH}: {len(find_ui_strings())} strings, {added} newly translated.")
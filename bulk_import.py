@@ -0,0 +1,215 @@
+import io
+import os
+import csv
+import sys
+import json
+import uuid
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import storage
+from cache_store import make_key
+
+# --- Bulk catalog import ---
+# Imports a CSV or JSONL file of products for one artisan. Descriptions are
+# generated with bounded parallelism (the shared AI execution layer still
+# enforces the provider's rate limits), progress is checkpointed after every
+# product so an interrupted import resumes where it stopped, and all products
+# are written to the database in one transaction at the end. The page runs
+# imports in the background job queue; the command line runs them directly.
+
+CHECKPOINT_DIR = os.getenv("BULK_IMPORT_CHECKPOINT_DIR", ".import_checkpoints")
+DEFAULT_PARALLELISM = int(os.getenv("BULK_IMPORT_PARALLELISM", "4"))
+
+REQUIRED_COLUMNS = ("name", "price", "materials")
+# Optional columns; rows that already have a story skip AI generation
+DESCRIPTION_COLUMNS = ("description_story", "description_bullets", "description_social")
+
+
+class BulkImportError(ValueError):
+    """Raised when an import file cannot be read or is missing required columns."""
+
+
+# --- Section 1: Reading Import Files ---
+
+def parse_import_file(content, filename):
+    """Parses CSV or JSONL bytes/text into a list of product rows.
+
+    The format is chosen by the file extension (.csv, or .jsonl / .json for JSON lines).
+    """
+    if isinstance(content, bytes):
+        content = content.decode("utf-8-sig")
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == ".csv":
+        rows = list(csv.DictReader(io.StringIO(content)))
+    elif extension in (".jsonl", ".json"):
+        rows = []
+        for line_number, line in enumerate(content.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                raise BulkImportError(f"Line {line_number} is not valid JSON: {e}")
+    else:
+        raise BulkImportError("Please upload a .csv or .jsonl file.")
+
+    products = []
+    for number, row in enumerate(rows, start=1):
+        row = {str(k).strip(): (v.strip() if isinstance(v, str) else v) for k, v in row.items() if k}
+        missing = [column for column in REQUIRED_COLUMNS if not row.get(column)]
+        if missing:
+            raise BulkImportError(f"Row {number} is missing: {', '.join(missing)}")
+        try:
+            row["price"] = float(row["price"])
+        except (TypeError, ValueError):
+            raise BulkImportError(f"Row {number} has an invalid price: {row['price']!r}")
+        products.append(row)
+    return products
+
+
+# --- Section 2: Checkpoints ---
+
+def import_id_for(username, rows):
+    """Identifies an import by artisan and file contents, so re-running the same file resumes it."""
+    return make_key(username, json.dumps(rows, sort_keys=True))[:16]
+
+
+def _checkpoint_path(import_id):
+    return os.path.join(CHECKPOINT_DIR, f"{import_id}.json")
+
+
+def load_checkpoint(import_id):
+    """Returns {row_index (str): generated descriptions} saved by an earlier run."""
+    try:
+        with open(_checkpoint_path(import_id), "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _save_checkpoint(import_id, completed):
+    os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+    path = _checkpoint_path(import_id)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(completed, f)
+    os.replace(temp_path, path)  # Atomic, so a crash never leaves a half-written checkpoint
+
+
+# --- Section 3: Running an Import ---
+
+def _product_from_row(row, descriptions, craft_type):
+    bullets = descriptions.get("bullet_points", [])
+    return {
+        "name": row["name"],
+        "price": row["price"],
+        "materials": row["materials"],
+        "description_story": row.get("description_story") or descriptions.get("story_driven", ""),
+        "description_bullets": row.get("description_bullets") or "\n".join(f"- {item}" for item in bullets),
+        "description_social": row.get("description_social") or descriptions.get("social_media_caption", ""),
+        "craft_type": row.get("craft_type") or craft_type,
+    }
+
+
+def stream_bulk_import(username, rows, parallelism=DEFAULT_PARALLELISM):
+    """Generates descriptions for every row and saves all products in one transaction.
+
+    Runs as the "bulk_import" background job. Yields ("field", "total", n),
+    ("field", "finished", n) after each row, and finally ("done", summary) with
+    the number of products inserted and any rows that failed, or ("done", {"error": ...}).
+    """
+    from google_ai_services import generate_product_descriptions
+    from listing_translations import schedule_product_translation
+    from similar_products import schedule_index_update
+
+    artisan = storage.get_artisan(username, include_products=False)
+    if artisan is None:
+        yield ("done", {"error": f"Unknown artisan: {username}"})
+        return
+    artisan_context = artisan.get("art_description", "")
+    if not artisan_context:
+        yield ("done", {"error": "The artisan's story is empty. The AI needs it to write descriptions."})
+        return
+
+    import_id = import_id_for(username, rows)
+    completed = load_checkpoint(import_id)
+    failures = {}
+
+    pending = [
+        index for index, row in enumerate(rows)
+        if str(index) not in completed and not row.get("description_story")
+    ]
+    finished = len(rows) - len(pending)
+    yield ("field", "total", len(rows))
+    yield ("field", "finished", finished)
+
+    def generate(index):
+        row = rows[index]
+        return index, generate_product_descriptions(artisan_context, row["name"], row["materials"])
+
+    with ThreadPoolExecutor(max_workers=max(1, parallelism), thread_name_prefix="bulk-import") as pool:
+        for future in as_completed([pool.submit(generate, index) for index in pending]):
+            index, descriptions = future.result()
+            if "error" in descriptions:
+                failures[index] = descriptions["error"]
+            else:
+                completed[str(index)] = descriptions
+                _save_checkpoint(import_id, completed)
+            finished += 1
+            yield ("field", "finished", finished)
+
+    # Product IDs are derived from the import, so resuming after a partial write never duplicates rows
+    namespace = uuid.uuid5(uuid.NAMESPACE_URL, f"kalakriti-import:{import_id}")
+    products = {}
+    for index, row in enumerate(rows):
+        if index in failures:
+            continue
+        descriptions = completed.get(str(index), {})
+        products[str(uuid.uuid5(namespace, str(index)))] = _product_from_row(row, descriptions, artisan.get("craft", ""))
+
+    inserted = storage.add_products(username, products)
+    for product_id in products:
+        schedule_product_translation(product_id)
+    schedule_index_update()
+
+    if not failures:
+        try:
+            os.remove(_checkpoint_path(import_id))
+        except FileNotFoundError:
+            pass
+    yield ("done", {"import_id": import_id, "inserted": inserted, "total": len(rows), "failures": failures})
+
+
+def run_bulk_import(username, rows, parallelism=DEFAULT_PARALLELISM, progress=None):
+    """Runs stream_bulk_import to the end in this thread and returns its summary.
+
+    progress, if given, is called as progress(finished, total) after each row.
+    Raises BulkImportError if the import cannot start.
+    """
+    for event in stream_bulk_import(username, rows, parallelism):
+        if event[0] == "field" and event[1] == "finished" and progress:
+            progress(event[2], len(rows))
+        elif event[0] == "done":
+            if "error" in event[1]:
+                raise BulkImportError(event[1]["error"])
+            return event[1]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-import products for an artisan from a CSV or JSONL file.")
+    parser.add_argument("username")
+    parser.add_argument("file")
+    parser.add_argument("--parallel", type=int, default=DEFAULT_PARALLELISM, help="concurrent AI generations")
+    args = parser.parse_args()
+
+    with open(args.file, "rb") as f:
+        import_rows = parse_import_file(f.read(), args.file)
+    summary = run_bulk_import(
+        args.username, import_rows, parallelism=args.parallel,
+        progress=lambda done, total: print(f"\r{done}/{total} products ready", end="", flush=True),
+    )
+    print(f"\nImported {summary['inserted']} of {summary['total']} products.")
+    for index, error in sorted(summary["failures"].items()):
+        print(f"  Row {index + 1} failed: {error}")
+    sys.exit(1 if summary["failures"] else 0)
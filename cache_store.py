@@ -0,0 +1,176 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+import metrics
+
+# A small two-level cache used by the AI service modules.
+# Level 1 is an in-memory LRU (per process), level 2 is a SQLite file on disk
+# that is shared by every Streamlit session and every worker process.
+
+CACHE_DB_PATH = os.getenv("KALAKRITI_CACHE_DB", "cache.db")
+
+
+def make_key(*parts):
+    """Builds a stable cache key by hashing the given parts together."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\x1f")  # Separator so ("ab", "c") != ("a", "bc")
+    return digest.hexdigest()
+
+
+class PersistentLRUCache:
+    """An in-memory LRU layer in front of a persistent SQLite key/value table.
+
+    With ttl_seconds set, entries older than the TTL are treated as misses.
+    """
+
+    def __init__(self, namespace, max_entries=5000, db_path=None, ttl_seconds=None):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path or CACHE_DB_PATH
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    # --- Disk Layer ---
+
+    def _connection(self):
+        """Opens the SQLite store on first use. Returns None if the disk is unavailable."""
+        if self._conn is None:
+            try:
+                conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS cache ("
+                    " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+                    " created_at REAL NOT NULL DEFAULT 0,"
+                    " PRIMARY KEY (namespace, key))"
+                )
+                self._add_missing_columns(conn)
+                if self.ttl_seconds is not None:
+                    # Expired entries would never be read again
+                    conn.execute(
+                        "DELETE FROM cache WHERE namespace = ? AND created_at < ?",
+                        (self.namespace, time.time() - self.ttl_seconds),
+                    )
+                conn.commit()
+                self._conn = conn
+            except sqlite3.Error as e:
+                print(f"Cache Error: could not open {self.db_path}: {e}")
+                self._conn = False
+        return self._conn or None
+
+    @staticmethod
+    def _add_missing_columns(conn):
+        """Upgrades cache files created before entries recorded their age."""
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(cache)")}
+        if "created_at" not in columns:
+            # Entries of unknown age count as expired for caches with a TTL
+            conn.execute("ALTER TABLE cache ADD COLUMN created_at REAL NOT NULL DEFAULT 0")
+
+    def _disk_get(self, key):
+        conn = self._connection()
+        if conn is None:
+            return None
+        try:
+            row = conn.execute(
+                "SELECT value, created_at FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Cache Error: {e}")
+            return None
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def _disk_set_many(self, items):
+        conn = self._connection()
+        if conn is None:
+            return
+        try:
+            now = time.time()
+            conn.executemany(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, created_at) VALUES (?, ?, ?, ?)",
+                [(self.namespace, key, json.dumps(value), now) for key, value in items],
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"Cache Error: {e}")
+
+    def _disk_delete(self, key):
+        conn = self._connection()
+        if conn is None:
+            return
+        try:
+            conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"Cache Error: {e}")
+
+    # --- Memory Layer ---
+
+    def _remember(self, key, value, created_at):
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _expired(self, created_at):
+        return self.ttl_seconds is not None and time.time() - created_at > self.ttl_seconds
+
+    # --- Public API ---
+
+    def get(self, key):
+        """Returns the cached value for the key, or None on a miss."""
+        with metrics.timed_lock(self._lock, f"cache:{self.namespace}"):
+            entry = self._memory.get(key)
+            if entry is not None and not self._expired(entry[1]):
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            entry = self._disk_get(key)
+            if entry is not None and not self._expired(entry[1]):
+                self._remember(key, *entry)
+                self.disk_hits += 1
+                return entry[0]
+            if entry is not None:
+                self._disk_delete(key)
+            self._memory.pop(key, None)
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        """Stores a value in both the memory and disk layers."""
+        self.set_many([(key, value)])
+
+    def set_many(self, items):
+        """Stores several (key, value) pairs with a single disk write."""
+        items = list(items)
+        if not items:
+            return
+        now = time.time()
+        with metrics.timed_lock(self._lock, f"cache:{self.namespace}"):
+            for key, value in items:
+                self._remember(key, value, now)
+            self._disk_set_many(items)
+
+    def stats(self):
+        """Returns hit/miss counters and the current memory footprint."""
+        with metrics.timed_lock(self._lock, f"cache:{self.namespace}"):
+            return {
+                "namespace": self.namespace,
+                "memory_hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+            }
@@ -0,0 +1,133 @@
+import io
+import os
+import csv
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from cache_store import make_key
+
+# --- Campaign batches ---
+# Generates social media plans for a whole product × goal matrix in one
+# background job (kind "campaign_batch" in job_queue) instead of one blocking
+# form submit per plan. Plans are generated with bounded parallelism (the
+# shared AI execution layer still enforces Gemini's limits). Every prompt uses
+# the artisan's full story, exactly as the AI Post Planner does, so a batch plan
+# and a single plan for the same product and goal share one cache entry.
+# Identical requests run only once, and every finished plan goes into the job's
+# partial result right away, so the page can show it while the rest are still
+# being written. The finished batch stays stored in the jobs table for export.
+
+CAMPAIGN_GOALS = [
+    "Launch a new product",
+    "Share the 'behind-the-scenes' making process",
+    "Announce a weekend sale or special offer",
+    "Educate customers about my unique craft",
+    "Tell a story about a specific design",
+]
+
+DEFAULT_PARALLELISM = int(os.getenv("CAMPAIGN_PARALLELISM", "3"))
+MAX_DAYS = 7
+
+EXPORT_COLUMNS = ("product_name", "campaign_goal", "plan_title", "day", "day_title", "suggested_image", "caption")
+
+
+def campaign_cells(products, goals):
+    """Expands {product_id: product} × goals into job-ready cells, one per plan to write."""
+    return [
+        {
+            "product_id": product_id,
+            "product_name": product.get("name", ""),
+            "image_hash": product.get("image_hash"),
+            "campaign_goal": goal,
+        }
+        for product_id, product in products.items()
+        for goal in goals
+    ]
+
+
+def _request_key(cell):
+    # Two listings with the same name and photo get the same plan for the same goal
+    return make_key(" ".join(cell["product_name"].casefold().split()), cell.get("image_hash") or "", cell["campaign_goal"])
+
+
+def stream_campaign_batch(artisan_context, cells, days=3, parallelism=DEFAULT_PARALLELISM):
+    """Generates a plan for every cell, yielding job events as plans finish.
+
+    Yields ("field", "total", n), then ("item", "plans", i, plan_entry) in
+    completion order, and finally ("done", {"days", "plans"}) with the plans in
+    matrix order, or ("done", {"error": ...}) if none could be generated.
+    """
+    from google_ai_services import generate_social_media_plan
+
+    days = max(1, min(MAX_DAYS, int(days)))
+    yield ("field", "total", len(cells))
+    if not cells:
+        yield ("done", {"error": "Choose at least one product and one goal."})
+        return
+
+    requests = {}  # request key -> indexes of the cells asking for it
+    for index, cell in enumerate(cells):
+        requests.setdefault(_request_key(cell), []).append(index)
+
+    def generate(key):
+        cell = cells[requests[key][0]]
+        return key, generate_social_media_plan(
+            artisan_context, cell["product_name"], cell["campaign_goal"], cell.get("image_hash"), days=days,
+        )
+
+    entries = [None] * len(cells)
+    finished = 0
+    with ThreadPoolExecutor(max_workers=max(1, parallelism), thread_name_prefix="campaign-batch") as pool:
+        futures = {pool.submit(generate, key): key for key in requests}
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                plan = future.result()[1]
+            except Exception as e:
+                # One failed plan is recorded on its cells; the rest of the batch goes on
+                print(f"Campaign Batch Error: {e}")
+                plan = {"error": str(e)}
+            for index in requests[key]:
+                entry = dict(cells[index])
+                if "error" in plan:
+                    entry["error"] = plan["error"]
+                else:
+                    entry["plan"] = plan
+                entries[index] = entry
+                yield ("item", "plans", finished, entry)
+                finished += 1
+
+    if all("error" in entry for entry in entries):
+        yield ("done", {"error": entries[0]["error"]})
+        return
+    yield ("done", {"days": days, "plans": entries})
+
+
+# --- Export ---
+
+def export_rows(plans):
+    """Flattens batch plan entries into one row per post."""
+    rows = []
+    for entry in plans:
+        plan = entry.get("plan")
+        if not plan:
+            continue
+        for day, post in enumerate(plan.get("posts", []), start=1):
+            rows.append({
+                "product_name": entry["product_name"],
+                "campaign_goal": entry["campaign_goal"],
+                "plan_title": plan.get("plan_title", ""),
+                "day": day,
+                "day_title": post.get("day_title", ""),
+                "suggested_image": post.get("suggested_image", ""),
+                "caption": post.get("caption", ""),
+            })
+    return rows
+
+
+def export_csv(plans):
+    """Returns the batch's posts as CSV text, ready for a scheduling tool or spreadsheet."""
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    writer.writerows(export_rows(plans))
+    return output.getvalue()
@@ -0,0 +1,159 @@
+import bisect
+import threading
+from collections import defaultdict
+
+import storage
+import metrics
+
+# --- Materialized catalog view for the storefront ---
+# One process-wide copy of every listing (with artisan info attached), plus
+# precomputed facets and a sorted price index. Sessions only hold the page of
+# results they are showing, and nothing is rebuilt on a rerun.
+
+# (label, lower bound inclusive, upper bound exclusive)
+PRICE_BUCKETS = [
+    ("Under ₹500", 0, 500),
+    ("₹500 – ₹2,000", 500, 2000),
+    ("₹2,000 – ₹5,000", 2000, 5000),
+    ("₹5,000 – ₹10,000", 5000, 10000),
+    ("₹10,000 and above", 10000, float("inf")),
+]
+
+SORT_OPTIONS = ["Newest", "Price: Low to High", "Price: High to Low"]
+
+DEFAULT_PAGE_SIZE = 12  # Four rows of the 3-column grid
+
+
+def price_bucket(price):
+    """Returns the label of the price bucket a price falls into."""
+    for label, low, high in PRICE_BUCKETS:
+        if low <= price < high:
+            return label
+    return PRICE_BUCKETS[0][0]
+
+
+class CatalogView:
+    """All listings plus facet and price indexes, refreshed incrementally from storage."""
+
+    def __init__(self):
+        self.products = {}                        # product_id -> product dict (treat as read-only)
+        self.order = []                           # product_ids, oldest first
+        self.facets = {
+            "craft_type": defaultdict(set),
+            "price_bucket": defaultdict(set),
+            "artisan": defaultdict(set),
+        }
+        self._price_index = []                    # sorted list of (price, product_id)
+        self._lock = threading.RLock()
+        self.seq = None
+
+    # --- Updates ---
+
+    def _facet_values(self, product):
+        return {
+            "craft_type": product.get("craft_type") or "Other",
+            "price_bucket": price_bucket(product.get("price", 0)),
+            "artisan": product.get("artisan_name", ""),
+        }
+
+    def _remove(self, product_id):
+        old = self.products.get(product_id)
+        if old is None:
+            return
+        for facet, value in self._facet_values(old).items():
+            self.facets[facet][value].discard(product_id)
+            if not self.facets[facet][value]:
+                del self.facets[facet][value]
+        entry = (old.get("price", 0), product_id)
+        position = bisect.bisect_left(self._price_index, entry)
+        if position < len(self._price_index) and self._price_index[position] == entry:
+            del self._price_index[position]
+
+    def upsert(self, product):
+        """Adds or replaces a listing and updates every facet and the price index."""
+        product_id = product["product_id"]
+        with self._lock:
+            if product_id in self.products:
+                self._remove(product_id)
+            else:
+                self.order.append(product_id)
+            self.products[product_id] = product
+            for facet, value in self._facet_values(product).items():
+                self.facets[facet][value].add(product_id)
+            bisect.insort(self._price_index, (product.get("price", 0), product_id))
+
+    def refresh(self):
+        """Applies only the storage writes made since the last refresh."""
+        with metrics.timed_lock(self._lock, "catalog"):
+            seq = storage.current_seq()
+            if seq == self.seq:
+                return 0
+            changed = storage.list_catalog(since_seq=self.seq)
+            for product in changed:
+                self.upsert(product)
+            self.seq = seq
+            return len(changed)
+
+    # --- Queries ---
+
+    def facet_counts(self, facet):
+        """Returns {value: number of listings} for one facet, sorted by value."""
+        with self._lock:
+            return {value: len(ids) for value, ids in sorted(self.facets[facet].items())}
+
+    def ids_in_price_range(self, low=None, high=None):
+        """Returns product IDs with low <= price <= high using the sorted price index."""
+        with self._lock:
+            start = 0 if low is None else bisect.bisect_left(self._price_index, (low, ""))
+            end = len(self._price_index) if high is None else bisect.bisect_right(self._price_index, (high, "\uffff"))
+            return {product_id for _, product_id in self._price_index[start:end]}
+
+    def query(self, ranked_ids=None, craft_types=(), price_buckets=(), artisans=(),
+              min_price=None, max_price=None, sort="Newest"):
+        """Filters and sorts the catalog, returning an ordered list of product IDs.
+
+        ranked_ids (e.g. search results) restricts the result set and, with the
+        default sort, also provides the order.
+        """
+        with self._lock:
+            selected = None
+
+            def narrow(ids):
+                nonlocal selected
+                selected = set(ids) if selected is None else selected & set(ids)
+
+            if ranked_ids is not None:
+                narrow(ranked_ids)
+            for facet, values in (("craft_type", craft_types), ("price_bucket", price_buckets), ("artisan", artisans)):
+                if values:
+                    narrow(set().union(*(self.facets[facet].get(v, set()) for v in values)))
+            if min_price is not None or max_price is not None:
+                narrow(self.ids_in_price_range(min_price, max_price))
+
+            if sort == "Price: Low to High":
+                ordered = [pid for _, pid in self._price_index]
+            elif sort == "Price: High to Low":
+                ordered = [pid for _, pid in reversed(self._price_index)]
+            elif ranked_ids is not None:
+                ordered = list(ranked_ids)
+            else:
+                ordered = list(reversed(self.order))
+            if selected is None:
+                return ordered
+            return [pid for pid in ordered if pid in selected]
+
+    def page(self, product_ids, page_number, page_size=DEFAULT_PAGE_SIZE):
+        """Returns the listings for one page of results (page_number starts at 1)."""
+        start = (page_number - 1) * page_size
+        with self._lock:
+            return [self.products[pid] for pid in product_ids[start:start + page_size] if pid in self.products]
+
+
+# --- Process-wide View ---
+_view = CatalogView()
+
+
+def get_catalog():
+    """Returns the shared catalog view, brought up to date with any new storage writes."""
+    _view.refresh()
+    return _view
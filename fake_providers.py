@@ -0,0 +1,160 @@
+import os
+import re
+import json
+import time
+import random
+import hashlib
+import threading
+from types import SimpleNamespace
+
+# --- Deterministic local stand-ins for the AI providers ---
+# With AI_BACKEND=fake, google_ai_services and openai_ai_services use these
+# instead of the Gemini, Translate and DALL-E clients. They answer instantly or
+# after a configurable delay, fail at a configurable rate, and give the same
+# output for the same input, so performance can be measured offline (in CI,
+# in benchmarks and load tests) with no API keys.
+#
+# Settings (per provider: GEMINI, TRANSLATE, OPENAI):
+#   FAKE_<PROVIDER>_LATENCY_MS   base latency per request (default 0)
+#   FAKE_<PROVIDER>_JITTER_MS    extra random latency, up to this much (default 0)
+#   FAKE_<PROVIDER>_ERROR_RATE   fraction of requests that fail with a 503 (default 0)
+#   FAKE_AI_SEED                 seed for the latency and error sequence (default 0)
+
+AI_BACKEND = os.getenv("AI_BACKEND", "live")
+
+
+def use_fakes():
+    """True when the app should use these stand-ins instead of the live providers."""
+    return AI_BACKEND == "fake"
+
+
+class FakeProviderError(Exception):
+    """A simulated 503 from a provider; ai_executor treats it as retryable."""
+
+    code = 503
+
+
+class _Simulator:
+    """Shared latency and error simulation for one fake provider."""
+
+    def __init__(self, provider):
+        prefix = f"FAKE_{provider.upper()}_"
+        self.provider = provider
+        self.latency = float(os.getenv(prefix + "LATENCY_MS", "0")) / 1000
+        self.jitter = float(os.getenv(prefix + "JITTER_MS", "0")) / 1000
+        self.error_rate = float(os.getenv(prefix + "ERROR_RATE", "0"))
+        self._random = random.Random(f"{os.getenv('FAKE_AI_SEED', '0')}:{provider}")
+        self._lock = threading.Lock()
+        self.requests = 0
+
+    def request(self):
+        """Sleeps for the simulated latency, then raises a simulated error if one is due."""
+        with self._lock:
+            self.requests += 1
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0)
+            fail = self.error_rate > 0 and self._random.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+        if fail:
+            raise FakeProviderError(f"Simulated {self.provider} outage (503)")
+
+
+def _digest(*parts):
+    return hashlib.sha256("\x1f".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+
+def _words(seed, count):
+    vocabulary = ("handwoven", "indigo", "heritage", "clay", "brass", "festive", "natural", "dyes",
+                  "village", "patterns", "timeless", "gift", "artisan", "craft", "detail", "texture")
+    rng = random.Random(seed)
+    return " ".join(rng.choice(vocabulary) for _ in range(count))
+
+
+# --- Section 1: Gemini ---
+
+class FakeGeminiModel:
+    """Stands in for genai.GenerativeModel: generate_content, optionally streamed."""
+
+    def __init__(self):
+        self.sim = _Simulator("gemini")
+
+    def _answer(self, prompt):
+        text = prompt if isinstance(prompt, str) else " ".join(p for p in prompt if isinstance(p, str))
+        seed = _digest(text)
+        if '"story_driven"' in text:
+            return json.dumps({
+                "story_driven": f"A {_words(seed, 24)}.",
+                "bullet_points": [f"{_words(seed + str(i), 5).capitalize()}" for i in range(4)],
+                "social_media_caption": f"{_words(seed + 'c', 12)} #handmade #india",
+            })
+        if '"plan_title"' in text:
+            days = re.search(r"exactly (\d+) JSON objects", text)
+            return json.dumps({
+                "plan_title": f"Plan: {_words(seed, 3)}",
+                "posts": [
+                    {"day_title": f"Day {day}: {_words(seed + str(day), 2)}",
+                     "suggested_image": _words(seed + f"i{day}", 8),
+                     "caption": f"{_words(seed + f'c{day}', 20)} #handmade"}
+                    for day in range(1, int(days.group(1)) + 1 if days else 4)
+                ],
+            })
+        return f"Thank you for asking! {_words(seed, 40).capitalize()}."
+
+    def _response(self, text, prompt_tokens):
+        usage = SimpleNamespace(prompt_token_count=prompt_tokens, candidates_token_count=(len(text) + 3) // 4)
+        return SimpleNamespace(text=text, usage_metadata=usage)
+
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        self.sim.request()
+        text = self._answer(prompt)
+        prompt_tokens = (len(str(prompt)) + 3) // 4
+        if not stream:
+            return self._response(text, prompt_tokens)
+        chunk_size = 40
+        return iter([
+            self._response(text[i:i + chunk_size], prompt_tokens) for i in range(0, len(text), chunk_size)
+        ])
+
+
+_gemini_embed_sim = _Simulator("gemini")
+
+
+def fake_embed_content(model, content, task_type=None):
+    """Stands in for genai.embed_content with deterministic 64-dimensional vectors."""
+    _gemini_embed_sim.request()
+    texts = content if isinstance(content, list) else [content]
+    vectors = [[int(c, 16) / 15.0 - 0.5 for c in _digest(text)[:64]] for text in texts]
+    return {"embedding": vectors if isinstance(content, list) else vectors[0]}
+
+
+# --- Section 2: Translate ---
+
+class FakeTranslateClient:
+    """Stands in for translate_v2.Client: translate() of a string or a list of strings."""
+
+    def __init__(self):
+        self.sim = _Simulator("translate")
+
+    def translate(self, values, target_language):
+        self.sim.request()
+
+        def one(text):
+            return {"translatedText": f"[{target_language}] {text}", "input": text}
+
+        if isinstance(values, str):
+            return one(values)
+        return [one(text) for text in values]
+
+
+# --- Section 3: DALL-E ---
+
+class FakeImagesAPI:
+    """Stands in for openai.images: generate() returns a stable fake URL per prompt."""
+
+    def __init__(self):
+        self.sim = _Simulator("openai")
+
+    def generate(self, prompt, **kwargs):
+        self.sim.request()
+        url = f"https://images.invalid/fake-dalle/{_digest(prompt)[:16]}.png"
+        return SimpleNamespace(data=[SimpleNamespace(url=url)])
@@ -1,61 +1,340 @@
 import os
-import json
-import google.generativeai as genai
+import threading
+import unicodedata
 from dotenv import load_dotenv
-from google.cloud import translate_v2 as translate
+from cache_store import PersistentLRUCache, make_key
+from assistant_context import build_conversation_context, build_catalog_context, serialize_product
+from ai_executor import run_ai_call, stream_ai_call
+from json_stream import IncrementalJSONParser, parse_model_json
+from image_store import load_image_part
+import metrics
+from fake_providers import use_fakes
 
 # Load environment variables from the .env file
 load_dotenv()
 
 # --- Section 1: Configure API Clients ---
+# The Google SDKs are slow to import and authenticate, so they are imported and
+# the clients built on first use (or by warm_up), not when a page imports this module.
+# With AI_BACKEND=fake, deterministic local stand-ins are used instead (see fake_providers).
 
-# Configure the Gemini API client
-try:
-    genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-    gemini_model = genai.GenerativeModel('gemini-1.5-flash-latest')
-except Exception as e:
-    print(f"--- 🚨 CRITICAL ERROR CONFIGURING GOOGLE AI ---")
-    print(f"Could not configure the Gemini API. Check your .env file and GOOGLE_API_KEY. Details: {e}")
-    gemini_model = None
-
-# Configure the Cloud Translation API client
-try:
-    # The translate library automatically finds your credentials
-    # It works with the same API key setup or Application Default Credentials
-    translate_client = translate.Client()
-except Exception as e:
-    print(f"--- 🚨 CRITICAL ERROR CONFIGURING TRANSLATE CLIENT ---")
-    print(f"Could not initialize the Translation client. Ensure the API is enabled. Details: {e}")
-    translate_client = None
+GEMINI_MODEL_NAME = os.getenv("GEMINI_MODEL", 'gemini-1.5-flash-latest')
+
+_client_lock = threading.Lock()
+_clients = {}  # "gemini" / "translate" -> client, or None if configuration failed
+
+
+def get_gemini_model():
+    """Returns the Gemini model, configuring it on first use. None if it could not be configured."""
+    if "gemini" not in _clients:
+        with _client_lock:
+            if "gemini" not in _clients and use_fakes():
+                from fake_providers import FakeGeminiModel
+                _clients["gemini"] = FakeGeminiModel()
+            if "gemini" not in _clients:
+                try:
+                    import google.generativeai as genai
+                    genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+                    _clients["gemini"] = genai.GenerativeModel(GEMINI_MODEL_NAME)
+                except Exception as e:
+                    print(f"--- 🚨 CRITICAL ERROR CONFIGURING GOOGLE AI ---")
+                    print(f"Could not configure the Gemini API. Check your .env file and GOOGLE_API_KEY. Details: {e}")
+                    _clients["gemini"] = None
+    if _clients["gemini"] is None:
+        # Count the silent fallbacks so a missing key shows up in the metrics
+        metrics.inc("kalakriti_provider_unavailable_total", provider="gemini")
+    return _clients["gemini"]
+
+
+def get_translate_client():
+    """Returns the Cloud Translation client, creating it on first use. None if it could not be created."""
+    if "translate" not in _clients:
+        with _client_lock:
+            if "translate" not in _clients and use_fakes():
+                from fake_providers import FakeTranslateClient
+                _clients["translate"] = FakeTranslateClient()
+            if "translate" not in _clients:
+                try:
+                    from google.cloud import translate_v2 as translate
+                    # The translate library automatically finds your credentials
+                    # It works with the same API key setup or Application Default Credentials
+                    _clients["translate"] = translate.Client()
+                except Exception as e:
+                    print(f"--- 🚨 CRITICAL ERROR CONFIGURING TRANSLATE CLIENT ---")
+                    print(f"Could not initialize the Translation client. Ensure the API is enabled. Details: {e}")
+                    _clients["translate"] = None
+    if _clients["translate"] is None:
+        metrics.inc("kalakriti_provider_unavailable_total", provider="translate")
+    return _clients["translate"]
+
+
+_warm_up_thread = None
+
+
+def warm_up(background=True):
+    """Imports the SDKs and builds both clients ahead of the first request.
+
+    Safe to call from every page: only the first call does any work. Set
+    AI_WARM_UP=1 to run it in the background as soon as this module is imported.
+    """
+    global _warm_up_thread
+
+    def _build_clients():
+        get_gemini_model()
+        get_translate_client()
+
+    if not background:
+        _build_clients()
+        return None
+    with _client_lock:
+        if _warm_up_thread is None:
+            _warm_up_thread = threading.Thread(target=_build_clients, name="ai-warm-up", daemon=True)
+            _warm_up_thread.start()
+    return _warm_up_thread
+
+
+if os.getenv("AI_WARM_UP", "0") == "1":
+    warm_up()
 
 
 # --- Section 2: Translation Function ---
 
+# Translations are shared by every session and worker process, so a warm page
+# render is served entirely from memory (or the on-disk store) with no API calls.
+translation_cache = PersistentLRUCache("translate", max_entries=int(os.getenv("TRANSLATION_CACHE_SIZE", "20000")))
+
+
+@metrics.instrument("translate", language_arg="target_language")
 def translate_text(text: str, target_language: str) -> str:
     """Translates text into the target language using Google Cloud Translate."""
-    # Return original text if the client failed to initialize or there's no text
-    if not translate_client or not text:
+    # Avoid unnecessary API calls if the target is English (or there's no text)
+    if not text or target_language == 'en':
         return text
-    # Avoid unnecessary API calls if the target is English (or the source language)
-    if target_language == 'en':
+    cache_key = make_key(text, target_language)
+    cached = translation_cache.get(cache_key)
+    metrics.cache_result(cached is not None)
+    if cached is not None:
+        return cached
+    # Return original text if the client failed to initialize
+    translate_client = get_translate_client()
+    if not translate_client:
         return text
     try:
-        result = translate_client.translate(text, target_language=target_language)
-        return result['translatedText']
+        result = run_ai_call("translate", translate_client.translate, text, target_language=target_language, key=cache_key)
+        translated = result['translatedText']
+        translation_cache.set(cache_key, translated)
+        return translated
     except Exception as e:
         print(f"Translation Error: {e}")
+        metrics.note_error(e)
         return text # Fallback to original text if translation fails
 
 
-# --- Section 3: Gemini API Functions ---
+# Cloud Translate v2 accepts at most 128 segments per request, and
+# recommends keeping each request under roughly 30k characters.
+TRANSLATE_BATCH_MAX_ITEMS = 128
+TRANSLATE_BATCH_MAX_CHARS = 30000
 
-def generate_product_descriptions(artisan_context, product_name, materials):
-    """Generates three distinct product description styles using Gemini."""
-    if not gemini_model:
-        return {"error": "Google AI model not configured. Please check your API key."}
 
+def _chunk_for_translation(texts):
+    """Splits texts into request-sized batches bounded by item count and characters."""
+    batch, batch_chars = [], 0
+    for text in texts:
+        if batch and (len(batch) >= TRANSLATE_BATCH_MAX_ITEMS or batch_chars + len(text) > TRANSLATE_BATCH_MAX_CHARS):
+            yield batch
+            batch, batch_chars = [], 0
+        batch.append(text)
+        batch_chars += len(text)
+    if batch:
+        yield batch
+
+
+@metrics.instrument("translate", language_arg="target_language")
+def translate_many(texts, target_language, raise_errors=False):
+    """Translates a list of strings, returning results in the same order.
+
+    Duplicates are translated once, cached strings are skipped, and the rest are
+    sent in a few size-bounded requests instead of one request per string.
+    With raise_errors, failures raise instead of falling back to the original text.
+    """
+    texts = list(texts)
+    if target_language == 'en':
+        return texts
+
+    translations = {}
+    missing = []
+    for text in dict.fromkeys(t for t in texts if t):  # Ordered de-duplication
+        cached = translation_cache.get(make_key(text, target_language))
+        if cached is not None:
+            translations[text] = cached
+        else:
+            missing.append(text)
+    metrics.count_cache("translate_many", True, n=len(translations), language=target_language)
+    metrics.count_cache("translate_many", False, n=len(missing), language=target_language)
+
+    translate_client = get_translate_client() if missing else None
+    if missing and not translate_client and raise_errors:
+        raise RuntimeError("Translation client not configured.")
+    if missing and translate_client:
+        for batch in _chunk_for_translation(missing):
+            try:
+                results = run_ai_call("translate", translate_client.translate, batch, target_language=target_language)
+            except Exception as e:
+                if raise_errors:
+                    raise
+                print(f"Translation Error: {e}")
+                metrics.note_error(e)
+                continue # Untranslated strings fall back to the original text
+            fresh = [(text, result['translatedText']) for text, result in zip(batch, results)]
+            translations.update(fresh)
+            translation_cache.set_many((make_key(text, target_language), translated) for text, translated in fresh)
+
+    return [translations.get(text, text) for text in texts]
+
+
+def prefetch_translations(texts, target_language):
+    """Collect-then-flush helper for pages: warms the cache for every string a render needs.
+
+    Later translate_text calls for these strings are then served from memory.
+    """
+    translate_many(texts, target_language)
+
+
+# --- Section 3: Gemini Response Cache ---
+
+# Identical requests (same function, normalized inputs and model) are answered
+# from the cache instead of spending quota. Errors are never cached.
+response_cache = PersistentLRUCache(
+    "gemini",
+    max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", "2000")),
+    ttl_seconds=float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+)
+
+# Treat customer questions that differ only in case, punctuation or spacing as the same question
+NEAR_DUPLICATE_QUESTIONS = os.getenv("SAHAYAK_NEAR_DUPLICATE_MATCH", "1") == "1"
+
+
+def normalize_text(text):
+    """Collapses whitespace so cosmetic edits don't change a cache key."""
+    return " ".join(str(text or "").split())
+
+
+def normalize_question(question):
+    """Lowercases and strips punctuation and symbols for near-duplicate question matching."""
+    kept = (c if unicodedata.category(c)[0] in ("L", "M", "N") else " " for c in str(question or "").casefold())
+    return " ".join("".join(kept).split())
+
+
+def _response_key(function_name, *inputs):
+    return make_key(function_name, GEMINI_MODEL_NAME, *(normalize_text(i) for i in inputs))
+
+
+def _customer_query_key(artisan_context, product_details, history, question, catalog_text=""):
+    question_key = normalize_question(question) if NEAR_DUPLICATE_QUESTIONS else normalize_text(question)
+    # Answers without catalog retrieval keep the same cache key as before it existed
+    catalog_part = (catalog_text,) if catalog_text else ()
+    return _response_key("answer_customer_query", artisan_context, serialize_product(product_details), history, question_key, *catalog_part)
+
+
+# --- Section 4: Gemini API Functions ---
+
+def error_text(text):
+    """True for the error messages the text-returning functions give back instead of raising."""
+    return isinstance(text, str) and text.startswith(("Error:", "An error occurred", "\n\n_(The answer was cut off"))
+
+
+def _stream_event_error(event):
+    return event[0] == "done" and metrics.returned_error(event[1])
+
+
+def _stream_event_output(event):
+    return event[1] if event[0] == "done" else None
+
+
+# Structured output: Gemini is asked for JSON directly (no prose or fences).
+# The descriptions call sets only the MIME type because a response_schema makes
+# Gemini emit keys alphabetically, which would put "story_driven" (the field the
+# page shows first) last in the stream; the prompt fixes the key order instead.
+PRODUCT_DESCRIPTIONS_CONFIG = {"response_mime_type": "application/json"}
+
+SOCIAL_MEDIA_PLAN_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": {
+        "type": "object",
+        "properties": {
+            "plan_title": {"type": "string"},
+            "posts": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "day_title": {"type": "string"},
+                        "suggested_image": {"type": "string"},
+                        "caption": {"type": "string"},
+                    },
+                    "required": ["day_title", "suggested_image", "caption"],
+                },
+            },
+        },
+        "required": ["plan_title", "posts"],
+    },
+}
+
+
+def _complete_descriptions(descriptions):
+    """True if all three descriptions are present (a repaired, cut-off response may lack some)."""
+    return (
+        isinstance(descriptions, dict)
+        and all(descriptions.get(key) for key in ("story_driven", "bullet_points", "social_media_caption"))
+        and isinstance(descriptions["bullet_points"], list)
+    )
+
+
+def _complete_plan(plan, days):
+    """True if the plan has a title and exactly the requested number of complete posts."""
+    posts = plan.get("posts") if isinstance(plan, dict) else None
+    return (
+        isinstance(posts, list) and bool(plan.get("plan_title")) and len(posts) == days
+        and all(isinstance(post, dict) and all(post.get(key) for key in ("day_title", "suggested_image", "caption"))
+                for post in posts)
+    )
+
+
+def _stream_json(gemini_model, cache_key, prompt, generation_config, is_complete):
+    """Streams a JSON response, yielding parser events and finally ("done", result).
+
+    Fields are yielded as soon as they close (see IncrementalJSONParser). If the
+    final text is malformed it is repaired locally rather than regenerated; a
+    result that is_complete rejects is returned but not cached.
+    """
+    cached = response_cache.get(cache_key)
+    metrics.cache_result(cached is not None)
+    if cached is not None:
+        for key, value in cached.items():
+            yield ("field", key, value)
+        yield ("done", cached)
+        return
+
+    parser = IncrementalJSONParser()
     try:
-        prompt = f"""
+        for chunk in stream_ai_call("gemini", gemini_model.generate_content, prompt, generation_config=generation_config, stream=True):
+            metrics.note_usage(chunk) # The last chunk carries the final token counts
+            try:
+                text = chunk.text
+            except ValueError:
+                continue # Chunks without text parts (e.g. safety metadata) are skipped
+            yield from parser.feed(text)
+        result = parse_model_json(parser.text)
+    except Exception as e:
+        yield ("done", {"error": f"An error occurred with the Gemini API or parsing its response: {e}"})
+        return
+    if is_complete(result):
+        response_cache.set(cache_key, result)
+    yield ("done", result)
+
+
+def _product_descriptions_prompt(artisan_context, product_name, materials):
+    return f"""
         You are an expert e-commerce copywriter specializing in handmade artisanal crafts.
         Your task is to generate three distinct product descriptions for a new listing.
 
@@ -69,33 +348,72 @@ def generate_product_descriptions(artisan_context, product_name, materials):
         - Materials Used: {materials}
 
         **Instructions:**
-        You MUST respond with ONLY a valid JSON object. Do not include any other text or markdown formatting like ```json. The JSON object must have these exact keys: "story_driven", "bullet_points", "social_media_caption". The value for "bullet_points" must be an array of strings.
+        You MUST respond with ONLY a valid JSON object. Do not include any other text or markdown formatting like ```json. The JSON object must have these exact keys, in this order: "story_driven", "bullet_points", "social_media_caption". The value for "bullet_points" must be an array of strings.
         """
-        
-        response = gemini_model.generate_content(prompt)
-        
-        # Robustly find and extract the JSON object from the response text
-        text = response.text
-        start_index = text.find('{')
-        end_index = text.rfind('}') + 1
-        
-        if start_index == -1 or end_index == 0:
-            raise ValueError("Could not find a valid JSON object in the AI response.")
-            
-        cleaned_json_string = text[start_index:end_index]
-        return json.loads(cleaned_json_string)
+
+
+@metrics.instrument("gemini")
+def generate_product_descriptions(artisan_context, product_name, materials):
+    """Generates three distinct product description styles using Gemini."""
+    gemini_model = get_gemini_model()
+    if not gemini_model:
+        return {"error": "Google AI model not configured. Please check your API key."}
+
+    cache_key = _response_key("generate_product_descriptions", artisan_context, product_name, materials)
+    cached = response_cache.get(cache_key)
+    metrics.cache_result(cached is not None)
+    if cached is not None:
+        return cached
+
+    try:
+        prompt = _product_descriptions_prompt(artisan_context, product_name, materials)
+        response = run_ai_call(
+            "gemini", gemini_model.generate_content, prompt,
+            generation_config=PRODUCT_DESCRIPTIONS_CONFIG, key=cache_key,
+        )
+        # Parse the JSON object, repairing common breakage locally instead of re-running the model
+        metrics.note_usage(response)
+        descriptions = parse_model_json(response.text)
+        if _complete_descriptions(descriptions):
+            response_cache.set(cache_key, descriptions)
+        return descriptions
         
     except Exception as e:
         return {"error": f"An error occurred with the Gemini API or parsing its response: {e}"}
 
 
-def answer_customer_query(artisan_context, product_details, question):
-    """Answers a customer query using the artisan and product info as its only knowledge base."""
+@metrics.instrument("gemini", is_error=_stream_event_error, output_of=_stream_event_output)
+def stream_product_descriptions(artisan_context, product_name, materials):
+    """Streaming variant of generate_product_descriptions.
+
+    Yields ("field", key, value) as each description finishes (so "story_driven"
+    can be shown before the rest arrives), ("item", "bullet_points", i, text)
+    per bullet, and finally ("done", descriptions) with the full result or {"error": ...}.
+    """
+    gemini_model = get_gemini_model()
     if not gemini_model:
-        return "Error: Google AI model not configured."
+        yield ("done", {"error": "Google AI model not configured. Please check your API key."})
+        return
+    cache_key = _response_key("generate_product_descriptions", artisan_context, product_name, materials)
+    prompt = _product_descriptions_prompt(artisan_context, product_name, materials)
+    yield from _stream_json(gemini_model, cache_key, prompt, PRODUCT_DESCRIPTIONS_CONFIG, _complete_descriptions)
 
-    try:
-        prompt = f"""
+
+def _build_customer_query_prompt(artisan_context, product_details, history, question, catalog_text=""):
+    """Builds the Sahayak Bot prompt shared by the blocking and streaming variants."""
+    catalog_section = f"""
+        **Source of Truth: The Artisan's Other Products (most relevant excerpts)**
+        ---
+        {catalog_text}
+        ---
+""" if catalog_text else ""
+    history_section = f"""
+        **Conversation So Far**
+        ---
+        {history}
+        ---
+""" if history else ""
+    return f"""
         You are a friendly and helpful customer service bot for an artisan marketplace.
         Your name is Sahayak Bot. You have one critical rule: **You must only answer questions using the information provided below.** Do not make up any information, prices, or policies. If the answer is not in the context, politely state that you can provide details about the craft's origin and the artisan's story.
 
@@ -106,28 +424,115 @@ def answer_customer_query(artisan_context, product_details, question):
 
         **Source of Truth: Product Details**
         ---
-        {product_details}
+        {serialize_product(product_details)}
         ---
-
+{catalog_section}{history_section}
         **Customer's Question:**
         "{question}"
 
         Now, answer the customer's question based *only* on the provided information.
         """
-        response = gemini_model.generate_content(prompt)
+
+
+def _customer_query_inputs(artisan_context, question, username, product_id):
+    """Bounds the chat history and, given the artisan's username, retrieves catalog passages."""
+    history, question = build_conversation_context(question)
+    catalog_text = ""
+    if username:
+        artisan_context, catalog_text = build_catalog_context(username, question, artisan_context, product_id)
+    return artisan_context, history, question, catalog_text
+
+
+@metrics.instrument("gemini", is_error=error_text)
+def answer_customer_query(artisan_context, product_details, question, username=None, product_id=None):
+    """Answers a customer query using the artisan and product info as its only knowledge base.
+
+    question may be a single string or the full chat history (a list of
+    {"role", "content"} messages whose last entry is the new question); the
+    history is bounded by build_conversation_context. With the artisan's
+    username, the most relevant passages from their other listings (and a long
+    story) are retrieved too, so the bot can answer about the whole catalog.
+    """
+    gemini_model = get_gemini_model()
+    if not gemini_model:
+        return "Error: Google AI model not configured."
+
+    artisan_context, history, question, catalog_text = _customer_query_inputs(artisan_context, question, username, product_id)
+    cache_key = _customer_query_key(artisan_context, product_details, history, question, catalog_text)
+    cached = response_cache.get(cache_key)
+    metrics.cache_result(cached is not None)
+    if cached is not None:
+        return cached
+
+    try:
+        prompt = _build_customer_query_prompt(artisan_context, product_details, history, question, catalog_text)
+        response = run_ai_call("gemini", gemini_model.generate_content, prompt, key=cache_key)
+        metrics.note_usage(response)
+        response_cache.set(cache_key, response.text)
         return response.text
     except Exception as e:
         return f"An error occurred with the Gemini API: {e}"
-    
 
-def generate_social_media_plan(artisan_context, product_name, campaign_goal):
-    """Generates a complete 3-day social media plan using Gemini."""
+
+@metrics.instrument("gemini", is_error=error_text)
+def stream_customer_query(artisan_context, product_details, question, username=None, product_id=None):
+    """Streaming variant of answer_customer_query: yields the answer in chunks as Gemini produces them.
+
+    Errors never escape the generator. If the stream breaks partway through, the
+    text received so far is kept and an error note is yielded as the final chunk,
+    so joining all chunks always gives the complete message to store in the chat.
+    """
+    gemini_model = get_gemini_model()
     if not gemini_model:
-        return {"error": "Google AI model not configured."}
+        yield "Error: Google AI model not configured."
+        return
+
+    artisan_context, history, question, catalog_text = _customer_query_inputs(artisan_context, question, username, product_id)
+    cache_key = _customer_query_key(artisan_context, product_details, history, question, catalog_text)
+    cached = response_cache.get(cache_key)
+    metrics.cache_result(cached is not None)
+    if cached is not None:
+        yield cached
+        return
+
+    received = []
     try:
-        prompt = f"""
+        prompt = _build_customer_query_prompt(artisan_context, product_details, history, question, catalog_text)
+        # Streams are read in this thread, so they hold a Gemini slot for their whole duration
+        for chunk in stream_ai_call("gemini", gemini_model.generate_content, prompt, stream=True):
+            metrics.note_usage(chunk)
+            try:
+                text = chunk.text
+            except ValueError:
+                continue # Chunks without text parts (e.g. safety metadata) are skipped
+            if text:
+                received.append(text)
+                yield text
+        # Only complete answers are cached
+        if received:
+            response_cache.set(cache_key, "".join(received))
+    except Exception as e:
+        if received:
+            yield f"\n\n_(The answer was cut off: {e})_"
+        else:
+            yield f"An error occurred with the Gemini API: {e}"
+    
+
+DEFAULT_PLAN_DAYS = 3
+
+
+def _social_media_plan_key(artisan_context, product_name, campaign_goal, image_hash, days=DEFAULT_PLAN_DAYS):
+    # Plans without a photo (and 3-day plans) keep the same cache key as before those options existed
+    photo_part = (image_hash,) if image_hash else ()
+    days_part = (f"days={days}",) if days != DEFAULT_PLAN_DAYS else ()
+    return _response_key("generate_social_media_plan", artisan_context, product_name, campaign_goal, *photo_part, *days_part)
+
+
+def _social_media_plan_prompt(artisan_context, product_name, campaign_goal, image_hash=None, days=DEFAULT_PLAN_DAYS):
+    """Builds the plan prompt; with image_hash, the stored product photo is attached for the model to look at."""
+    text = f"""
         You are a professional social media strategist who specializes in helping independent artisans.
-        Your task is to create a 3-day social media content plan to help an artisan achieve their goal.
+        Your task is to create a {days}-day social media content plan to help an artisan achieve their goal.
 
         **Primary Context: The Artisan's Story**
         ---
@@ -142,18 +547,61 @@ def generate_social_media_plan(artisan_context, product_name, campaign_goal):
 
         **Instructions:**
         You MUST respond with ONLY a valid JSON object. The object must have a key "plan_title" and a key "posts".
-        The "posts" key must contain a list of exactly 3 JSON objects.
+        The "posts" key must contain a list of exactly {days} JSON objects, one per day.
         Each post object must have these three keys: "day_title", "suggested_image", and "caption".
         - "day_title": A short, catchy title for the day's post (e.g., "Day 1: The Teaser").
         - "suggested_image": A brief description of the type of photo the artisan should use.
         - "caption": The full, ready-to-use caption, complete with engaging text, emojis, and 3-5 relevant hashtags.
         """
-        
-        response = gemini_model.generate_content(prompt)
-        text = response.text
-        start = text.find('{')
-        end = text.rfind('}') + 1
-        cleaned_json_string = text[start:end]
-        return json.loads(cleaned_json_string)
+    photo = load_image_part(image_hash) if image_hash else None
+    if photo is None:
+        return text
+    return [text + "\n        A photo of the product is attached. Base the captions and image suggestions on what it shows.", photo]
+
+
+@metrics.instrument("gemini")
+def generate_social_media_plan(artisan_context, product_name, campaign_goal, image_hash=None, days=DEFAULT_PLAN_DAYS):
+    """Generates a complete social media plan (3 days unless days is given) using Gemini."""
+    gemini_model = get_gemini_model()
+    if not gemini_model:
+        return {"error": "Google AI model not configured."}
+
+    cache_key = _social_media_plan_key(artisan_context, product_name, campaign_goal, image_hash, days)
+    cached = response_cache.get(cache_key)
+    metrics.cache_result(cached is not None)
+    if cached is not None:
+        return cached
+
+    try:
+        prompt = _social_media_plan_prompt(artisan_context, product_name, campaign_goal, image_hash, days)
+        response = run_ai_call(
+            "gemini", gemini_model.generate_content, prompt,
+            generation_config=SOCIAL_MEDIA_PLAN_CONFIG, key=cache_key,
+        )
+        metrics.note_usage(response)
+        plan = parse_model_json(response.text)
+        if _complete_plan(plan, days):
+            response_cache.set(cache_key, plan)
+        return plan
     except Exception as e:
-        return {"error": f"An error occurred with the Gemini API or parsing the response: {e}"}
\ No newline at end of file
+        return {"error": f"An error occurred with the Gemini API or parsing the response: {e}"}
+
+
+@metrics.instrument("gemini", is_error=_stream_event_error, output_of=_stream_event_output)
+def stream_social_media_plan(artisan_context, product_name, campaign_goal, image_hash=None, days=DEFAULT_PLAN_DAYS):
+    """Streaming variant of generate_social_media_plan.
+
+    Yields ("item", "posts", i, post) as each day's post finishes (Day 1 can be
+    shown while Day 2 is still being written), ("field", key, value) for
+    top-level fields, and finally ("done", plan) or ("done", {"error": ...}).
+    """
+    gemini_model = get_gemini_model()
+    if not gemini_model:
+        yield ("done", {"error": "Google AI model not configured."})
+        return
+    cache_key = _social_media_plan_key(artisan_context, product_name, campaign_goal, image_hash, days)
+    prompt = _social_media_plan_prompt(artisan_context, product_name, campaign_goal, image_hash, days)
+    yield from _stream_json(
+        gemini_model, cache_key, prompt, SOCIAL_MEDIA_PLAN_CONFIG, lambda plan: _complete_plan(plan, days)
+    )
+
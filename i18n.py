@@ -0,0 +1,34 @@
+import os
+import json
+
+# --- Compiled catalog of static UI strings ---
+# Fixed labels are translated once at build time (see build_i18n_catalog.py) and
+# looked up here with a dict access. Live translation is only for user content.
+
+CATALOG_PATH = os.getenv("I18N_CATALOG", os.path.join(os.path.dirname(os.path.abspath(__file__)), "i18n_catalog.json"))
+
+
+def _load_catalog(path=CATALOG_PATH):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+_catalog = _load_catalog()
+
+
+def ui_text(text, target_language):
+    """Returns a static UI string in the target language from the compiled catalog.
+
+    Strings missing from the catalog (the build step has not been re-run since
+    they were added) fall back to live, cached translation.
+    """
+    if target_language == 'en' or not text:
+        return text
+    translated = _catalog.get(target_language, {}).get(text)
+    if translated is not None:
+        return translated
+    from google_ai_services import translate_text
+    return translate_text(text, target_language)
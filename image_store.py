@@ -0,0 +1,167 @@
+import io
+import os
+import hashlib
+import tempfile
+
+# --- Local content-addressed image store ---
+# Uploaded product photos and DALL-E results are saved once under their SHA-256 hash, so the same
+# image is never stored twice. Small WebP thumbnails are pre-computed for the
+# marketplace grid, which then loads a few KB per card instead of a full-size image.
+
+IMAGE_ROOT = os.getenv("IMAGE_STORE_DIR", os.path.join("static", "images"))
+ORIGINALS_DIR = os.path.join(IMAGE_ROOT, "originals")
+THUMBNAILS_DIR = os.path.join(IMAGE_ROOT, "thumbs")
+
+GRID_THUMBNAIL_EDGE = int(os.getenv("GRID_THUMBNAIL_EDGE", "480"))
+THUMBNAIL_SIZES = (GRID_THUMBNAIL_EDGE,)
+WEBP_QUALITY = int(os.getenv("THUMBNAIL_WEBP_QUALITY", "80"))
+
+# Uploaded photos are downscaled and re-encoded before they are stored or sent to a model
+UPLOAD_MAX_EDGE = int(os.getenv("UPLOAD_MAX_EDGE", "1024"))
+UPLOAD_JPEG_QUALITY = int(os.getenv("UPLOAD_JPEG_QUALITY", "82"))
+
+MAX_DOWNLOAD_BYTES = 20 * 1024 * 1024
+DOWNLOAD_TIMEOUT_SECONDS = 30
+
+
+class ImageStoreError(ValueError):
+    """Raised when image bytes cannot be decoded or downloaded."""
+
+
+def _original_path(image_hash):
+    return os.path.join(ORIGINALS_DIR, image_hash[:2], image_hash)
+
+
+def _thumbnail_path(image_hash, edge):
+    return os.path.join(THUMBNAILS_DIR, image_hash[:2], f"{image_hash}_{edge}.webp")
+
+
+def _write_atomically(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # A unique temp file per writer, so threads saving the same image never share one
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def _make_thumbnail(image_hash, edge):
+    from PIL import Image, ImageOps
+
+    with Image.open(_original_path(image_hash)) as image:
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((edge, edge))
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+        buffer = io.BytesIO()
+        image.save(buffer, format="WEBP", quality=WEBP_QUALITY, method=6)
+    _write_atomically(_thumbnail_path(image_hash, edge), buffer.getvalue())
+
+
+# --- Upload Preprocessing ---
+
+def compact_upload(uploaded_file, max_edge=UPLOAD_MAX_EDGE, quality=UPLOAD_JPEG_QUALITY):
+    """Turns an uploaded photo into compact JPEG bytes for storage and vision prompts.
+
+    The file is decoded straight from the upload (no extra full-size copy), large
+    JPEGs are decoded at a reduced scale, the photo is rotated upright and
+    downscaled so its longest edge is at most max_edge, and EXIF data (camera
+    details, GPS location) is dropped by re-encoding at the given quality.
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    try:
+        uploaded_file.seek(0)
+        with Image.open(uploaded_file) as image:
+            image.draft("RGB", (max_edge, max_edge))  # JPEG only: decode at 1/2, 1/4 or 1/8 scale
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+            if image.mode in ("RGBA", "LA", "P"):
+                image = image.convert("RGBA")
+                background = Image.new("RGB", image.size, "white")
+                background.paste(image, mask=image.getchannel("A"))
+                image = background
+            elif image.mode != "RGB":
+                image = image.convert("RGB")
+            buffer = io.BytesIO()
+            image.save(buffer, format="JPEG", quality=quality, optimize=True, progressive=True)
+    except (UnidentifiedImageError, OSError) as e:
+        raise ImageStoreError(f"The file is not a supported image: {e}")
+    return buffer.getvalue()
+
+
+def store_upload(uploaded_file):
+    """Compacts an uploaded photo and saves it in the store. Returns the image hash."""
+    return store_image_bytes(compact_upload(uploaded_file))
+
+
+# --- Public API ---
+
+def store_image_bytes(data):
+    """Stores image bytes (deduplicated by hash), pre-computes thumbnails, and returns the hash."""
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image.verify()
+    except (UnidentifiedImageError, OSError) as e:
+        raise ImageStoreError(f"The file is not a supported image: {e}")
+
+    image_hash = hashlib.sha256(data).hexdigest()
+    if not os.path.exists(_original_path(image_hash)):
+        _write_atomically(_original_path(image_hash), data)
+    for edge in THUMBNAIL_SIZES:
+        if not os.path.exists(_thumbnail_path(image_hash, edge)):
+            _make_thumbnail(image_hash, edge)
+    return image_hash
+
+
+def store_image_from_url(url):
+    """Downloads an image (e.g. a DALL-E result before its URL expires) into the store."""
+    import requests
+
+    try:
+        with requests.get(url, stream=True, timeout=DOWNLOAD_TIMEOUT_SECONDS) as response:
+            response.raise_for_status()
+            chunks, size = [], 0
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                size += len(chunk)
+                if size > MAX_DOWNLOAD_BYTES:
+                    raise ImageStoreError("The image is too large to download.")
+                chunks.append(chunk)
+    except requests.RequestException as e:
+        raise ImageStoreError(f"Could not download the image: {e}")
+    return store_image_bytes(b"".join(chunks))
+
+
+def thumbnail_path(image_hash, edge=GRID_THUMBNAIL_EDGE):
+    """Returns the local path of a WebP thumbnail, creating it if it is missing. None if unknown."""
+    path = _thumbnail_path(image_hash, edge)
+    if not os.path.exists(path):
+        if not os.path.exists(_original_path(image_hash)):
+            return None
+        _make_thumbnail(image_hash, edge)
+    return path
+
+
+def original_path(image_hash):
+    """Returns the local path of the full-size image, or None if it is not stored."""
+    path = _original_path(image_hash)
+    return path if os.path.exists(path) else None
+
+
+def load_image_part(image_hash):
+    """Returns a stored image as an inline part for a Gemini prompt, or None if it is not stored."""
+    path = original_path(image_hash)
+    if path is None:
+        return None
+    from PIL import Image
+
+    with Image.open(path) as image:
+        mime_type = Image.MIME.get(image.format, "image/jpeg")
+    with open(path, "rb") as f:
+        return {"mime_type": mime_type, "data": f.read()}
@@ -0,0 +1,74 @@
+import os
+import sys
+import argparse
+import subprocess
+
+# --- Import-time report for the app's modules ---
+# Runs `python -X importtime -c "import <module>"` in a fresh interpreter for each
+# module and reports its total import time plus the heaviest dependencies, so
+# cold-start regressions on autoscaled instances are easy to spot.
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MODULES = [
+    "google_ai_services",
+    "openai_ai_services",
+    "storage",
+    "catalog",
+    "search_index",
+    "listing_translations",
+    "i18n",
+]
+
+
+def measure_module(module):
+    """Returns (total_ms, [(cumulative_ms, imported_module), ...]) for one fresh import."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=APP_DIR, capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        last_line = completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "unknown error"
+        raise RuntimeError(f"import {module} failed: {last_line}")
+
+    entries = []
+    for line in completed.stderr.splitlines():
+        # Format: "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, self_us, cumulative_us, name = (part.strip() for part in line.replace("import time:", "|", 1).split("|"))
+        entries.append((int(cumulative_us) / 1000, name.strip()))
+    total_ms = next((ms for ms, name in entries if name == module), 0.0)
+    return total_ms, entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report import time for each app module.")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--top", type=int, default=5, help="heaviest dependencies to list per module")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="exit with status 1 if any module takes longer than this to import")
+    args = parser.parse_args()
+
+    over_budget = []
+    for module in args.modules:
+        try:
+            total_ms, entries = measure_module(module)
+        except RuntimeError as e:
+            print(f"{module:<24} ERROR  {e}")
+            over_budget.append(module)
+            continue
+        flag = ""
+        if args.budget_ms is not None and total_ms > args.budget_ms:
+            flag = f"  (over {args.budget_ms:g} ms budget)"
+            over_budget.append(module)
+        print(f"{module:<24} {total_ms:8.1f} ms{flag}")
+        # Only top-level packages, so a dependency isn't counted once per submodule
+        heaviest = sorted((e for e in entries if e[1] != module and "." not in e[1]), reverse=True)[:args.top]
+        for cumulative_ms, name in heaviest:
+            print(f"    {cumulative_ms:8.1f} ms  {name}")
+
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,279 @@
+import os
+import json
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import storage
+from cache_store import make_key
+
+# --- Background queue for long AI generations ---
+# Pages submit a job and get back a job ID instead of blocking their script
+# thread on the model call. A bounded worker pool runs the jobs, writing
+# progress and results to the jobs table, so a rerun, a navigation or a page
+# refresh can pick the result up again instead of paying for a new generation.
+
+MAX_WORKERS = int(os.getenv("AI_JOB_WORKERS", "4"))
+# Jobs without progress for this long (e.g. their process died) are run again
+STALE_JOB_SECONDS = int(os.getenv("AI_JOB_STALE_SECONDS", "600"))
+# Finished jobs (including their stored results) are deleted after this many days
+RETENTION_DAYS = float(os.getenv("AI_JOB_RETENTION_DAYS", "7"))
+MAINTENANCE_INTERVAL_SECONDS = 300
+
+JOBS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id      TEXT PRIMARY KEY,
+    kind        TEXT NOT NULL,
+    params      TEXT NOT NULL,
+    params_hash TEXT NOT NULL,
+    owner       TEXT NOT NULL DEFAULT '',
+    status      TEXT NOT NULL,
+    partial     TEXT NOT NULL DEFAULT '{}',
+    result      TEXT,
+    complete    INTEGER NOT NULL DEFAULT 0,
+    error       TEXT,
+    dismissed   INTEGER NOT NULL DEFAULT 0,
+    created_at  REAL NOT NULL,
+    updated_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_owner_kind ON jobs(owner, kind, created_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_params_hash ON jobs(params_hash);
+"""
+
+# kind -> streaming generator function yielding ("field"|"item"|"done", ...) events
+_job_kinds = {}
+# kind -> is_complete(result, params); kinds without one always finish complete
+_completeness_checks = {}
+_defaults_registered = False
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="ai-job")
+_schema_lock = threading.Lock()
+_schema_ready = set()
+_last_maintenance = {}  # database path -> time of the last stale-job sweep and cleanup
+
+
+def register_job_kind(kind, stream_fn, is_complete=None):
+    """Registers a generator function (such as stream_product_descriptions) as a job kind.
+
+    is_complete(result, params) tells whether a finished result can be handed
+    to later identical submits; an incomplete one (e.g. JSON repaired after the
+    model was cut off) is shown once, and the next submit generates it again.
+    """
+    _job_kinds[kind] = stream_fn
+    if is_complete:
+        _completeness_checks[kind] = is_complete
+
+
+def _register_default_kinds():
+    global _defaults_registered
+    _defaults_registered = True
+    from google_ai_services import (
+        stream_product_descriptions, stream_social_media_plan, _complete_descriptions, _complete_plan, DEFAULT_PLAN_DAYS,
+    )
+    from campaign_batch import stream_campaign_batch
+    from bulk_import import stream_bulk_import
+    register_job_kind(
+        "product_descriptions", stream_product_descriptions,
+        lambda result, params: _complete_descriptions(result),
+    )
+    register_job_kind(
+        "social_media_plan", stream_social_media_plan,
+        lambda result, params: _complete_plan(result, params.get("days", DEFAULT_PLAN_DAYS)),
+    )
+    register_job_kind(
+        "campaign_batch", stream_campaign_batch,
+        lambda result, params: all("plan" in entry for entry in result["plans"]),
+    )
+    register_job_kind("bulk_import", stream_bulk_import)
+
+
+def _connection():
+    conn = storage.get_connection()
+    with _schema_lock:
+        if storage.DB_PATH not in _schema_ready:
+            conn.executescript(JOBS_SCHEMA)
+            _add_missing_columns(conn)
+            _schema_ready.add(storage.DB_PATH)
+        maintenance_due = time.time() - _last_maintenance.get(storage.DB_PATH, 0) > MAINTENANCE_INTERVAL_SECONDS
+        if maintenance_due:
+            _last_maintenance[storage.DB_PATH] = time.time()
+    if maintenance_due:
+        _maintain(conn)
+    return conn
+
+
+def _add_missing_columns(conn):
+    """Upgrades jobs tables created before results recorded whether they were complete."""
+    columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+    if "complete" not in columns:
+        # Results of unknown completeness are never reused
+        conn.execute("ALTER TABLE jobs ADD COLUMN complete INTEGER NOT NULL DEFAULT 0")
+
+
+def _maintain(conn):
+    """Deletes finished jobs past retention and re-runs jobs abandoned by a dead process.
+
+    Runs on the first connection of a process and then every few minutes.
+    """
+    with storage.transaction():
+        conn.execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'error') AND updated_at < ?",
+            (time.time() - RETENTION_DAYS * 86400,),
+        )
+        stale = conn.execute(
+            "SELECT job_id FROM jobs WHERE status IN ('queued', 'running') AND updated_at < ?",
+            (time.time() - STALE_JOB_SECONDS,),
+        ).fetchall()
+    for row in stale:
+        _requeue_if_stale(conn, row["job_id"])
+
+
+def _requeue_if_stale(conn, job_id):
+    """Queues a job again if it has made no progress for STALE_JOB_SECONDS. Returns True if it was."""
+    with storage.transaction():
+        requeued = conn.execute(
+            "UPDATE jobs SET status = 'queued', updated_at = ? WHERE job_id = ?"
+            " AND status IN ('queued', 'running') AND updated_at < ?",
+            (time.time(), job_id, time.time() - STALE_JOB_SECONDS),
+        ).rowcount
+    if requeued:
+        if not _defaults_registered:
+            _register_default_kinds()
+        _executor.submit(_run_job, job_id)
+    return bool(requeued)
+
+
+def _job_from_row(row):
+    return {
+        "job_id": row["job_id"],
+        "kind": row["kind"],
+        "params": json.loads(row["params"]),
+        "owner": row["owner"],
+        "status": row["status"],
+        "partial": json.loads(row["partial"]),
+        "result": json.loads(row["result"]) if row["result"] else None,
+        "complete": bool(row["complete"]),
+        "error": row["error"],
+        "created_at": row["created_at"],
+        "updated_at": row["updated_at"],
+    }
+
+
+def _update(job_id, **fields):
+    fields["updated_at"] = time.time()
+    assignments = ", ".join(f"{column} = ?" for column in fields)
+    conn = _connection()
+    with storage.transaction():
+        conn.execute(f"UPDATE jobs SET {assignments} WHERE job_id = ?", (*fields.values(), job_id))
+
+
+# --- Section 1: Submitting & Reading Jobs ---
+
+def submit_job(kind, params, owner="", reuse_result=True):
+    """Queues a job and returns its ID.
+
+    If an identical job (same kind and params) is already queued, running or
+    finished with a complete result, its ID is returned instead of starting a new one.
+    With reuse_result=False a finished job is run again (e.g. an import retrying failed rows).
+    """
+    if not _defaults_registered:
+        _register_default_kinds()
+    if kind not in _job_kinds:
+        raise ValueError(f"Unknown job kind: {kind}")
+
+    params_hash = make_key(kind, json.dumps(params, sort_keys=True))
+    conn = _connection()
+    reusable = "status IN ('queued', 'running')"
+    if reuse_result:
+        reusable = f"({reusable} OR (status = 'done' AND complete = 1))"
+    with storage.transaction():
+        existing = conn.execute(
+            "SELECT job_id, status, updated_at FROM jobs WHERE params_hash = ? AND owner = ?"
+            f" AND {reusable} ORDER BY created_at DESC LIMIT 1",
+            (params_hash, owner),
+        ).fetchone()
+        if existing and not (existing["status"] == "running" and time.time() - existing["updated_at"] > STALE_JOB_SECONDS):
+            conn.execute("UPDATE jobs SET dismissed = 0 WHERE job_id = ?", (existing["job_id"],))
+            if existing["status"] != "queued":
+                return existing["job_id"]
+            job_id = existing["job_id"]
+        else:
+            job_id = str(uuid.uuid4())
+            now = time.time()
+            conn.execute(
+                "INSERT INTO jobs (job_id, kind, params, params_hash, owner, status, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, 'queued', ?, ?)",
+                (job_id, kind, json.dumps(params), params_hash, owner, now, now),
+            )
+    # Queued jobs are (re)scheduled; _run_job's atomic claim stops them running twice
+    _executor.submit(_run_job, job_id)
+    return job_id
+
+
+def get_job(job_id):
+    """Returns the job as a dict (status, partial, result, error...), or None.
+
+    A job left queued or running by a process that died is queued again here,
+    so pages polling it get a result instead of waiting forever.
+    """
+    conn = _connection()
+    row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+    if row and row["status"] in ("queued", "running") and time.time() - row["updated_at"] > STALE_JOB_SECONDS:
+        if _requeue_if_stale(conn, job_id):
+            row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+    return _job_from_row(row) if row else None
+
+
+def latest_job(owner, kind, include_dismissed=False):
+    """Returns the owner's most recent job of a kind, e.g. to restore results after a page refresh."""
+    query = "SELECT job_id FROM jobs WHERE owner = ? AND kind = ?"
+    if not include_dismissed:
+        query += " AND dismissed = 0"
+    row = _connection().execute(query + " ORDER BY created_at DESC LIMIT 1", (owner, kind)).fetchone()
+    return get_job(row["job_id"]) if row else None
+
+
+def dismiss_job(job_id):
+    """Hides a job from latest_job once its result has been used (its result stays stored)."""
+    _update(job_id, dismissed=1)
+
+
+# --- Section 2: Worker ---
+
+def _run_job(job_id):
+    conn = _connection()
+    with storage.transaction():
+        # Atomically claim the job (queued, or running but stale after a crash)
+        claimed = conn.execute(
+            "UPDATE jobs SET status = 'running', updated_at = ? WHERE job_id = ?"
+            " AND (status = 'queued' OR (status = 'running' AND updated_at < ?))",
+            (time.time(), job_id, time.time() - STALE_JOB_SECONDS),
+        ).rowcount
+    if not claimed:
+        return
+
+    job = get_job(job_id)
+    partial = {}
+    try:
+        for event in _job_kinds[job["kind"]](**job["params"]):
+            if event[0] == "field":
+                partial[event[1]] = event[2]
+                _update(job_id, partial=json.dumps(partial))
+            elif event[0] == "item":
+                items = partial.setdefault(event[1], [])
+                if len(items) <= event[2]:
+                    items.append(event[3])
+                    _update(job_id, partial=json.dumps(partial))
+            elif event[0] == "done":
+                result = event[1]
+                if isinstance(result, dict) and "error" in result:
+                    _update(job_id, status="error", error=result["error"])
+                else:
+                    is_complete = _completeness_checks.get(job["kind"])
+                    complete = is_complete is None or bool(is_complete(result, job["params"]))
+                    _update(job_id, status="done", result=json.dumps(result), complete=int(complete))
+                return
+        _update(job_id, status="error", error="The generation ended without a result.")
+    except Exception as e:
+        print(f"AI Job Error ({job['kind']} {job_id}): {e}")
+        _update(job_id, status="error", error=str(e))
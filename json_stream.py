@@ -0,0 +1,203 @@
+import re
+import json
+
+# --- Incremental parsing and repair of model JSON output ---
+# Lets pages show each field of a streamed JSON answer as soon as it is complete,
+# and fixes common breakage (code fences, trailing commas, cut-off output)
+# locally instead of paying for a full regeneration.
+
+
+class IncrementalJSONParser:
+    """Parses a JSON object as it streams in, reporting values the moment they close.
+
+    feed() returns a list of events:
+      ("field", key, value)        a top-level field is complete
+      ("item", key, index, value)  an element of a top-level array is complete
+    Text before the first "{" (preambles, ```json fences) is ignored.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.depth = 0
+        self.started = False
+        self.done = False
+        self.in_string = False
+        self.escape = False
+        # State of the top-level object: "key", "key_string", "colon", "value", "in_value", "comma"
+        self.expect = "key"
+        self.key = None
+        self.key_start = None
+        self.value_start = None
+        self.value_kind = None     # '"', "{", "[" or "scalar"
+        self.item_start = None
+        self.item_index = 0
+
+    def feed(self, chunk):
+        events = []
+        self.buffer += chunk
+        while self.pos < len(self.buffer) and not self.done:
+            self._step(self.buffer[self.pos], events)
+            self.pos += 1
+        return events
+
+    @property
+    def text(self):
+        """Everything received so far."""
+        return self.buffer
+
+    # --- Internals ---
+
+    def _emit(self, events, event, start, end):
+        try:
+            value = json.loads(self.buffer[start:end], strict=False)
+        except ValueError:
+            return # Malformed pieces are left for repair_json at the end
+        events.append(event + (value,))
+
+    def _finish_item(self, events, end):
+        if self.item_start is not None and self.buffer[self.item_start:end].strip():
+            self._emit(events, ("item", self.key, self.item_index), self.item_start, end)
+            self.item_index += 1
+        self.item_start = None
+
+    def _step(self, c, events):
+        if not self.started:
+            if c == "{":
+                self.started, self.depth = True, 1
+            return
+
+        if self.in_string:
+            if self.escape:
+                self.escape = False
+            elif c == "\\":
+                self.escape = True
+            elif c == '"':
+                self.in_string = False
+                if self.depth == 1 and self.expect == "key_string":
+                    self.key = json.loads(self.buffer[self.key_start:self.pos + 1], strict=False)
+                    self.expect = "colon"
+                elif self.depth == 1 and self.expect == "in_value" and self.value_kind == '"':
+                    self._emit(events, ("field", self.key), self.value_start, self.pos + 1)
+                    self.expect = "comma"
+            return
+
+        if c.isspace():
+            return
+
+        # Start of an element inside a top-level array
+        if self.depth == 2 and self.value_kind == "[" and self.item_start is None and c not in ",]":
+            self.item_start = self.pos
+
+        if self.depth == 1:
+            if self.expect == "value":
+                self.value_start = self.pos
+                self.value_kind = c if c in '"{[' else "scalar"
+                self.expect = "in_value"
+                if c == "[":
+                    self.item_start, self.item_index = None, 0
+            elif self.expect == "in_value" and self.value_kind == "scalar" and c in ",}":
+                self._emit(events, ("field", self.key), self.value_start, self.pos)
+                self.expect = "comma"
+            elif self.expect == "key" and c == '"':
+                self.key_start = self.pos
+                self.expect = "key_string"
+            elif self.expect == "colon" and c == ":":
+                self.expect = "value"
+                return
+
+        if c == '"':
+            self.in_string = True
+        elif c in "{[":
+            self.depth += 1
+        elif c in "}]":
+            if self.depth == 2 and self.value_kind == "[" and c == "]":
+                self._finish_item(events, self.pos)
+            self.depth -= 1
+            if self.depth == 1 and self.expect == "in_value":
+                self._emit(events, ("field", self.key), self.value_start, self.pos + 1)
+                self.expect = "comma"
+            elif self.depth == 0:
+                self.done = True
+        elif c == ",":
+            if self.depth == 1:
+                self.expect = "key"
+            elif self.depth == 2 and self.value_kind == "[":
+                self._finish_item(events, self.pos)
+
+
+# --- Repair ---
+
+_FENCE = re.compile(r"```(?:json)?", re.IGNORECASE)
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_DANGLING_KEY_WITH_COLON = re.compile(r'"(?:[^"\\]|\\.)*"\s*:$')
+_DANGLING_KEY = re.compile(r'([{,])\s*"(?:[^"\\]|\\.)*"$')
+
+
+def repair_json(text):
+    """Fixes common problems in model JSON output without asking the model again.
+
+    Handles markdown fences, leading/trailing prose, trailing commas, raw control
+    characters in strings, and output that was cut off (unterminated strings,
+    dangling keys and unclosed brackets). Raises ValueError if it is still invalid.
+    """
+    text = _FENCE.sub("", text or "")
+    start = text.find("{")
+    if start == -1:
+        raise ValueError("Could not find a valid JSON object in the AI response.")
+    text = text[start:]
+
+    # Walk the text once to find where the top-level object ends (or that it never does)
+    stack, in_string, escape, end = [], False, False, None
+    for index, c in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif c == "\\":
+                escape = True
+            elif c == '"':
+                in_string = False
+        elif c == '"':
+            in_string = True
+        elif c in "{[":
+            stack.append("}" if c == "{" else "]")
+        elif c in "}]":
+            if stack:
+                stack.pop()
+            if not stack:
+                end = index + 1
+                break
+
+    if end is not None:
+        text = text[:end]
+    else:
+        # Cut-off output: close the open string, drop a dangling key or comma, close brackets
+        if in_string:
+            text += "\\" if escape else ""
+            text += '"'
+        text = text.rstrip()
+        if text.endswith(":"):
+            # A key whose value never arrived
+            text = _DANGLING_KEY_WITH_COLON.sub("", text).rstrip()
+        elif stack and stack[-1] == "}":
+            # A key cut off before its colon (only possible directly inside an object)
+            text = _DANGLING_KEY.sub(r"\1", text).rstrip()
+        text = text.rstrip(",").rstrip()
+        text += "".join(reversed(stack))
+
+    try:
+        return json.loads(text, strict=False)
+    except ValueError:
+        # Only now strip trailing commas, so commas inside valid strings are never touched
+        return json.loads(_TRAILING_COMMA.sub(r"\1", text), strict=False)
+
+
+def parse_model_json(text):
+    """Parses a JSON object from model output, repairing it locally if needed."""
+    try:
+        start, end = text.find("{"), text.rfind("}") + 1
+        if start != -1 and end > start:
+            return json.loads(text[start:end], strict=False)
+    except ValueError:
+        pass
+    return repair_json(text)
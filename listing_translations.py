@@ -0,0 +1,117 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import storage
+from google_ai_services import translate_many
+
+# --- Write-through translation of listings ---
+# When an artisan saves a product or their profile, the customer-facing text is
+# translated into every supported language in the background and stored with the
+# record, so the marketplace can render Hindi and Gujarati pages without calling
+# the Translate API.
+
+TRANSLATED_LANGUAGES = tuple(os.getenv("TRANSLATED_LANGUAGES", "hi,gu").split(","))
+
+PRODUCT_FIELDS = ("name", "description_story", "description_bullets")
+# Profile fields are stored under the names the storefront uses for them
+ARTISAN_FIELDS = {"name": "artisan_name", "art_description": "artisan_story"}
+
+# Sentence boundaries (including the Devanagari danda) and line breaks. The
+# separators are captured so the translated text keeps the original layout.
+_SEGMENT_SPLIT = re.compile(r"((?<=[.!?।])\s+|\n+)")
+
+_background = ThreadPoolExecutor(max_workers=2, thread_name_prefix="pretranslate")
+
+
+def split_segments(text):
+    """Splits text into alternating [sentence, separator, sentence, ...] pieces."""
+    return _SEGMENT_SPLIT.split(text or "")
+
+
+def translate_fields(fields, target_language):
+    """Translates {field: text} sentence by sentence.
+
+    Sentences go through translate_many, whose persistent cache already holds
+    every sentence translated before, so after an edit only the sentences that
+    actually changed are sent to the API.
+    """
+    pieces = {field: split_segments(text) for field, text in fields.items()}
+    sentences = [p for parts in pieces.values() for p in parts[0::2] if p.strip()]
+    # Errors propagate so a failed run never stores untranslated text as a translation
+    translated = dict(zip(sentences, translate_many(sentences, target_language, raise_errors=True)))
+
+    result = {}
+    for field, parts in pieces.items():
+        result[field] = "".join(
+            translated.get(part, part) if index % 2 == 0 else part
+            for index, part in enumerate(parts)
+        )
+    return result
+
+
+# --- Section 1: Products ---
+
+def pretranslate_product(product_id):
+    """Translates a product's listing text into every supported language and stores it."""
+    product = storage.get_product(product_id)
+    if product is None:
+        return
+    source = {field: product.get(field, "") for field in PRODUCT_FIELDS}
+    translations = {lang: translate_fields(source, lang) for lang in TRANSLATED_LANGUAGES}
+
+    # Skip the write if the artisan edited the listing while we were translating;
+    # the job scheduled for that newer edit will store its own translations.
+    current = storage.get_product(product_id)
+    if current is None or any(current.get(field, "") != text for field, text in source.items()):
+        return
+    storage.update_product(product_id, translations=translations)
+
+
+def schedule_product_translation(product_id):
+    """Queues pretranslate_product in the background so the save returns immediately."""
+    return _background.submit(_run_safely, pretranslate_product, product_id)
+
+
+# --- Section 2: Artisan Profiles ---
+
+def pretranslate_artisan(username):
+    """Translates an artisan's public name and story and stores them with the profile."""
+    artisan = storage.get_artisan(username, include_products=False)
+    if artisan is None:
+        return
+    source = {field: artisan.get(field, "") for field in ARTISAN_FIELDS}
+    translations = {}
+    for lang in TRANSLATED_LANGUAGES:
+        translated = translate_fields(source, lang)
+        translations[lang] = {ARTISAN_FIELDS[field]: text for field, text in translated.items()}
+
+    current = storage.get_artisan(username, include_products=False)
+    if current is None or any(current.get(field, "") != text for field, text in source.items()):
+        return
+    storage.update_artisan_translations(username, translations)
+
+
+def schedule_artisan_translation(username):
+    """Queues pretranslate_artisan in the background so the save returns immediately."""
+    return _background.submit(_run_safely, pretranslate_artisan, username)
+
+
+def _run_safely(job, *args):
+    try:
+        job(*args)
+    except Exception as e:
+        print(f"Pre-translation Error ({job.__name__}{args}): {e}")
+
+
+def backfill_all():
+    """Pre-translates every existing artisan and product (for listings saved before this feature)."""
+    for username in storage.list_artisans():
+        pretranslate_artisan(username)
+        for product_id in storage.get_products_for_artisan(username):
+            pretranslate_product(product_id)
+
+
+if __name__ == "__main__":
+    backfill_all()
+    print("Stored translations for all listings.")
@@ -0,0 +1,295 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+from collections import defaultdict
+
+# --- Concurrent-session load generator ---
+# Simulates N shoppers and artisans using one app process at the same time,
+# the way a single Streamlit instance serves its sessions: every session is a
+# thread running the same catalog, search, translation, storage and AI calls
+# its page makes on each rerun. Providers are the offline stand-ins
+# (AI_BACKEND=fake) with configurable latency, so no API keys are needed.
+#
+# Reports throughput, p50/p95/p99 latency per flow step, errors, and how long
+# sessions waited on shared locks (caches, catalog refresh, SQLite writes).
+#
+#   python load_test.py --sessions 50 --duration 60 --gemini-latency-ms 1500
+#
+# Browser rendering and Streamlit's own overhead are not included; use
+# benchmark_pages.py to measure a full page render.
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+LANGUAGES = ("en", "hi", "gu")
+SEARCH_TERMS = ("saree", "indigo", "brass lamp", "clay", "festive gift", "peacock", "silk", "lotus")
+QUESTIONS = ("Is this handmade?", "What is it made of?", "Do you have any lamps?",
+             "How do I care for it?", "Tell me about the artisan.", "Do you make gifts for Diwali?")
+
+
+# --- Section 1: Flow Steps ---
+# Each step runs the data work of one page rerun through the same page_flows
+# helpers the page calls.
+
+def step_browse(session, query="", page_number=1):
+    """Marketplace_Home: facets, optional search, one page of results, recommendations, translations."""
+    from catalog import get_catalog
+    from page_flows import search_results, recommendations_for, localized, prefetch_page_translations, LISTING_FIELDS
+    from i18n import ui_text
+
+    lang = session["language"]
+    catalog = get_catalog()
+    for facet in ("craft_type", "price_bucket", "artisan"):
+        catalog.facet_counts(facet)
+    ids = search_results(catalog, query)
+    products = catalog.page(ids, page_number)
+    recommendations = recommendations_for(catalog, products, k=3)
+    for label in ("Search for a craft or product", "Filters", "Price", "View Details & Artisan's Story"):
+        ui_text(label, lang)
+    prefetch_page_translations(products, recommendations, lang)
+    for product in products:
+        for field, default in LISTING_FIELDS:
+            localized(product, field, lang, default)
+        for other in recommendations[product["product_id"]]:
+            localized(other, "name", lang)
+    session["seen"] = [p["product_id"] for p in products]
+
+
+def step_login(session):
+    """Artisan_Dashboard: look up the artisan and check the password."""
+    from page_flows import log_in
+
+    view = log_in(session["username"], "password")
+    if view is None:
+        raise RuntimeError("login failed")
+    session["artisan_view"] = view
+
+
+def step_add_product(session):
+    """Add_New_Product: generate AI descriptions, then save and schedule background work."""
+    import shared_records
+    from google_ai_services import generate_product_descriptions
+    from page_flows import save_product
+
+    rng = session["random"]
+    name = f"{rng.choice(('Indigo', 'Festive', 'Lotus', 'Temple'))} {rng.choice(('stole', 'lamp', 'bowl'))} {rng.randrange(10**6)}"
+    profile = shared_records.get_artisan(session["username"])
+    descriptions = generate_product_descriptions(profile["art_description"], name, "cotton")
+    if "error" in descriptions:
+        raise RuntimeError(descriptions["error"])
+    save_product(session["username"], {
+        "name": name,
+        "price": round(rng.uniform(200, 5000), 2),
+        "materials": "cotton",
+        "description_story": descriptions.get("story_driven", ""),
+        "description_bullets": "\n".join(f"- {b}" for b in descriptions.get("bullet_points", [])),
+        "description_social": descriptions.get("social_media_caption", ""),
+        "craft_type": profile.get("craft", ""),
+    })
+    session["artisan_view"] = shared_records.artisan_view(session["username"])
+
+
+def step_chat(session):
+    """Automated_Assistant_Bot: stream an answer about one of the artisan's products."""
+    import shared_records
+    from google_ai_services import stream_customer_query
+
+    profile = shared_records.get_artisan(session["username"])
+    products = profile.get("products", {})
+    if not products:
+        return
+    product_id = session["random"].choice(sorted(products))
+    session.setdefault("messages", []).append({"role": "user", "content": session["random"].choice(QUESTIONS)})
+    answer = "".join(stream_customer_query(
+        profile["art_description"], products[product_id], session["messages"],
+        username=session["username"], product_id=product_id,
+    ))
+    session["messages"].append({"role": "assistant", "content": answer})
+
+
+def shopper_flow(session):
+    """Browse, search, page through results and open a second page in the session's language."""
+    rng = session["random"]
+    yield "browse", lambda: step_browse(session)
+    yield "search", lambda: step_browse(session, query=rng.choice(SEARCH_TERMS))
+    yield "next_page", lambda: step_browse(session, page_number=2)
+    yield "search", lambda: step_browse(session, query=rng.choice(SEARCH_TERMS)[:4])  # Typing a prefix
+
+
+def artisan_flow(session):
+    """Log in, add a product with AI descriptions, then ask the assistant bot two questions."""
+    yield "login", lambda: step_login(session)
+    yield "add_product", lambda: step_add_product(session)
+    yield "chat", lambda: step_chat(session)
+    yield "chat", lambda: step_chat(session)
+
+
+# --- Section 2: Running Sessions ---
+
+class LoadTest:
+    def __init__(self, sessions, duration, artisan_share, think_ms, artisans, seed):
+        self.sessions = sessions
+        self.duration = duration
+        self.artisan_share = artisan_share
+        self.think_ms = think_ms
+        self.artisans = artisans
+        self.seed = seed
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(lambda: defaultdict(int))
+        self.flows_completed = 0
+        self._lock = threading.Lock()
+
+    def _record(self, step, seconds, error=None):
+        with self._lock:
+            self.latencies[step].append(seconds)
+            if error is not None:
+                self.errors[step][type(error).__name__] += 1
+
+    def _run_session(self, number, stop_at):
+        rng = random.Random(f"{self.seed}:{number}")
+        while time.monotonic() < stop_at:
+            session = {
+                "random": rng,
+                "language": rng.choice(LANGUAGES),
+                "username": f"artisan{rng.randrange(self.artisans)}",
+            }
+            flow = artisan_flow if rng.random() < self.artisan_share else shopper_flow
+            for step, run in flow(session):
+                if time.monotonic() >= stop_at:
+                    return
+                start = time.perf_counter()
+                try:
+                    run()
+                    self._record(step, time.perf_counter() - start)
+                except Exception as e:
+                    self._record(step, time.perf_counter() - start, e)
+                    break  # A real user would not continue a broken flow
+                if self.think_ms:
+                    time.sleep(rng.expovariate(1000 / self.think_ms))
+            else:
+                with self._lock:
+                    self.flows_completed += 1
+
+    def run(self):
+        stop_at = time.monotonic() + self.duration
+        threads = [
+            threading.Thread(target=self._run_session, args=(number, stop_at), name=f"session-{number}")
+            for number in range(self.sessions)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - start
+
+    def report(self, elapsed):
+        import metrics
+
+        steps = []
+        for step, samples in sorted(self.latencies.items()):
+            row = {"step": step, "count": len(samples), "errors": sum(self.errors[step].values()),
+                   "per_second": round(len(samples) / elapsed, 2)}
+            for label, fraction in (("p50_ms", 0.50), ("p95_ms", 0.95), ("p99_ms", 0.99), ("max_ms", 1.0)):
+                row[label] = round(metrics.percentile(samples, fraction) * 1000, 1)
+            if self.errors[step]:
+                row["error_types"] = dict(self.errors[step])
+            steps.append(row)
+        total = sum(len(samples) for samples in self.latencies.values())
+        return {
+            "sessions": self.sessions,
+            "elapsed_seconds": round(elapsed, 2),
+            "steps_per_second": round(total / elapsed, 2),
+            "flows_completed": self.flows_completed,
+            "steps": steps,
+            "locks": metrics.lock_summary(),
+            "providers": metrics.provider_summary(),
+        }
+
+
+def print_report(report):
+    print(f"\n{report['sessions']} sessions for {report['elapsed_seconds']}s: "
+          f"{report['steps_per_second']} steps/s, {report['flows_completed']} flows completed\n")
+    print(f"{'step':<12} {'count':>7} {'errors':>6} {'/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for row in report["steps"]:
+        print(f"{row['step']:<12} {row['count']:>7} {row['errors']:>6} {row['per_second']:>7} "
+              f"{row['p50_ms']:>8} {row['p95_ms']:>8} {row['p99_ms']:>8} {row['max_ms']:>8}"
+              + (f"  {row['error_types']}" if "error_types" in row else ""))
+    print(f"\n{'lock':<22} {'acquired':>9} {'wait ms':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for row in report["locks"]:
+        print(f"{row['lock']:<22} {row['acquisitions']:>9} {row['total_wait_ms']:>9} {row['p50_ms']:>8} "
+              f"{row['p95_ms']:>8} {row['p99_ms']:>8} {row['max_ms']:>8}")
+    print(f"\n{'provider':<10} {'attempts':>9} {'retries':>8} {'errors':>7} {'unavailable':>11}")
+    for row in report["providers"]:
+        print(f"{row['provider']:<10} {row['attempts']:>9} {row['retries']:>8} {row['errors']:>7} {row['unavailable']:>11}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate concurrent shopper and artisan sessions offline.")
+    parser.add_argument("--sessions", type=int, default=20, help="concurrent sessions")
+    parser.add_argument("--duration", type=float, default=30, help="seconds to run")
+    parser.add_argument("--catalog-size", type=int, default=2000, help="synthetic products to start with")
+    parser.add_argument("--artisan-share", type=float, default=0.2, help="fraction of sessions that are artisans")
+    parser.add_argument("--think-ms", type=float, default=500, help="mean pause between a user's steps")
+    parser.add_argument("--gemini-latency-ms", type=float, default=1200)
+    parser.add_argument("--translate-latency-ms", type=float, default=150)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="simulated provider error rate")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", help="use these data files instead of a temporary directory")
+    parser.add_argument("--json", dest="json_path", help="also write the report to this file")
+    args = parser.parse_args()
+
+    if args.data_dir:
+        run_load_test(args, args.data_dir)
+    else:
+        with tempfile.TemporaryDirectory(prefix="kalakriti-load-", ignore_cleanup_errors=True) as workdir:
+            run_load_test(args, workdir)
+
+
+def run_load_test(args, workdir):
+    """Configures the app to use the data files in workdir, then runs and reports the test."""
+    # App modules read their settings at import time, so configure everything first
+    os.environ.update({
+        "AI_BACKEND": "fake",
+        "FAKE_GEMINI_LATENCY_MS": str(args.gemini_latency_ms),
+        "FAKE_GEMINI_JITTER_MS": str(args.gemini_latency_ms / 2),
+        "FAKE_TRANSLATE_LATENCY_MS": str(args.translate_latency_ms),
+        "FAKE_TRANSLATE_JITTER_MS": str(args.translate_latency_ms / 2),
+        "FAKE_GEMINI_ERROR_RATE": str(args.error_rate),
+        "FAKE_TRANSLATE_ERROR_RATE": str(args.error_rate),
+        "FAKE_AI_SEED": str(args.seed),
+        "KALAKRITI_DB": os.path.join(workdir, "marketplace.db"),
+        "KALAKRITI_CACHE_DB": os.path.join(workdir, "cache.db"),
+        "KALAKRITI_LEGACY_JSON": os.path.join(workdir, "none.json"),
+        "SIMILARITY_INDEX_DIR": os.path.join(workdir, "similarity_index"),
+        "IMAGE_STORE_DIR": os.path.join(workdir, "images"),
+    })
+    sys.path.insert(0, APP_DIR)
+    import storage
+    from benchmark_pages import build_synthetic_catalog, PRODUCTS_PER_ARTISAN
+    from page_flows import hash_password
+
+    if storage.current_seq() == 0:
+        print(f"Building a synthetic catalog of {args.catalog_size} products in {workdir} ...")
+        build_synthetic_catalog(args.catalog_size, seed=args.seed)
+        password_hash = hash_password("password")
+        with storage.transaction() as conn:
+            conn.execute("UPDATE artisans SET password_hash = ?", (password_hash,))
+        from similar_products import get_similarity_index
+        get_similarity_index(refresh=False).refresh()
+    artisans = max(1, -(-args.catalog_size // PRODUCTS_PER_ARTISAN))
+
+    print(f"Running {args.sessions} sessions for {args.duration:g}s ...")
+    test = LoadTest(args.sessions, args.duration, args.artisan_share, args.think_ms, artisans, args.seed)
+    report = test.report(test.run())
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,464 @@
+import os
+import json
+import math
+import time
+import inspect
+import functools
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+import render_profiler
+
+# --- In-process metrics for AI service calls ---
+# Records latency, input/output sizes, cache hits and misses, retries and errors
+# for every Gemini, Translate and DALL-E call. Recording takes no lock: each
+# thread writes into its own shard, and shards are only merged when the metrics
+# are read (the admin page or a Prometheus scrape).
+
+# Latency histogram buckets (seconds) for the Prometheus export
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Recent latency samples kept per thread and series for percentiles
+SAMPLE_WINDOW = int(os.getenv("METRICS_SAMPLE_WINDOW", "2048"))
+
+METRIC_HELP = {
+    "kalakriti_ai_calls_total": ("counter", "AI service function calls."),
+    "kalakriti_ai_errors_total": ("counter", "AI service function calls that failed."),
+    "kalakriti_ai_input_chars_total": ("counter", "Characters sent to AI services."),
+    "kalakriti_ai_output_chars_total": ("counter", "Characters received from AI services."),
+    "kalakriti_ai_input_tokens_total": ("counter", "Prompt tokens reported by the provider."),
+    "kalakriti_ai_output_tokens_total": ("counter", "Output tokens reported by the provider."),
+    "kalakriti_cache_lookups_total": ("counter", "Response and translation cache lookups."),
+    "kalakriti_provider_attempts_total": ("counter", "Upstream requests made to a provider, including retries."),
+    "kalakriti_provider_retries_total": ("counter", "Upstream requests retried after a 429 or 5xx error."),
+    "kalakriti_provider_errors_total": ("counter", "Upstream requests that raised an error."),
+    "kalakriti_provider_unavailable_total": ("counter", "Calls skipped because a provider client is not configured."),
+    "kalakriti_ai_call_seconds": ("histogram", "AI service function latency, including cache hits."),
+    "kalakriti_provider_request_seconds": ("histogram", "Latency of single upstream provider requests."),
+    "kalakriti_lock_wait_seconds": ("histogram", "Time spent waiting for shared locks (cache and database writes)."),
+}
+
+
+class _Shard:
+    """One thread's private counters, histograms and recent samples."""
+
+    __slots__ = ("thread", "counters", "histograms", "samples")
+
+    def __init__(self, thread):
+        self.thread = thread
+        self.counters = {}    # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+        self.samples = {}     # (name, labels) -> deque of recent observations
+
+
+_local = threading.local()
+_shards = []
+_retired = _Shard(None)  # Totals from threads that have finished
+_merge_lock = threading.Lock()  # Only taken by readers and by a thread's first write
+
+
+def _shard():
+    shard = getattr(_local, "shard", None)
+    if shard is None:
+        shard = _local.shard = _Shard(threading.current_thread())
+        with _merge_lock:
+            # Streamlit runs every rerun in a new thread, so retire finished
+            # threads here too, not only when someone reads the metrics
+            _retire_dead_shards()
+            _shards.append(shard)
+    return shard
+
+
+def _retire_dead_shards():
+    """Folds the shards of finished threads into the retired totals (caller holds _merge_lock)."""
+    for shard in [s for s in _shards if not s.thread.is_alive()]:
+        _merge_into(_retired, shard)
+        _shards.remove(shard)
+
+
+def _labels(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+# --- Section 1: Recording ---
+
+def inc(name, value=1, **labels):
+    """Adds to a counter."""
+    counters = _shard().counters
+    key = (name, _labels(labels))
+    counters[key] = counters.get(key, 0) + value
+
+
+def observe(name, value, **labels):
+    """Records one observation (e.g. a latency in seconds) in a histogram."""
+    shard = _shard()
+    key = (name, _labels(labels))
+    histogram = shard.histograms.get(key)
+    if histogram is None:
+        histogram = shard.histograms[key] = [0] * (len(LATENCY_BUCKETS) + 2)
+        shard.samples[key] = deque(maxlen=SAMPLE_WINDOW)
+    for index, bound in enumerate(LATENCY_BUCKETS):
+        if value <= bound:
+            histogram[index] += 1
+            break
+    histogram[-2] += value
+    histogram[-1] += 1
+    shard.samples[key].append(value)
+
+
+@contextmanager
+def timed_lock(lock, name):
+    """Acquires a lock, recording how long the thread waited for it."""
+    start = time.perf_counter()
+    with lock:
+        observe("kalakriti_lock_wait_seconds", time.perf_counter() - start, lock=name)
+        yield
+
+
+def count_cache(function, hit, n=1, language=None):
+    """Counts n cache lookups for a function as hits or misses."""
+    if n:
+        inc("kalakriti_cache_lookups_total", n, function=function, language=language,
+            result="hit" if hit else "miss")
+
+
+class CallRecord:
+    """Filled in by the caller inside track(); written out when the block ends."""
+
+    def __init__(self):
+        self.input_chars = 0
+        self.output_chars = 0
+        self.input_tokens = None
+        self.output_tokens = None
+        self.cache_hit = None
+        self.error = None
+
+    def set_usage(self, response):
+        """Copies token counts from a Gemini response's usage metadata, if it has any."""
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None:
+            self.input_tokens = getattr(usage, "prompt_token_count", None)
+            self.output_tokens = getattr(usage, "candidates_token_count", None)
+
+
+@contextmanager
+def track(function, provider, language=None, input_chars=0):
+    """Times a service function call and records its sizes, cache result and outcome.
+
+    Exceptions are recorded as errors and re-raised. Functions that return an
+    error value instead of raising set record.error themselves.
+    """
+    record = CallRecord()
+    record.input_chars = input_chars
+    start = time.perf_counter()
+    try:
+        yield record
+    except Exception as e:
+        record.error = type(e).__name__
+        raise
+    finally:
+        labels = {"function": function, "provider": provider, "language": language}
+        observe("kalakriti_ai_call_seconds", time.perf_counter() - start, **labels)
+        inc("kalakriti_ai_calls_total", **labels)
+        if record.error:
+            inc("kalakriti_ai_errors_total", **labels)
+        inc("kalakriti_ai_input_chars_total", record.input_chars, **labels)
+        inc("kalakriti_ai_output_chars_total", record.output_chars, **labels)
+        if record.input_tokens:
+            inc("kalakriti_ai_input_tokens_total", record.input_tokens, **labels)
+        if record.output_tokens:
+            inc("kalakriti_ai_output_tokens_total", record.output_tokens, **labels)
+        if record.cache_hit is not None:
+            count_cache(function, record.cache_hit, language=language)
+
+
+def _call_stack():
+    stack = getattr(_local, "calls", None)
+    if stack is None:
+        stack = _local.calls = []
+    return stack
+
+
+def _current_call():
+    stack = _call_stack()
+    return stack[-1] if stack else None
+
+
+def cache_result(hit):
+    """Marks the instrumented call running in this thread as a cache hit or miss."""
+    record = _current_call()
+    if record is not None:
+        record.cache_hit = hit
+
+
+def note_usage(response):
+    """Records token counts from a provider response for the current instrumented call."""
+    record = _current_call()
+    if record is not None:
+        record.set_usage(response)
+
+
+def note_error(error):
+    """Marks the current instrumented call as failed when the function handles the error itself."""
+    record = _current_call()
+    if record is not None:
+        record.error = type(error).__name__ if isinstance(error, BaseException) else str(error)
+
+
+def size_of(value):
+    """Rough size in characters of an argument or result (strings, lists, dicts)."""
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, (list, tuple)):
+        return sum(size_of(item) for item in value)
+    if isinstance(value, dict):
+        return len(json.dumps(value, ensure_ascii=False, default=str))
+    return 0
+
+
+def returned_error(result):
+    """Default error check: the repo's functions return {"error": ...} on failure."""
+    return isinstance(result, dict) and "error" in result
+
+
+def instrument(provider, language_arg=None, is_error=returned_error, output_of=None):
+    """Decorator that records every call of a service function with track().
+
+    language_arg names the parameter holding the target language. For generator
+    functions, is_error and output_of are applied to each yielded item, and the
+    latency covers the whole stream.
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+        name = fn.__qualname__
+        frame_name = f"{provider}.{name}"  # Frame name in per-rerun render profiles
+
+        def start(args, kwargs):
+            arguments = signature.bind_partial(*args, **kwargs).arguments
+            language = arguments.get(language_arg) if language_arg else None
+            input_chars = sum(size_of(v) for k, v in arguments.items() if k != language_arg)
+            return language, input_chars
+
+        def finish(record, value):
+            if is_error(value):
+                record.error = record.error or "returned_error"
+            output = output_of(value) if output_of else value
+            record.output_chars += size_of(output)
+
+        if inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                language, input_chars = start(args, kwargs)
+                with track(name, provider, language, input_chars) as record:
+                    generator = fn(*args, **kwargs)
+                    try:
+                        while True:
+                            _call_stack().append(record)
+                            try:
+                                # Only time spent producing items counts, not the caller's work between them
+                                with render_profiler.span(frame_name, render_profiler.AI):
+                                    item = next(generator)
+                            except StopIteration:
+                                return
+                            finally:
+                                _call_stack().pop()
+                            finish(record, item)
+                            yield item
+                    finally:
+                        generator.close()
+            return wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            language, input_chars = start(args, kwargs)
+            with track(name, provider, language, input_chars) as record:
+                _call_stack().append(record)
+                try:
+                    with render_profiler.span(frame_name, render_profiler.AI):
+                        result = fn(*args, **kwargs)
+                finally:
+                    _call_stack().pop()
+                finish(record, result)
+                return result
+        return wrapper
+    return decorator
+
+
+# --- Section 2: Reading ---
+
+def _merge_into(target, shard):
+    for key, value in list(shard.counters.items()):
+        target.counters[key] = target.counters.get(key, 0) + value
+    for key, histogram in list(shard.histograms.items()):
+        merged = target.histograms.setdefault(key, [0] * len(histogram))
+        for index, value in enumerate(list(histogram)):
+            merged[index] += value
+    for key, samples in list(shard.samples.items()):
+        target.samples.setdefault(key, deque(maxlen=SAMPLE_WINDOW)).extend(list(samples))
+
+
+def snapshot():
+    """Merges every thread's shard into one read-only view (a _Shard)."""
+    with _merge_lock:
+        _retire_dead_shards()
+        merged = _Shard(None)
+        for shard in [_retired] + _shards:
+            _merge_into(merged, shard)
+    return merged
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers (None if empty)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered), max(1, math.ceil(fraction * len(ordered)))) - 1]
+
+
+def call_summary():
+    """Per (function, language): calls, errors, cache hit rate, sizes and p50/p95/p99 latency."""
+    data = snapshot()
+    rows = {}
+
+    def row_for(labels):
+        labels = dict(labels)
+        key = (labels.get("function", ""), labels.get("language", ""))
+        return rows.setdefault(key, {
+            "function": key[0], "language": key[1] or "-", "provider": labels.get("provider", ""),
+            "calls": 0, "errors": 0, "cache_hits": 0, "cache_misses": 0,
+            "input_chars": 0, "output_chars": 0, "input_tokens": 0, "output_tokens": 0,
+            "samples": [],
+        })
+
+    fields = {
+        "kalakriti_ai_calls_total": "calls",
+        "kalakriti_ai_errors_total": "errors",
+        "kalakriti_ai_input_chars_total": "input_chars",
+        "kalakriti_ai_output_chars_total": "output_chars",
+        "kalakriti_ai_input_tokens_total": "input_tokens",
+        "kalakriti_ai_output_tokens_total": "output_tokens",
+    }
+    for (name, labels), value in data.counters.items():
+        if name in fields:
+            row_for(labels)[fields[name]] += value
+        elif name == "kalakriti_cache_lookups_total":
+            result = dict(labels).get("result")
+            row_for(labels)["cache_hits" if result == "hit" else "cache_misses"] += value
+    for (name, labels), samples in data.samples.items():
+        if name == "kalakriti_ai_call_seconds":
+            row_for(labels)["samples"].extend(samples)
+
+    summary = []
+    for row in rows.values():
+        samples = row.pop("samples")
+        lookups = row["cache_hits"] + row["cache_misses"]
+        row["cache_hit_rate"] = row["cache_hits"] / lookups if lookups else None
+        for label, fraction in (("p50_ms", 0.50), ("p95_ms", 0.95), ("p99_ms", 0.99)):
+            value = percentile(samples, fraction)
+            row[label] = None if value is None else round(value * 1000, 1)
+        summary.append(row)
+    return sorted(summary, key=lambda r: (-r["calls"], r["function"], r["language"]))
+
+
+def provider_summary():
+    """Per provider: upstream attempts, retries, errors, calls skipped while unconfigured and p50/p95/p99 latency."""
+    data = snapshot()
+    rows = {}
+    for (name, labels), value in data.counters.items():
+        provider = dict(labels).get("provider")
+        if name.startswith("kalakriti_provider_") and provider:
+            row = rows.setdefault(provider, {"provider": provider, "attempts": 0, "retries": 0, "errors": 0, "unavailable": 0})
+            column = name[len("kalakriti_provider_"):-len("_total")]
+            if column in row:  # Other provider counters are not part of this summary
+                row[column] += value
+    for (name, labels), samples in data.samples.items():
+        provider = dict(labels).get("provider")
+        if name == "kalakriti_provider_request_seconds" and provider in rows:
+            for label, fraction in (("p50_ms", 0.50), ("p95_ms", 0.95), ("p99_ms", 0.99)):
+                value = percentile(list(samples), fraction)
+                rows[provider][label] = None if value is None else round(value * 1000, 1)
+    return sorted(rows.values(), key=lambda r: r["provider"])
+
+
+def lock_summary():
+    """Per lock: acquisitions, total wait and p50/p95/p99/max wait (ms), most contended first."""
+    rows = []
+    data = snapshot()
+    for (name, labels), samples in data.samples.items():
+        if name != "kalakriti_lock_wait_seconds":
+            continue
+        histogram = data.histograms[(name, labels)]
+        samples = list(samples)
+        row = {"lock": dict(labels).get("lock", ""), "acquisitions": histogram[-1],
+               "total_wait_ms": round(histogram[-2] * 1000, 1), "max_ms": round(max(samples) * 1000, 2)}
+        for label, fraction in (("p50_ms", 0.50), ("p95_ms", 0.95), ("p99_ms", 0.99)):
+            row[label] = round(percentile(samples, fraction) * 1000, 2)
+        rows.append(row)
+    return sorted(rows, key=lambda r: -r["total_wait_ms"])
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (f'{k}="{v.replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for k, v in pairs)
+    return "{" + ",".join(escaped) + "}"
+
+
+def export_prometheus():
+    """Renders every metric in the Prometheus text exposition format."""
+    data = snapshot()
+    lines = []
+    for name, (kind, help_text) in METRIC_HELP.items():
+        series = data.counters if kind == "counter" else data.histograms
+        entries = sorted((labels, value) for (n, labels), value in series.items() if n == name)
+        if not entries:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in entries:
+            if kind == "counter":
+                lines.append(f"{name}{_format_labels(labels)} {value:g}")
+                continue
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, value):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', f'{bound:g}')])} {cumulative}")
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {value[-1]}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {value[-2]:g}")
+            lines.append(f"{name}_count{_format_labels(labels)} {value[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+# --- Section 3: Scrape Endpoint ---
+
+def start_metrics_server(port):
+    """Serves export_prometheus() at http://0.0.0.0:<port>/metrics from a daemon thread."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = export_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
+
+
+# Set METRICS_PORT to expose /metrics for a Prometheus scraper
+if os.getenv("METRICS_PORT"):
+    try:
+        start_metrics_server(int(os.getenv("METRICS_PORT")))
+    except OSError as e:
+        print(f"Metrics Error: could not start the metrics server: {e}")  # e.g. another worker has the port
@@ -1,6 +1,9 @@
 import os
 import openai
 from dotenv import load_dotenv
+from ai_executor import run_ai_call
+import metrics
+from fake_providers import use_fakes
 
 # Load API key from .env file
 load_dotenv()
@@ -10,15 +13,37 @@ except Exception as e:
     print(f"Error configuring OpenAI: {e}")
 
 
+def _fake_images():
+    """Returns the shared DALL-E stand-in (one instance keeps its error sequence going)."""
+    global _fake_images_api
+    if _fake_images_api is None:
+        from fake_providers import FakeImagesAPI
+        _fake_images_api = FakeImagesAPI()
+    return _fake_images_api
+
+
+_fake_images_api = None
+
+
+@metrics.instrument("openai", is_error=lambda result: not str(result).startswith("http"))
 def generate_image_with_dalle(prompt):
     """
     Generates an image using OpenAI's DALL-E 3 model.
     """
-    if not openai.api_key:
+    if use_fakes():
+        images = _fake_images()
+    elif not openai.api_key:
+        metrics.inc("kalakriti_provider_unavailable_total", provider="openai")
         return "Error: OpenAI API key not configured."
-        
+    else:
+        images = openai.images
+
     try:
-        response = openai.images.generate(
+        # Identical prompts in flight at the same time share one (expensive) generation
+        response = run_ai_call(
+            "openai",
+            images.generate,
+            key=prompt,
             model="dall-e-3",
             prompt=prompt,
             n=1,
@@ -28,4 +53,22 @@ def generate_image_with_dalle(prompt):
         image_url = response.data[0].url
         return image_url
     except Exception as e:
-        return f"An error occurred with the OpenAI API: {e}"
\ No newline at end of file
+        return f"An error occurred with the OpenAI API: {e}"
+
+
+def generate_product_image(prompt):
+    """
+    Generates an image with DALL-E 3 and saves it in the local image store.
+    DALL-E URLs expire after about an hour, so the image is downloaded right away.
+    Returns {"image_hash": ...} or {"error": ...}.
+    """
+    from image_store import store_image_from_url, ImageStoreError
+
+    image_url = generate_image_with_dalle(prompt)
+    if not image_url.startswith("http"):
+        return {"error": image_url}
+    try:
+        return {"image_hash": store_image_from_url(image_url)}
+    except ImageStoreError as e:
+        print(f"Image Store Error: {e}")
+        return {"error": str(e)}
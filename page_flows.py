@@ -0,0 +1,117 @@
+import hashlib
+
+import storage
+import shared_records
+import render_profiler
+
+# --- Data work shared by the page scripts and the load generator ---
+# The pages call these for everything that is not drawing widgets, and
+# load_test.py calls the same functions, so the load test measures what a
+# page rerun actually does instead of a copy that can drift from it.
+
+# Listing fields shown on a marketplace card, with the text shown when one is empty
+LISTING_FIELDS = [
+    ("name", ""),
+    ("artisan_name", ""),
+    ("description_story", "No description available."),
+    ("description_bullets", ""),
+    ("artisan_story", ""),
+]
+
+
+# --- Section 1: Marketplace ---
+
+def search_results(catalog, search_query, craft_types=(), price_buckets=(), artisans=(), sort="Newest"):
+    """Returns the IDs of the listings matching the search and filters, in display order."""
+    from search_index import get_search_index
+
+    # Ranked lookup in the shared inverted index (covers stored translations too)
+    with render_profiler.section("search"):
+        ranked_ids = get_search_index().search(search_query) if search_query.strip() else None
+    with render_profiler.section("query"):
+        return catalog.query(
+            ranked_ids=ranked_ids,
+            craft_types=craft_types,
+            price_buckets=price_buckets,
+            artisans=artisans,
+            sort=sort,
+        )
+
+
+def recommendations_for(catalog, products, k=3):
+    """Returns {product_id: up to k similar listings} for one page of results."""
+    from similar_products import get_similarity_index
+
+    # "You may also like": nearest neighbours of each listing in the shared embedding index
+    with render_profiler.section("recommendations"):
+        similar_ids = get_similarity_index().similar_many([product["product_id"] for product in products], k=k)
+        return {
+            product_id: [catalog.products[other] for other in ids if other in catalog.products]
+            for product_id, ids in similar_ids.items()
+        }
+
+
+def localized(product, field, lang, default=""):
+    """Returns a listing field in the given language.
+
+    Uses the translation stored when the artisan saved the listing; live
+    translation is only a fallback for listings that have not been pre-translated yet.
+    """
+    from google_ai_services import translate_text
+
+    text = product.get(field) or default
+    if lang == "en":
+        return text
+    stored = product.get("translations", {}).get(lang, {}).get(field)
+    return stored or translate_text(text, lang)
+
+
+def prefetch_page_translations(products, recommendations, lang):
+    """Translates every string a page of results is missing in a few batched requests.
+
+    The localized() calls made while rendering the page then hit the cache.
+    """
+    from google_ai_services import prefetch_translations
+
+    if lang == "en" or not products:
+        return
+    with render_profiler.section("translation"):
+        page_strings = []
+        for product in products:
+            # Listings with stored translations need no API call at all
+            stored = product.get("translations", {}).get(lang, {})
+            for field, default in LISTING_FIELDS:
+                if not stored.get(field):
+                    page_strings.append(product.get(field) or default)
+            for other in recommendations[product["product_id"]]:
+                if not other.get("translations", {}).get(lang, {}).get("name"):
+                    page_strings.append(other.get("name", ""))
+        prefetch_translations(page_strings, lang)
+
+
+# --- Section 2: Artisan Accounts & Products ---
+
+def hash_password(password):
+    """Hashes a password for secure storage."""
+    return hashlib.sha256(password.encode()).hexdigest()
+
+
+def log_in(username, password):
+    """Checks the artisan's password. Returns their session view model, or None if it is wrong."""
+    artisan = storage.get_artisan(username, include_products=False)
+    if artisan is None or artisan["password_hash"] != hash_password(password):
+        return None
+    return shared_records.artisan_view(username)
+
+
+def save_product(username, product):
+    """Adds a listing and schedules its background work. Returns the new product ID."""
+    from listing_translations import schedule_product_translation
+    from similar_products import schedule_index_update
+
+    product_id = storage.add_product(username, product)
+    # Translate the listing for Hindi/Gujarati shoppers in the background
+    schedule_product_translation(product_id)
+    # Add it to the "You may also like" index
+    schedule_index_update()
+    return product_id
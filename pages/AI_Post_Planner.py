@@ -1,66 +1,106 @@
 import streamlit as st
-import json
-# The function name is generate_social_media_plan
-from google_ai_services import generate_social_media_plan 
+import shared_records
+from job_queue import submit_job, get_job, latest_job
+from image_store import store_upload, thumbnail_path, ImageStoreError
+from campaign_batch import CAMPAIGN_GOALS
+import render_profiler
 
 st.set_page_config(page_title="AI Post Planner", page_icon="🗓️")
 st.title("🗓️ AI Post Planner")
 
-if not st.session_state.get('logged_in'):
-    st.warning("Please log in from the Artisan Dashboard first.")
-else:
-    artisan_context = st.session_state.profile.get('art_description')
-    if not artisan_context or not st.session_state.profile.get('name'):
-        st.error("Please complete your Artisan Profile first! The AI needs your story to create a meaningful plan.")
+with render_profiler.page_run("AI_Post_Planner", st.query_params):
+    if not st.session_state.get('logged_in'):
+        st.warning("Please log in from the Artisan Dashboard first.")
     else:
-        st.info("This tool will generate a complete 3-day social media plan to help you market your products effectively.")
+        with render_profiler.section("profile"):
+            profile = shared_records.get_artisan(st.session_state['username']) or {}
+        artisan_context = profile.get('art_description')
+        if not artisan_context or not profile.get('name'):
+            st.error("Please complete your Artisan Profile first! The AI needs your story to create a meaningful plan.")
+        else:
+            st.info("This tool will generate a complete 3-day social media plan to help you market your products effectively. To plan several products and goals at once, use the Campaign Batch page.")
+            username = st.session_state['username']
 
-        # --- Inputs for the Planner ---
-        with st.form("planner_inputs"):
-            st.subheader("1. Tell the AI about your goal")
-            # In a real app, the uploaded image would be analyzed by a vision model.
-            # For this prototype, we'll just use its name for context.
-            st.file_uploader("Upload a photo of your feature product (optional)", type=['png', 'jpg', 'jpeg'])
-            product_name = st.text_input("Product Name", help="e.g., 'Ocean Blue Silk Saree'")
-            campaign_goal = st.selectbox("What is the goal of this campaign?",
-                                         options=[
-                                             "Launch a new product",
-                                             "Share the 'behind-the-scenes' making process",
-                                             "Announce a weekend sale or special offer",
-                                             "Educate customers about my unique craft",
-                                             "Tell a story about a specific design"
-                                         ])
-            
-            submitted = st.form_submit_button("Generate Content Plan", type="primary")
+            # --- Background Generation Job ---
+            # Plans are generated by the background job queue; after a page refresh
+            # the artisan's latest plan is restored instead of being generated again.
+            with render_profiler.section("job"):
+                job_id = st.session_state.get('plan_job')
+                if job_id is None and 'content_plan' not in st.session_state:
+                    restored = latest_job(username, "social_media_plan")
+                    if restored and restored['status'] != 'error':
+                        job_id = st.session_state['plan_job'] = restored['job_id']
+                job = get_job(job_id) if job_id else None
 
-        # --- Display the Content Plan ---
-        if submitted:
-            if not product_name:
-                st.warning("Please provide a product name.")
-            else:
-                with st.spinner("Your AI strategist is building your plan... 🧠"):
-                    # Use the correct function name here as well
-                    plan = generate_social_media_plan(artisan_context, product_name, campaign_goal) 
-                    st.session_state['content_plan'] = plan
-        
-        if 'content_plan' in st.session_state:
-            plan_data = st.session_state['content_plan']
-            if "error" in plan_data:
-                st.error(f"Could not generate plan: {plan_data['error']}")
-            else:
-                st.divider()
-                st.header(plan_data.get('plan_title', "Your Content Plan"))
+            if job and job['status'] == 'done':
+                st.session_state['content_plan'] = job['result']
+            elif job and job['status'] == 'error':
+                st.session_state['content_plan'] = {"error": job['error']}
 
-                for i, post in enumerate(plan_data.get('posts', [])):
+            @st.fragment(run_every=1)
+            def show_plan_progress(job_id):
+                """Polls the running job, showing each day's post as soon as it is finished."""
+                job = get_job(job_id)
+                if job is None or job['status'] in ('done', 'error'):
+                    st.rerun() # Reruns the whole page, which shows the finished plan
+                st.info("Your AI strategist is building your plan... 🧠 You can leave this page; the plan will be waiting when you come back.")
+                for i, post in enumerate(job['partial'].get('posts', [])):
                     with st.container(border=True):
                         st.subheader(post.get('day_title', f"Post {i+1}"))
-                        
-                        cols = st.columns([1, 2])
-                        with cols[0]:
-                            st.markdown("**Suggested Image:**")
-                            st.info(post.get('suggested_image', ''))
-                        
-                        with cols[1]:
-                            st.markdown("**Generated Caption:**")
-                            # Using st.code makes it easy to copy the text
-                            st.code(post.get('caption', ''), language=None)
\ No newline at end of file
+                        st.write(post.get('caption', ''))
+
+            # --- Inputs for the Planner ---
+            with st.form("planner_inputs"):
+                st.subheader("1. Tell the AI about your goal")
+                # The photo is shown to Gemini so the captions describe the actual piece
+                product_photo = st.file_uploader("Upload a photo of your feature product (optional)", type=['png', 'jpg', 'jpeg'])
+                product_name = st.text_input("Product Name", help="e.g., 'Ocean Blue Silk Saree'")
+                campaign_goal = st.selectbox("What is the goal of this campaign?", options=CAMPAIGN_GOALS)
+
+                submitted = st.form_submit_button("Generate Content Plan", type="primary")
+
+            # --- Display the Content Plan ---
+            if submitted:
+                if not product_name:
+                    st.warning("Please provide a product name.")
+                else:
+                    with render_profiler.section("submit"):
+                        params = {"artisan_context": artisan_context, "product_name": product_name, "campaign_goal": campaign_goal}
+                        try:
+                            # Only a downscaled, EXIF-free copy is kept; the job gets its hash, not the bytes
+                            if product_photo is not None:
+                                params["image_hash"] = store_upload(product_photo)
+                        except ImageStoreError as e:
+                            st.error(str(e))
+                            st.stop()
+                        st.session_state['plan_job'] = submit_job("social_media_plan", params, owner=username)
+                    st.session_state.pop('content_plan', None)
+                    st.rerun()
+
+            if job and job['status'] in ('queued', 'running'):
+                show_plan_progress(job_id)
+
+            if 'content_plan' in st.session_state:
+                plan_data = st.session_state['content_plan']
+                if "error" in plan_data:
+                    st.error(f"Could not generate plan: {plan_data['error']}")
+                else:
+                    st.divider()
+                    st.header(plan_data.get('plan_title', "Your Content Plan"))
+                    plan_photo = job['params'].get('image_hash') if job else None
+                    if plan_photo and thumbnail_path(plan_photo):
+                        st.image(thumbnail_path(plan_photo), width=240)
+
+                    for i, post in enumerate(plan_data.get('posts', [])):
+                        with st.container(border=True):
+                            st.subheader(post.get('day_title', f"Post {i+1}"))
+
+                            cols = st.columns([1, 2])
+                            with cols[0]:
+                                st.markdown("**Suggested Image:**")
+                                st.info(post.get('suggested_image', ''))
+
+                            with cols[1]:
+                                st.markdown("**Generated Caption:**")
+                                # Using st.code makes it easy to copy the text
+                                st.code(post.get('caption', ''), language=None)
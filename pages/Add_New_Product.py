@@ -1,137 +1,182 @@
 import streamlit as st
-import json
-import uuid
-from google_ai_services import generate_product_descriptions
+import shared_records
+from page_flows import save_product
+from job_queue import submit_job, get_job, latest_job, dismiss_job
+from image_store import store_upload, ImageStoreError
+import render_profiler
 
 st.set_page_config(page_title="Add Product", page_icon="➕")
 st.title("➕ Add a New Product to Your Store")
-
-# --- Database Utility Functions ---
-def load_db():
-    try:
-        with open('database.json', 'r') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return {}
-
-def save_db(db):
-    with open('database.json', 'w') as f:
-        json.dump(db, f, indent=4)
-
-# --- Main App Logic ---
-if not st.session_state.get('logged_in'):
-    st.warning("Please log in from the Artisan Dashboard first.")
-else:
-    artisan_context = st.session_state.profile.get('art_description')
-    if not artisan_context or not st.session_state.profile.get('name'):
-        st.error("Please complete your Artisan Profile first! The AI needs your story to create meaningful descriptions.")
+with render_profiler.page_run("Add_New_Product", st.query_params):
+    # --- Main App Logic ---
+    if not st.session_state.get('logged_in'):
+        st.warning("Please log in from the Artisan Dashboard first.")
     else:
-        # Initialize session state for text areas
-        if 'current_story' not in st.session_state:
-            st.session_state.current_story = ""
-        if 'current_bullets' not in st.session_state:
-            st.session_state.current_bullets = ""
-        if 'current_social' not in st.session_state:
-            st.session_state.current_social = ""
-
-        # --- Form for Product Details & AI Generation ---
-        with st.form("product_details_form"):
-            st.subheader("1. Product Details")
-            product_name = st.text_input("Product Name")
-            price = st.number_input("Price (INR)", min_value=0.0, format="%.2f")
-            materials = st.text_input("Main Materials Used")
-            
-            submitted_generate = st.form_submit_button("Generate AI Suggestions", type="primary", help="The AI will use your profile story and product details to write descriptions.")
-            
-            if submitted_generate:
-                if product_name and materials:
-                    with st.spinner("Gemini is crafting descriptions for you..."):
-                        descriptions = generate_product_descriptions(artisan_context, product_name, materials)
-                        st.session_state['ai_descriptions'] = descriptions
-                        
-                        if "error" not in descriptions:
-                            st.session_state.current_story = descriptions.get('story_driven', '')
-                            
-                            # --- THIS IS THE FIX FOR THE TypeError ---
-                            # It converts the list of bullet points into a single string with newlines.
-                            bullet_list = descriptions.get('bullet_points', [])
-                            st.session_state.current_bullets = "\n".join(f"- {item}" for item in bullet_list)
-                            # --- END FIX ---
-                            
-                            st.session_state.current_social = descriptions.get('social_media_caption', '')
+        # Read on demand from the process-wide record cache instead of a per-session copy
+        with render_profiler.section("profile"):
+            profile = shared_records.get_artisan(st.session_state['username']) or {}
+        artisan_context = profile.get('art_description')
+        if not artisan_context or not profile.get('name'):
+            st.error("Please complete your Artisan Profile first! The AI needs your story to create meaningful descriptions.")
+        else:
+            username = st.session_state['username']
+
+            # Initialize session state for text areas
+            if 'current_story' not in st.session_state:
+                st.session_state.current_story = ""
+            if 'current_bullets' not in st.session_state:
+                st.session_state.current_bullets = ""
+            if 'current_social' not in st.session_state:
+                st.session_state.current_social = ""
+
+            def apply_descriptions(descriptions):
+                """Copies finished AI suggestions into the editable text areas."""
+                st.session_state.current_story = descriptions.get('story_driven', '')
+
+                # --- THIS IS THE FIX FOR THE TypeError ---
+                # It converts the list of bullet points into a single string with newlines.
+                bullet_list = descriptions.get('bullet_points', [])
+                st.session_state.current_bullets = "\n".join(f"- {item}" for item in bullet_list)
+                # --- END FIX ---
+
+                st.session_state.current_social = descriptions.get('social_media_caption', '')
+
+            # --- Background Generation Job ---
+            # Generation runs in the background job queue. After a page refresh the
+            # artisan's latest unfinished or unused job is picked up again.
+            with render_profiler.section("job"):
+                job_id = st.session_state.get('descriptions_job')
+                if job_id is None and 'ai_descriptions' not in st.session_state:
+                    restored = latest_job(username, "product_descriptions")
+                    if restored and restored['status'] != 'error':
+                        job_id = st.session_state['descriptions_job'] = restored['job_id']
+                job = get_job(job_id) if job_id else None
+
+            if job and job['status'] in ('done', 'error') and st.session_state.get('descriptions_job_applied') != job_id:
+                st.session_state['descriptions_job_applied'] = job_id
+                if job['status'] == 'done':
+                    st.session_state['ai_descriptions'] = job['result']
+                    apply_descriptions(job['result'])
                 else:
-                    st.warning("Please provide a Product Name and Materials.")
-
-        # --- Error Handling and Suggestion Display ---
-        if 'ai_descriptions' in st.session_state:
-            descriptions = st.session_state.ai_descriptions
-            
-            if "error" in descriptions:
-                st.error(f"**API Error:** {descriptions['error']}")
-            else:
-                st.subheader("2. AI Suggestions (Click 'Use' to apply)")
-                
-                # Callback functions to update the final text areas
-                def use_story():
-                    st.session_state.current_story = descriptions.get('story_driven', '')
-                def use_bullets():
-                    bullet_list = descriptions.get('bullet_points', [])
-                    st.session_state.current_bullets = "\n".join(f"- {item}" for item in bullet_list) # Apply fix here too
-                def use_social():
-                    st.session_state.current_social = descriptions.get('social_media_caption', '')
-
-                # UI for displaying suggestions and "Use" buttons
-                with st.container(border=True):
-                    st.markdown("**Story-Driven Suggestion:**")
-                    st.write(descriptions.get('story_driven', ''))
-                    st.button("Use this Story", on_click=use_story, key="use_story_btn")
-
-                with st.container(border=True):
-                    st.markdown("**Bulleted Features Suggestion:**")
-                    for item in descriptions.get('bullet_points', []):
-                        st.write(f"- {item}")
-                    st.button("Use these Features", on_click=use_bullets, key="use_bullets_btn")
-
-                with st.container(border=True):
-                    st.markdown("**Social Media Caption Suggestion:**")
-                    st.write(descriptions.get('social_media_caption', ''))
-                    st.button("Use this Caption", on_click=use_social, key="use_social_btn")
-
-        st.divider()
-
-        # --- Final Editable Form and Save Button ---
-        st.subheader("3. Final Descriptions (Edit here before saving)")
-        with st.form("save_product_form"):
-            st.text_area("Story-Driven Description", key="current_story", height=150)
-            st.text_area("Bulleted Features", key="current_bullets", height=150)
-            st.text_area("Social Media Caption", key="current_social", height=100)
-
-            if st.form_submit_button("Add Product to Store", type="primary"):
-                if product_name and price and st.session_state.current_story:
-                    db = load_db()
-                    username = st.session_state['username']
-                    product_id = str(uuid.uuid4())
-                    
-                    if "products" not in db[username]:
-                        db[username]["products"] = {}
-
-                    db[username]["products"][product_id] = {
-                        "name": product_name,
-                        "price": price,
-                        "materials": materials,
-                        "description_story": st.session_state.current_story,
-                        "description_bullets": st.session_state.current_bullets,
-                        "description_social": st.session_state.current_social,
-                        "craft_type": st.session_state.profile.get('craft', '')
-                    }
-                    save_db(db)
-                    st.session_state['profile'] = db[username]
-                    st.success(f"'{product_name}' has been added to your store!")
-                    
-                    keys_to_delete = ['ai_descriptions', 'current_story', 'current_bullets', 'current_social']
-                    for key in keys_to_delete:
-                        if key in st.session_state:
-                            del st.session_state[key]
-                    st.rerun()
+                    st.session_state['ai_descriptions'] = {"error": job['error']}
+
+            @st.fragment(run_every=1)
+            def show_generation_progress(job_id):
+                """Polls the running job, previewing the story as soon as it is written."""
+                job = get_job(job_id)
+                if job is None or job['status'] in ('done', 'error'):
+                    st.rerun() # Reruns the whole page, which applies the finished result
+                st.info("Gemini is crafting descriptions for you... You can leave this page; the suggestions will be waiting when you come back.")
+                story = job['partial'].get('story_driven')
+                if story:
+                    with st.container(border=True):
+                        st.markdown("**Story-Driven Suggestion:**")
+                        st.write(story)
+
+            # --- Form for Product Details & AI Generation ---
+            with st.form("product_details_form"):
+                st.subheader("1. Product Details")
+                product_name = st.text_input("Product Name")
+                price = st.number_input("Price (INR)", min_value=0.0, format="%.2f")
+                materials = st.text_input("Main Materials Used")
+
+                submitted_generate = st.form_submit_button("Generate AI Suggestions", type="primary", help="The AI will use your profile story and product details to write descriptions.")
+
+                if submitted_generate:
+                    if product_name and materials:
+                        with render_profiler.section("submit"):
+                            st.session_state['descriptions_job'] = submit_job(
+                                "product_descriptions",
+                                {"artisan_context": artisan_context, "product_name": product_name, "materials": materials},
+                                owner=username,
+                            )
+                        st.session_state.pop('ai_descriptions', None)
+                        st.session_state.pop('descriptions_job_applied', None)
+                        st.rerun()
+                    else:
+                        st.warning("Please provide a Product Name and Materials.")
+
+            if job and job['status'] in ('queued', 'running'):
+                show_generation_progress(job_id)
+
+            # --- Error Handling and Suggestion Display ---
+            if 'ai_descriptions' in st.session_state:
+                descriptions = st.session_state.ai_descriptions
+
+                if "error" in descriptions:
+                    st.error(f"**API Error:** {descriptions['error']}")
                 else:
-                    st.error("Please ensure Product Name, Price, and the Story-Driven Description are filled out.")
\ No newline at end of file
+                    st.subheader("2. AI Suggestions (Click 'Use' to apply)")
+
+                    # Callback functions to update the final text areas
+                    def use_story():
+                        st.session_state.current_story = descriptions.get('story_driven', '')
+                    def use_bullets():
+                        bullet_list = descriptions.get('bullet_points', [])
+                        st.session_state.current_bullets = "\n".join(f"- {item}" for item in bullet_list) # Apply fix here too
+                    def use_social():
+                        st.session_state.current_social = descriptions.get('social_media_caption', '')
+
+                    # UI for displaying suggestions and "Use" buttons
+                    with st.container(border=True):
+                        st.markdown("**Story-Driven Suggestion:**")
+                        st.write(descriptions.get('story_driven', ''))
+                        st.button("Use this Story", on_click=use_story, key="use_story_btn")
+
+                    with st.container(border=True):
+                        st.markdown("**Bulleted Features Suggestion:**")
+                        for item in descriptions.get('bullet_points', []):
+                            st.write(f"- {item}")
+                        st.button("Use these Features", on_click=use_bullets, key="use_bullets_btn")
+
+                    with st.container(border=True):
+                        st.markdown("**Social Media Caption Suggestion:**")
+                        st.write(descriptions.get('social_media_caption', ''))
+                        st.button("Use this Caption", on_click=use_social, key="use_social_btn")
+
+            st.divider()
+
+            # --- Final Editable Form and Save Button ---
+            st.subheader("3. Final Descriptions (Edit here before saving)")
+            with st.form("save_product_form"):
+                st.text_area("Story-Driven Description", key="current_story", height=150)
+                st.text_area("Bulleted Features", key="current_bullets", height=150)
+                st.text_area("Social Media Caption", key="current_social", height=100)
+                product_photo = st.file_uploader("Product Photo (optional)", type=["jpg", "jpeg", "png", "webp"])
+
+                if st.form_submit_button("Add Product to Store", type="primary"):
+                    if product_name and price and st.session_state.current_story:
+                        with render_profiler.section("save"):
+                            # Save a downscaled, EXIF-free copy once in the local image store
+                            image_hash = None
+                            if product_photo is not None:
+                                try:
+                                    image_hash = store_upload(product_photo)
+                                except ImageStoreError as e:
+                                    st.error(str(e))
+                                    st.stop()
+                            save_product(username, {
+                                "name": product_name,
+                                "price": price,
+                                "materials": materials,
+                                "description_story": st.session_state.current_story,
+                                "description_bullets": st.session_state.current_bullets,
+                                "description_social": st.session_state.current_social,
+                                "craft_type": profile.get('craft', ''),
+                                "image_hash": image_hash,
+                            })
+                            st.session_state['artisan_view'] = shared_records.artisan_view(username)
+                        st.success(f"'{product_name}' has been added to your store!")
+
+                        # The suggestions have been used, so don't restore them on the next visit
+                        if st.session_state.get('descriptions_job'):
+                            dismiss_job(st.session_state['descriptions_job'])
+
+                        keys_to_delete = ['ai_descriptions', 'current_story', 'current_bullets', 'current_social',
+                                          'descriptions_job', 'descriptions_job_applied']
+                        for key in keys_to_delete:
+                            if key in st.session_state:
+                                del st.session_state[key]
+                        st.rerun()
+                    else:
+                        st.error("Please ensure Product Name, Price, and the Story-Driven Description are filled out.")
@@ -0,0 +1,97 @@
+import os
+import time
+import streamlit as st
+import metrics
+import shared_records
+import render_profiler
+from google_ai_services import translation_cache, response_cache
+
+st.set_page_config(page_title="Metrics", page_icon="📊", layout="wide")
+st.title("📊 AI Service Metrics")
+
+# Comma-separated artisan usernames allowed to see this page
+ADMIN_USERNAMES = {u.strip() for u in os.getenv("ADMIN_USERNAMES", "").split(",") if u.strip()}
+
+with render_profiler.page_run("Admin_Metrics", st.query_params):
+    if not st.session_state.get('logged_in'):
+        st.warning("Please log in from the Artisan Dashboard first.")
+    elif st.session_state.get('username') not in ADMIN_USERNAMES:
+        st.error("This page is only available to administrators (set ADMIN_USERNAMES to grant access).")
+    else:
+        st.caption("Numbers cover this server process since it started. Percentiles use the most recent calls.")
+        if st.button("Refresh"):
+            st.rerun()
+
+        # --- Calls by Function & Language ---
+        st.subheader("Calls by function and language")
+        with render_profiler.section("calls"):
+            calls = metrics.call_summary()
+        if not calls:
+            st.info("No AI calls have been made yet.")
+        else:
+            total_calls = sum(row["calls"] for row in calls)
+            total_errors = sum(row["errors"] for row in calls)
+            hits = sum(row["cache_hits"] for row in calls)
+            lookups = hits + sum(row["cache_misses"] for row in calls)
+            cols = st.columns(3)
+            cols[0].metric("Calls", f"{total_calls:,.0f}")
+            cols[1].metric("Errors", f"{total_errors:,.0f}")
+            cols[2].metric("Cache hit rate", f"{hits / lookups:.0%}" if lookups else "–")
+            st.dataframe(
+                calls,
+                width="stretch",
+                column_order=["function", "language", "provider", "calls", "errors", "cache_hit_rate",
+                              "p50_ms", "p95_ms", "p99_ms", "input_chars", "output_chars",
+                              "input_tokens", "output_tokens"],
+                column_config={"cache_hit_rate": st.column_config.NumberColumn("cache hit rate", format="percent")},
+            )
+
+        # --- Upstream Requests ---
+        st.subheader("Upstream requests by provider")
+        with render_profiler.section("providers"):
+            providers = metrics.provider_summary()
+        if providers:
+            st.dataframe(providers, width="stretch")
+        else:
+            st.info("No requests have reached a provider yet.")
+
+        # --- Caches ---
+        st.subheader("Caches")
+        with render_profiler.section("caches"):
+            cache_stats = [translation_cache.stats(), response_cache.stats(), shared_records.stats()]
+        st.dataframe(cache_stats, width="stretch")
+
+        # --- Render Profiles ---
+        st.subheader("Recent page reruns")
+        with render_profiler.section("profiles"):
+            profiles = render_profiler.recent_runs()
+        if not profiles:
+            st.info("No profiled reruns yet. Open a page with ?profile=1 (or set RENDER_PROFILE=all) to record one.")
+        else:
+            st.dataframe(
+                [{"time": time.strftime("%H:%M:%S", time.localtime(profile["started_at"])),
+                  **{key: profile[key] for key in ("page", "total_ms", "ai_ms", "storage_ms")}}
+                 for profile in profiles],
+                width="stretch",
+            )
+            chosen = st.selectbox(
+                "Rerun", range(len(profiles)),
+                format_func=lambda i: f"{profiles[i]['page']} at "
+                                      f"{time.strftime('%H:%M:%S', time.localtime(profiles[i]['started_at']))}"
+                                      f" ({profiles[i]['total_ms']:.0f} ms)",
+            )
+            st.dataframe(profiles[chosen]["frames"], width="stretch")
+            st.caption("Collapsed stacks (microseconds of self time) for flamegraph.pl or speedscope.")
+            cols = st.columns(2)
+            cols[0].download_button("Download this rerun", render_profiler.collapsed_stacks([profiles[chosen]]),
+                                    file_name="rerun.folded", mime="text/plain")
+            cols[1].download_button("Download all recent reruns", render_profiler.collapsed_stacks(profiles),
+                                    file_name="reruns.folded", mime="text/plain")
+
+        # --- Prometheus Export ---
+        with render_profiler.section("prometheus"):
+            exposition = metrics.export_prometheus()
+        with st.expander("Prometheus metrics"):
+            st.caption("Set METRICS_PORT to serve these at /metrics for a Prometheus scraper.")
+            st.code(exposition, language=None)
+        st.download_button("Download metrics.txt", exposition, file_name="metrics.txt", mime="text/plain")
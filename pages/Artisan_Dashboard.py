@@ -1,119 +1,100 @@
 import streamlit as st
-import json
-import hashlib # Import the library for hashing passwords
+import storage
+import shared_records
+from page_flows import hash_password, log_in
+from listing_translations import schedule_artisan_translation
+import render_profiler
 
 st.set_page_config(page_title="Artisan Dashboard", page_icon="👤")
 
-# --- Utility Functions ---
-def load_db():
-    """Loads the user database from the JSON file."""
-    try:
-        with open('database.json', 'r') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return {}
-
-def save_db(db):
-    """Saves the user database to the JSON file."""
-    with open('database.json', 'w') as f:
-        json.dump(db, f, indent=4)
-
-def hash_password(password):
-    """Hashes a password for secure storage."""
-    return hashlib.sha256(password.encode()).hexdigest()
-
 # --- Main Page Title ---
 st.title("👤 Artisan Dashboard")
 
-# --- Initialize Session State ---
-if 'logged_in' not in st.session_state:
-    st.session_state['logged_in'] = False
-if 'username' not in st.session_state:
-    st.session_state['username'] = ""
-if 'profile' not in st.session_state:
-    st.session_state['profile'] = {}
+with render_profiler.page_run("Artisan_Dashboard", st.query_params):
+    # --- Initialize Session State ---
+    if 'logged_in' not in st.session_state:
+        st.session_state['logged_in'] = False
+    if 'username' not in st.session_state:
+        st.session_state['username'] = ""
+    # Only the username and a small view model live in the session; the full
+    # profile and product records are read on demand from the shared record cache.
+    if 'artisan_view' not in st.session_state:
+        st.session_state['artisan_view'] = {}
 
-# --- Login / Registration Logic ---
-if not st.session_state['logged_in']:
-    
-    # Let the user choose between logging in and registering
-    choice = st.radio("Choose an action:", ["Login", "Register"], horizontal=True)
+    # --- Login / Registration Logic ---
+    if not st.session_state['logged_in']:
 
-    if choice == "Login":
-        st.subheader("Login to Your Account")
-        with st.form("login_form"):
-            username = st.text_input("Username")
-            password = st.text_input("Password", type="password")
-            
-            if st.form_submit_button("Login"):
-                db = load_db()
-                if username in db and db[username]['password_hash'] == hash_password(password):
-                    st.session_state['logged_in'] = True
-                    st.session_state['username'] = username
-                    st.session_state['profile'] = db[username]
-                    st.success("Logged in successfully!")
-                    st.rerun()
-                else:
-                    st.error("Invalid username or password.")
+        # Let the user choose between logging in and registering
+        choice = st.radio("Choose an action:", ["Login", "Register"], horizontal=True)
 
-    elif choice == "Register":
-        st.subheader("Create a New Account")
-        with st.form("register_form"):
-            username = st.text_input("Choose a unique username")
-            password = st.text_input("Choose a password", type="password")
-            
-            if st.form_submit_button("Register"):
-                db = load_db()
-                if not username or not password:
-                    st.warning("Please enter both a username and a password.")
-                elif username in db:
-                    st.error("This username is already taken. Please choose another one.")
-                else:
-                    # Create the new user profile with a hashed password
-                    db[username] = {
-                        "password_hash": hash_password(password),
-                        "name": "", 
-                        "craft": "", 
-                        "art_description": "", 
-                        "products": {}
-                    }
-                    save_db(db)
-                    st.success("Registration successful! You can now log in.")
-                    st.info("Please go to the Login tab to access your new dashboard.")
+        if choice == "Login":
+            st.subheader("Login to Your Account")
+            with st.form("login_form"):
+                username = st.text_input("Username")
+                password = st.text_input("Password", type="password")
 
-else:
-    # --- This is the view for a Logged-in Artisan ---
-    st.header(f"Welcome, {st.session_state.profile.get('name', st.session_state.username)}!")
+                if st.form_submit_button("Login"):
+                    with render_profiler.section("login"):
+                        view = log_in(username, password)
+                    if view is not None:
+                        st.session_state['logged_in'] = True
+                        st.session_state['username'] = username
+                        st.session_state['artisan_view'] = view
+                        st.success("Logged in successfully!")
+                        st.rerun()
+                    else:
+                        st.error("Invalid username or password.")
 
-    # --- Profile Editor ---
-    with st.expander("Edit Your Artisan Profile & Story", expanded=True):
-        with st.form("profile_form"):
-            profile = st.session_state.get('profile', {})
-            name = st.text_input("Your Full Name or Brand Name", value=profile.get('name', ''))
-            craft = st.text_input("Name of Your Craft", value=profile.get('craft', ''))
-            art_description = st.text_area("Your Story (The AI will use this!)", height=150, value=profile.get('art_description', ''))
+        elif choice == "Register":
+            st.subheader("Create a New Account")
+            with st.form("register_form"):
+                username = st.text_input("Choose a unique username")
+                password = st.text_input("Choose a password", type="password")
 
-            if st.form_submit_button("Save Profile"):
-                db = load_db()
-                username = st.session_state['username']
-                # Update profile but keep the password hash
-                db[username].update({"name": name, "craft": craft, "art_description": art_description})
-                save_db(db)
-                st.session_state['profile'] = db[username] # Refresh the profile in session
-                st.success("Profile saved!")
-                st.rerun()
+                if st.form_submit_button("Register"):
+                    if not username or not password:
+                        st.warning("Please enter both a username and a password.")
+                    # Create the new user profile with a hashed password (atomic check-and-insert)
+                    elif not storage.create_artisan(username, hash_password(password)):
+                        st.error("This username is already taken. Please choose another one.")
+                    else:
+                        st.success("Registration successful! You can now log in.")
+                        st.info("Please go to the Login tab to access your new dashboard.")
 
-    # --- Product Management ---
-    st.subheader("Your Listed Products")
-    products = st.session_state.profile.get("products", {})
-    if not products:
-        st.info("You haven't listed any products yet. Go to the 'Add New Product' page to get started!")
     else:
-        for product_id, product_data in products.items():
-            st.markdown(f"- **{product_data['name']}** (Price: ₹{product_data['price']})")
-    
-    # --- Logout Button ---
-    if st.button("Logout"):
-        # Clear all session data to log the user out
-        st.session_state.clear() 
-        st.rerun()
\ No newline at end of file
+        # --- This is the view for a Logged-in Artisan ---
+        st.header(f"Welcome, {st.session_state.artisan_view.get('name') or st.session_state.username}!")
+        with render_profiler.section("profile"):
+            profile = shared_records.get_artisan(st.session_state['username']) or {}
+
+        # --- Profile Editor ---
+        with st.expander("Edit Your Artisan Profile & Story", expanded=True):
+            with st.form("profile_form"):
+                name = st.text_input("Your Full Name or Brand Name", value=profile.get('name', ''))
+                craft = st.text_input("Name of Your Craft", value=profile.get('craft', ''))
+                art_description = st.text_area("Your Story (The AI will use this!)", height=150, value=profile.get('art_description', ''))
+
+                if st.form_submit_button("Save Profile"):
+                    username = st.session_state['username']
+                    with render_profiler.section("save_profile"):
+                        # Update profile but keep the password hash
+                        storage.update_artisan_profile(username, name=name, craft=craft, art_description=art_description)
+                        schedule_artisan_translation(username) # Pre-translate the public name and story
+                        st.session_state['artisan_view'] = shared_records.artisan_view(username) # Refresh the view model
+                    st.success("Profile saved!")
+                    st.rerun()
+
+        # --- Product Management ---
+        st.subheader("Your Listed Products")
+        products = profile.get("products", {})
+        if not products:
+            st.info("You haven't listed any products yet. Go to the 'Add New Product' page to get started!")
+        else:
+            for product_id, product_data in products.items():
+                st.markdown(f"- **{product_data['name']}** (Price: ₹{product_data['price']})")
+
+        # --- Logout Button ---
+        if st.button("Logout"):
+            # Clear all session data to log the user out
+            st.session_state.clear() 
+            st.rerun()
@@ -1,56 +1,67 @@
 import streamlit as st
-from google_ai_services import answer_customer_query
+import shared_records
+import render_profiler
+from google_ai_services import stream_customer_query
 
 st.set_page_config(page_title="Assistant Bot", page_icon="🤖")
 st.title("🤖 Automated Assistant Bot")
-
-if not st.session_state.get('logged_in'):
-    st.warning("Please log in from the Artisan Dashboard first.")
-else:
-    st.info("Test how the AI assistant will answer customer questions about your products. It uses your profile story, product details, and the chat history for context.")
-    
-    products = st.session_state.profile.get("products", {})
-    if not products:
-        st.warning("You have no products to test. Please add a product first.")
+with render_profiler.page_run("Automated_Assistant_Bot", st.query_params):
+    if not st.session_state.get('logged_in'):
+        st.warning("Please log in from the Artisan Dashboard first.")
     else:
-        product_options = {p_id: p_data['name'] for p_id, p_data in products.items()}
-        selected_product_id = st.selectbox(
-            "Select one of your products to test:", 
-            options=list(product_options.keys()), 
-            format_func=lambda x: product_options[x],
-            key="product_select" # Add a key to track this widget
-        )
-
-        # --- NEW: Logic to clear chat history when product changes ---
-        if 'current_product_id' not in st.session_state:
-            st.session_state.current_product_id = selected_product_id
-        
-        if st.session_state.current_product_id != selected_product_id:
-            st.session_state.messages = [] # Clear previous chat
-            st.session_state.current_product_id = selected_product_id
-            st.rerun() # Refresh the page to show the cleared chat
-
-        # --- Standard Chatbot UI ---
-        if "messages" not in st.session_state:
-            st.session_state.messages = []
-        
-        for message in st.session_state.messages:
-            with st.chat_message(message["role"]):
-                st.markdown(message["content"])
-
-        if prompt := st.chat_input("Ask a follow-up question..."):
-            st.session_state.messages.append({"role": "user", "content": prompt})
-            with st.chat_message("user"):
-                st.markdown(prompt)
-
-            with st.spinner("Sahayak Bot is thinking..."):
-                artisan_context = st.session_state.profile.get('art_description', '')
+        st.info("Test how the AI assistant will answer customer questions about your products. It uses your profile story, product details, relevant passages from your other products, and the chat history for context.")
+
+        # Shared, read-only record; the session only keeps the chat and the selected product ID
+        with render_profiler.section("profile"):
+            profile = shared_records.get_artisan(st.session_state['username']) or {}
+        products = profile.get("products", {})
+        if not products:
+            st.warning("You have no products to test. Please add a product first.")
+        else:
+            product_options = {p_id: p_data['name'] for p_id, p_data in products.items()}
+            selected_product_id = st.selectbox(
+                "Select one of your products to test:", 
+                options=list(product_options.keys()), 
+                format_func=lambda x: product_options[x],
+                key="product_select" # Add a key to track this widget
+            )
+
+            # --- NEW: Logic to clear chat history when product changes ---
+            if 'current_product_id' not in st.session_state:
+                st.session_state.current_product_id = selected_product_id
+
+            if st.session_state.current_product_id != selected_product_id:
+                st.session_state.messages = [] # Clear previous chat
+                st.session_state.current_product_id = selected_product_id
+                st.rerun() # Refresh the page to show the cleared chat
+
+            # --- Standard Chatbot UI ---
+            if "messages" not in st.session_state:
+                st.session_state.messages = []
+
+            for message in st.session_state.messages:
+                with st.chat_message(message["role"]):
+                    st.markdown(message["content"])
+
+            if prompt := st.chat_input("Ask a follow-up question..."):
+                st.session_state.messages.append({"role": "user", "content": prompt})
+                with st.chat_message("user"):
+                    st.markdown(prompt)
+
+                artisan_context = profile.get('art_description', '')
                 product_details = products[selected_product_id]
-                
+
                 # --- THIS IS THE KEY CHANGE ---
-                # Send the entire chat history, not just the last prompt
-                response = answer_customer_query(artisan_context, product_details, st.session_state.messages)
-                
-                with st.chat_message("assistant"):
-                    st.markdown(response)
-                st.session_state.messages.append({"role": "assistant", "content": response})
\ No newline at end of file
+                # Send the chat history, not just the last prompt (the service bounds it
+                # to a token budget: recent turns verbatim, older ones summarized).
+                # The answer is streamed so it renders as soon as the first tokens arrive;
+                # write_stream returns the full text once the stream is finished.
+                with render_profiler.section("answer"), st.chat_message("assistant"):
+                    response = st.write_stream(
+                        stream_customer_query(
+                            artisan_context, product_details, st.session_state.messages,
+                            # Lets the bot look up relevant passages from the rest of the catalog
+                            username=st.session_state['username'], product_id=selected_product_id,
+                        )
+                    )
+                st.session_state.messages.append({"role": "assistant", "content": response})
@@ -0,0 +1,84 @@
+import streamlit as st
+import shared_records
+from job_queue import submit_job, get_job, latest_job
+from bulk_import import parse_import_file, BulkImportError, DEFAULT_PARALLELISM
+import render_profiler
+
+st.set_page_config(page_title="Bulk Import", page_icon="📦")
+st.title("📦 Bulk Import Products")
+
+with render_profiler.page_run("Bulk_Import", st.query_params):
+    if not st.session_state.get('logged_in'):
+        st.warning("Please log in from the Artisan Dashboard first.")
+    else:
+        username = st.session_state['username']
+        view = st.session_state.get('artisan_view', {})
+        if not view.get('has_story') or not view.get('name'):
+            st.error("Please complete your Artisan Profile first! The AI needs your story to write descriptions.")
+        else:
+            st.info(
+                "Upload a CSV or JSONL file with the columns **name**, **price** and **materials** "
+                "(optionally craft_type, description_story, description_bullets, description_social). "
+                "The AI writes descriptions for every product that doesn't have a story yet. "
+                "If the import is interrupted, upload the same file again to continue where it stopped."
+            )
+
+            # --- Background Import Job ---
+            # The import runs in the background job queue, so it keeps going if the
+            # artisan leaves this page; after a page refresh the latest import is restored.
+            with render_profiler.section("job"):
+                job_id = st.session_state.get('import_job')
+                if job_id is None:
+                    restored = latest_job(username, "bulk_import")
+                    if restored:
+                        job_id = st.session_state['import_job'] = restored['job_id']
+                job = get_job(job_id) if job_id else None
+
+            @st.fragment(run_every=1)
+            def show_import_progress(job_id):
+                """Polls the running import and updates its progress bar."""
+                job = get_job(job_id)
+                if job is None or job['status'] in ('done', 'error'):
+                    st.rerun() # Reruns the whole page, which shows the summary
+                total = job['partial'].get('total') or len(job['params']['rows'])
+                finished = job['partial'].get('finished', 0)
+                st.progress(finished / total if total else 0.0, text=f"{finished} of {total} products ready")
+
+            with st.form("bulk_import_form"):
+                uploaded = st.file_uploader("Product file", type=['csv', 'jsonl', 'json'])
+                parallelism = st.slider("Products to generate at the same time", 1, 16, DEFAULT_PARALLELISM)
+                submitted = st.form_submit_button("Import Products", type="primary")
+
+            if submitted:
+                if uploaded is None:
+                    st.warning("Please choose a file to import.")
+                else:
+                    try:
+                        with render_profiler.section("parse"):
+                            rows = parse_import_file(uploaded.getvalue(), uploaded.name)
+                    except BulkImportError as e:
+                        st.error(f"Could not read the file: {e}")
+                    else:
+                        # A finished import is run again, which retries its failed rows
+                        params = {"username": username, "rows": rows, "parallelism": parallelism}
+                        with render_profiler.section("submit"):
+                            st.session_state['import_job'] = submit_job("bulk_import", params, owner=username, reuse_result=False)
+                        st.rerun()
+
+            # --- Results ---
+            if job and job['status'] in ('queued', 'running'):
+                show_import_progress(job_id)
+            elif job and job['status'] == 'error':
+                st.error(job['error'])
+            elif job and job['status'] == 'done':
+                summary = job['result']
+                if st.session_state.get('import_job_applied') != job_id:
+                    st.session_state['import_job_applied'] = job_id
+                    with render_profiler.section("profile"):
+                        st.session_state['artisan_view'] = shared_records.artisan_view(username)
+                st.success(f"Imported {summary['inserted']} of {summary['total']} products into your store!")
+                # Row indexes come back from the jobs table as JSON object keys (strings)
+                for index, error in sorted(summary['failures'].items(), key=lambda item: int(item[0])):
+                    st.error(f"Row {int(index) + 1} could not be generated: {error}")
+                if summary['failures']:
+                    st.info("Upload the same file again to retry the failed rows.")
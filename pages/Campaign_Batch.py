@@ -0,0 +1,108 @@
+import json
+import streamlit as st
+import shared_records
+from job_queue import submit_job, get_job, latest_job
+from campaign_batch import CAMPAIGN_GOALS, DEFAULT_PARALLELISM, MAX_DAYS, campaign_cells, export_csv
+import render_profiler
+
+st.set_page_config(page_title="Campaign Batch", page_icon="📣")
+st.title("📣 Campaign Batch Planner")
+
+
+def show_plan(entry):
+    """Shows one finished plan of the batch (or why it failed) in an expander."""
+    with st.expander(f"{entry['product_name']} · {entry['campaign_goal']}"):
+        if "error" in entry:
+            st.error(f"Could not generate this plan: {entry['error']}")
+            return
+        plan = entry['plan']
+        st.markdown(f"**{plan.get('plan_title', 'Content Plan')}**")
+        for i, post in enumerate(plan.get('posts', [])):
+            st.markdown(f"**{post.get('day_title', f'Post {i+1}')}**")
+            st.caption(f"Suggested image: {post.get('suggested_image', '')}")
+            st.code(post.get('caption', ''), language=None)
+
+
+with render_profiler.page_run("Campaign_Batch", st.query_params):
+    if not st.session_state.get('logged_in'):
+        st.warning("Please log in from the Artisan Dashboard first.")
+    else:
+        username = st.session_state['username']
+        with render_profiler.section("profile"):
+            profile = shared_records.get_artisan(username) or {}
+        artisan_context = profile.get('art_description')
+        products = profile.get('products', {})
+        if not artisan_context or not profile.get('name'):
+            st.error("Please complete your Artisan Profile first! The AI needs your story to create meaningful plans.")
+        elif not products:
+            st.warning("You have no products to plan for. Please add a product first.")
+        else:
+            st.info(
+                "Plan a whole season at once: pick products and campaign goals, and the AI writes a plan for "
+                "every combination. Plans appear here as they finish, and you can leave this page while they are written."
+            )
+
+            # --- Background Batch Job ---
+            # The whole matrix is one job; after a page refresh the latest batch is restored
+            with render_profiler.section("job"):
+                job_id = st.session_state.get('campaign_job')
+                if job_id is None:
+                    restored = latest_job(username, "campaign_batch")
+                    if restored:
+                        job_id = st.session_state['campaign_job'] = restored['job_id']
+                job = get_job(job_id) if job_id else None
+
+            @st.fragment(run_every=1)
+            def show_batch_progress(job_id):
+                """Polls the running batch, showing each plan as soon as it is finished."""
+                job = get_job(job_id)
+                if job is None or job['status'] in ('done', 'error'):
+                    st.rerun() # Reruns the whole page, which shows the finished batch
+                plans = job['partial'].get('plans', [])
+                total = job['partial'].get('total') or len(job['params']['cells'])
+                st.progress(len(plans) / total if total else 0.0, text=f"{len(plans)} of {total} plans ready")
+                for entry in plans:
+                    show_plan(entry)
+
+            # --- Inputs for the Batch ---
+            with st.form("campaign_batch_form"):
+                product_ids = st.multiselect(
+                    "Products", options=list(products), default=list(products),
+                    format_func=lambda product_id: products[product_id]['name'],
+                )
+                goals = st.multiselect("Campaign goals", CAMPAIGN_GOALS, default=CAMPAIGN_GOALS[:1])
+                days = st.number_input("Days per plan", min_value=1, max_value=MAX_DAYS, value=3, step=1)
+                parallelism = st.slider("Plans to generate at the same time", 1, 8, DEFAULT_PARALLELISM)
+                submitted = st.form_submit_button("Generate Campaign Plans", type="primary")
+
+            if submitted:
+                cells = campaign_cells({product_id: products[product_id] for product_id in product_ids}, goals)
+                if not cells:
+                    st.warning("Please choose at least one product and one goal.")
+                else:
+                    # A finished batch is run again, which retries its failed plans
+                    # (plans that were already written come from the response cache)
+                    with render_profiler.section("submit"):
+                        params = {"artisan_context": artisan_context, "cells": cells, "days": int(days), "parallelism": parallelism}
+                        st.session_state['campaign_job'] = submit_job("campaign_batch", params, owner=username, reuse_result=False)
+                    st.rerun()
+
+            # --- Results ---
+            if job and job['status'] in ('queued', 'running'):
+                show_batch_progress(job_id)
+            elif job and job['status'] == 'error':
+                st.error(f"Could not generate the campaign: {job['error']}")
+            elif job and job['status'] == 'done':
+                plans = job['result']['plans']
+                ready = sum(1 for entry in plans if 'plan' in entry)
+                st.success(f"{ready} of {len(plans)} plans ready ({job['result']['days']} days each).")
+                cols = st.columns(2)
+                with render_profiler.section("export"):
+                    csv_text = export_csv(plans)
+                cols[0].download_button("Download CSV", csv_text, file_name="campaign_plans.csv", mime="text/csv")
+                cols[1].download_button(
+                    "Download JSON", json.dumps(job['result'], ensure_ascii=False, indent=2),
+                    file_name="campaign_plans.json", mime="application/json",
+                )
+                for entry in plans:
+                    show_plan(entry)
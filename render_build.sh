@@ -3,4 +3,8 @@
 set -o errexit
 
 # Install dependencies from requirements.txt
-pip install -r requirements.txt
\ No newline at end of file
+pip install -r requirements.txt
+
+# Translate any new static UI strings into the shipped i18n catalog.
+# Needs Translate credentials; if they are missing the committed catalog is used as-is.
+python build_i18n_catalog.py || echo "Skipping i18n catalog build; using the committed i18n_catalog.json"
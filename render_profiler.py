@@ -0,0 +1,224 @@
+import os
+import re
+import time
+import functools
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+# --- Opt-in profiler for page reruns ---
+# Streamlit reruns the whole page script on every interaction. When profiling
+# is on for a rerun, the page's named sections, and the AI service and storage
+# calls made inside them, are timed as a tree of frames. Repeated calls with
+# the same name under the same parent are merged, so twelve cache lookups show
+# up as one frame called 12 times. Finished reruns go into a ring buffer shown
+# on the admin metrics page, and can be exported as collapsed stacks for
+# flamegraph.pl or speedscope.
+#
+# Settings:
+#   RENDER_PROFILE          off | query (default: reruns opened with ?profile=1) | all
+#   RENDER_PROFILE_HISTORY  number of recent reruns kept (default 50)
+#   RENDER_PROFILE_DIR      if set, every profiled rerun is also written there as a .folded file
+#
+# With profiling off, span() and traced() cost one thread-local lookup.
+
+PROFILE_MODE = os.getenv("RENDER_PROFILE", "query")
+HISTORY = int(os.getenv("RENDER_PROFILE_HISTORY", "50"))
+PROFILE_DIR = os.getenv("RENDER_PROFILE_DIR")
+
+# Frame kinds counted as AI and storage time in a rerun's summary
+AI = "ai"
+STORAGE = "storage"
+SECTION = "section"
+
+
+class Frame:
+    """Inclusive time and call count of one named step under one parent."""
+
+    __slots__ = ("name", "kind", "seconds", "calls", "children")
+
+    def __init__(self, name, kind):
+        self.name = name
+        self.kind = kind
+        self.seconds = 0.0
+        self.calls = 0
+        self.children = {}
+
+    def child(self, name, kind):
+        frame = self.children.get(name)
+        if frame is None:
+            frame = self.children[name] = Frame(name, kind)
+        return frame
+
+    def self_seconds(self):
+        return max(0.0, self.seconds - sum(c.seconds for c in self.children.values()))
+
+
+class _Run:
+    def __init__(self, page):
+        self.page = page
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.root = Frame(page, "page")
+        self.stack = [self.root]
+
+
+_local = threading.local()
+_history = deque(maxlen=HISTORY)
+_history_lock = threading.Lock()
+
+
+# --- Section 1: Recording ---
+
+def wanted(query_params=None):
+    """True if this rerun should be profiled (RENDER_PROFILE, or ?profile=1 in query mode)."""
+    if PROFILE_MODE == "all":
+        return True
+    if PROFILE_MODE == "query" and query_params is not None:
+        return query_params.get("profile") == "1"
+    return False
+
+
+def start_run(page, enabled=True):
+    """Starts profiling a page rerun in this thread (pages use page_run, which also finishes it)."""
+    _local.run = _Run(page) if enabled else None
+
+
+def finish_run():
+    """Ends the current rerun's profile, stores it in the ring buffer and returns it (or None)."""
+    run = getattr(_local, "run", None)
+    if run is None:
+        return None
+    _local.run = None
+    run.root.seconds = time.perf_counter() - run.start
+    run.root.calls = 1
+    profile = _summarize(run)
+    with _history_lock:
+        _history.append(profile)
+    if PROFILE_DIR:
+        _write_folded(profile)
+    return profile
+
+
+@contextmanager
+def page_run(page, query_params=None):
+    """Profiles the page script run inside the block, if wanted(query_params).
+
+    st.rerun() and st.stop() end a script by raising, so the run is finished in
+    a finally block and never stays open on the thread; a rerun cut short that
+    way is recorded up to where it stopped.
+    """
+    start_run(page, enabled=wanted(query_params))
+    try:
+        yield
+    finally:
+        finish_run()
+
+
+@contextmanager
+def span(name, kind=SECTION):
+    """Times a block as a frame under the innermost open one; does nothing when not profiling."""
+    run = getattr(_local, "run", None)
+    if run is None:
+        yield
+        return
+    frame = run.stack[-1].child(name, kind)
+    run.stack.append(frame)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        frame.seconds += time.perf_counter() - start
+        frame.calls += 1
+        # Also closes any inner frame left open by an abandoned generator
+        if frame in run.stack:
+            del run.stack[run.stack.index(frame):]
+
+
+def section(name):
+    """A named section of a page script."""
+    return span(name, SECTION)
+
+
+def traced(kind, prefix=None):
+    """Decorator that records every call of a function as a frame named '<prefix>.<function>'."""
+    def decorator(fn):
+        name = f"{prefix or kind}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if getattr(_local, "run", None) is None:
+                return fn(*args, **kwargs)
+            with span(name, kind):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# --- Section 2: Summaries & Export ---
+
+def _walk(frame, path=()):
+    path = path + (frame.name,)
+    yield path, frame
+    for child in frame.children.values():
+        yield from _walk(child, path)
+
+
+def _outermost_seconds(frame, kind):
+    """Time spent in frames of one kind, not counting such frames nested in each other."""
+    if frame.kind == kind:
+        return frame.seconds
+    return sum(_outermost_seconds(child, kind) for child in frame.children.values())
+
+
+def _summarize(run):
+    rows, folded = [], []
+    for path, frame in _walk(run.root):
+        rows.append({
+            "frame": " > ".join(path[1:]) or run.page,
+            "kind": frame.kind,
+            "calls": frame.calls,
+            "total_ms": round(frame.seconds * 1000, 2),
+            "self_ms": round(frame.self_seconds() * 1000, 2),
+        })
+        self_us = int(frame.self_seconds() * 1_000_000)
+        if self_us:
+            folded.append(f"{';'.join(p.replace(';', ',').replace(' ', '_') for p in path)} {self_us}")
+    return {
+        "page": run.page,
+        "started_at": run.started_at,
+        "total_ms": round(run.root.seconds * 1000, 2),
+        "ai_ms": round(_outermost_seconds(run.root, AI) * 1000, 2),
+        "storage_ms": round(_outermost_seconds(run.root, STORAGE) * 1000, 2),
+        "frames": rows,
+        "folded": "\n".join(folded),
+    }
+
+
+def recent_runs():
+    """Returns the profiles of recent reruns, newest first."""
+    with _history_lock:
+        return list(reversed(_history))
+
+
+def collapsed_stacks(profiles):
+    """Merges profiles into one collapsed-stack text (one 'a;b;c microseconds' line per stack)."""
+    totals = {}
+    for profile in profiles:
+        for line in profile["folded"].splitlines():
+            stack, _, value = line.rpartition(" ")
+            totals[stack] = totals.get(stack, 0) + int(value)
+    return "".join(f"{stack} {value}\n" for stack, value in sorted(totals.items()))
+
+
+def _write_folded(profile):
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(profile["started_at"]))
+        millis = int(profile["started_at"] * 1000) % 1000
+        page = re.sub(r"[^A-Za-z0-9_-]", "_", profile["page"])
+        path = os.path.join(PROFILE_DIR, f"{page}-{stamp}-{millis:03d}-{threading.get_ident()}.folded")
+        with open(path, "w") as f:
+            f.write(collapsed_stacks([profile]))
+    except OSError as e:
+        print(f"Render Profile Error: {e}")
@@ -0,0 +1,158 @@
+import math
+import bisect
+import threading
+import unicodedata
+from collections import defaultdict
+
+import storage
+import metrics
+
+# --- Inverted search index for the marketplace ---
+# Maps each token to the products containing it, so a query only looks at the
+# postings for its own tokens instead of scanning every listing.
+
+# How much a match in each field counts towards a product's relevance
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "craft_type": 2.0,
+    "materials": 2.0,
+    "description_story": 1.0,
+    "description_bullets": 1.0,
+}
+
+# Prefix matches count for less than an exact token match
+PREFIX_MATCH_FACTOR = 0.6
+
+
+def tokenize(text):
+    """Splits text into lowercase tokens.
+
+    Letters, combining marks and digits are kept together, so Devanagari and
+    Gujarati words (whose vowel signs are combining marks) stay whole.
+    """
+    tokens, current = [], []
+    for char in str(text or "").lower():
+        if unicodedata.category(char)[0] in ("L", "M", "N"):
+            current.append(char)
+        elif current:
+            tokens.append("".join(current))
+            current = []
+    if current:
+        tokens.append("".join(current))
+    return tokens
+
+
+def _product_fields(product):
+    """Yields (field, text) pairs to index, including stored translations of each field."""
+    for field in FIELD_WEIGHTS:
+        yield field, product.get(field, "")
+    # Stored Hindi/Gujarati text, if the listing has any: {lang: {field: text}}
+    for fields in (product.get("translations") or {}).values():
+        for field, text in fields.items():
+            if field in FIELD_WEIGHTS:
+                yield field, text
+
+
+class SearchIndex:
+    """A tokenized inverted index with prefix matching and weighted relevance ranking."""
+
+    def __init__(self):
+        self._postings = defaultdict(dict)  # token -> {product_id: weight}
+        self._doc_tokens = {}               # product_id -> set of tokens (for re-indexing)
+        self._sorted_tokens = []
+        self._sorted_dirty = False
+        self._lock = threading.RLock()
+        self.seq = None  # Storage change counter this index is current with
+
+    # --- Updates ---
+
+    def add_product(self, product_id, product):
+        """Indexes (or re-indexes) a single product."""
+        weights = defaultdict(float)
+        for field, text in _product_fields(product):
+            for token in tokenize(text):
+                weights[token] += FIELD_WEIGHTS[field]
+        with self._lock:
+            self.remove_product(product_id)
+            for token, weight in weights.items():
+                if token not in self._postings:
+                    self._sorted_dirty = True
+                self._postings[token][product_id] = weight
+            self._doc_tokens[product_id] = set(weights)
+
+    def remove_product(self, product_id):
+        """Drops a product's postings from the index."""
+        with self._lock:
+            for token in self._doc_tokens.pop(product_id, ()):
+                postings = self._postings.get(token)
+                if postings is None:
+                    continue
+                postings.pop(product_id, None)
+                if not postings:
+                    del self._postings[token]
+                    self._sorted_dirty = True
+
+    def refresh(self):
+        """Pulls only the products written since the last refresh from the storage layer."""
+        with metrics.timed_lock(self._lock, "search_index"):
+            seq = storage.current_seq()
+            if seq == self.seq:
+                return 0
+            changed = storage.list_catalog(since_seq=self.seq)
+            for product in changed:
+                self.add_product(product["product_id"], product)
+            self.seq = seq
+            return len(changed)
+
+    # --- Queries ---
+
+    def _tokens_with_prefix(self, prefix):
+        if self._sorted_dirty:
+            self._sorted_tokens = sorted(self._postings)
+            self._sorted_dirty = False
+        start = bisect.bisect_left(self._sorted_tokens, prefix)
+        for token in self._sorted_tokens[start:]:
+            if not token.startswith(prefix):
+                break
+            yield token
+
+    def search(self, query, limit=None):
+        """Returns product IDs matching every query token, best match first.
+
+        The last token is treated as a prefix so results appear while typing.
+        """
+        query_tokens = tokenize(query)
+        if not query_tokens:
+            return []
+        with self._lock:
+            doc_count = max(len(self._doc_tokens), 1)
+            scores = None
+            for position, query_token in enumerate(query_tokens):
+                is_last = position == len(query_tokens) - 1
+                candidates = self._tokens_with_prefix(query_token) if is_last else [query_token]
+                token_scores = defaultdict(float)
+                for token in candidates:
+                    postings = self._postings.get(token, {})
+                    idf = math.log(1 + doc_count / (1 + len(postings)))
+                    factor = 1.0 if token == query_token else PREFIX_MATCH_FACTOR
+                    for product_id, weight in postings.items():
+                        token_scores[product_id] = max(token_scores[product_id], weight * idf * factor)
+                # Every query token must match (AND semantics)
+                if scores is None:
+                    scores = dict(token_scores)
+                else:
+                    scores = {pid: score + token_scores[pid] for pid, score in scores.items() if pid in token_scores}
+                if not scores:
+                    return []
+        ranked = sorted(scores, key=lambda pid: (-scores[pid], pid))
+        return ranked[:limit] if limit else ranked
+
+
+# --- Process-wide Index ---
+_index = SearchIndex()
+
+
+def get_search_index():
+    """Returns the shared index, brought up to date with any new storage writes."""
+    _index.refresh()
+    return _index
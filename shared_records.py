@@ -0,0 +1,114 @@
+import os
+import threading
+from collections import OrderedDict
+
+import storage
+import metrics
+
+# --- Process-wide cache of artisan records ---
+# Pages keep only the logged-in username (plus a small view model) in session
+# state and read the artisan's profile and products from here on demand, so a
+# thousand sessions of the same artisan share one copy instead of each holding
+# their own. Entries are invalidated with the storage change counter: on every
+# read, only artisans written since the last check are evicted.
+#
+# Returned records are shared between sessions: treat them as read-only.
+
+MAX_ARTISANS = int(os.getenv("SHARED_RECORDS_MAX_ARTISANS", "512"))
+
+
+class SharedRecords:
+    """Read-mostly LRU of {username: artisan record with products}, kept in sync with storage."""
+
+    def __init__(self, max_artisans=MAX_ARTISANS):
+        self.max_artisans = max_artisans
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.seq = None
+        self.hits = 0
+        self.misses = 0
+
+    def _sync(self):
+        """Evicts the artisans changed since the last check; returns the change counter seen."""
+        seq = storage.current_seq()
+        with metrics.timed_lock(self._lock, "shared_records"):
+            if seq != self.seq:
+                if self.seq is None:
+                    self._entries.clear()
+                else:
+                    for username in storage.changed_artisans(self.seq):
+                        self._entries.pop(username, None)
+                self.seq = seq
+            return self.seq
+
+    def get(self, username):
+        """Returns the artisan's record (profile, products and version), or None if unknown."""
+        if not username:
+            return None
+        seq = self._sync()
+        with metrics.timed_lock(self._lock, "shared_records"):
+            record = self._entries.get(username)
+            if record is not None:
+                self._entries.move_to_end(username)
+                self.hits += 1
+                return record
+            self.misses += 1
+
+        # Read outside the lock so a slow load never blocks other artisans' sessions
+        artisan = storage.get_artisan(username)
+        if artisan is None:
+            return None
+        artisan.pop("password_hash", None)
+        artisan["username"] = username
+        artisan["version"] = seq
+        with metrics.timed_lock(self._lock, "shared_records"):
+            # If another reader already applied newer writes, this copy may predate
+            # them and could never be evicted, so it is returned but not kept.
+            if self.seq == seq:
+                self._entries[username] = artisan
+                while len(self._entries) > self.max_artisans:
+                    self._entries.popitem(last=False)
+        return artisan
+
+    def stats(self):
+        """Returns hit/miss counters and the number of cached artisans."""
+        with metrics.timed_lock(self._lock, "shared_records"):
+            return {
+                "namespace": "shared_records",
+                "memory_hits": self.hits,
+                "misses": self.misses,
+                "memory_entries": len(self._entries),
+                "max_entries": self.max_artisans,
+            }
+
+
+# --- Process-wide Instance ---
+_records = SharedRecords()
+
+
+def get_artisan(username):
+    """Returns the shared (read-only) record of an artisan, including their products."""
+    return _records.get(username)
+
+
+def get_products(username):
+    """Returns the artisan's {product_id: product} from the shared record."""
+    artisan = _records.get(username)
+    return artisan["products"] if artisan else {}
+
+
+def artisan_view(username):
+    """Returns the small view model a session keeps for the logged-in artisan."""
+    artisan = _records.get(username) or {}
+    return {
+        "username": username,
+        "name": artisan.get("name", ""),
+        "craft": artisan.get("craft", ""),
+        "has_story": bool(artisan.get("art_description")),
+        "product_count": len(artisan.get("products", {})),
+    }
+
+
+def stats():
+    """Returns the shared record cache's counters (shown on the metrics page)."""
+    return _records.stats()
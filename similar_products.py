@@ -0,0 +1,346 @@
+import os
+import json
+import uuid
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads of one process are serialized
+    fcntl = None
+
+import numpy as np
+
+import storage
+import metrics
+from fake_providers import use_fakes
+from search_index import tokenize, FIELD_WEIGHTS
+
+# --- "You may also like" recommendations ---
+# Every listing is embedded once into a unit-length vector. The vectors live in
+# one float32 matrix on disk that is memory-mapped, so opening the index is
+# instant and all worker processes share the same pages instead of each holding
+# a copy. The similar products for a whole page of listings come from a single
+# matrix product.
+
+INDEX_DIR = os.getenv("SIMILARITY_INDEX_DIR", ".similarity_index")
+# "gemini", "hashing", or "auto" (Gemini when GOOGLE_API_KEY is set and the live backend is used)
+EMBEDDER = os.getenv("EMBEDDER", "auto")
+GEMINI_EMBEDDING_MODEL = os.getenv("GEMINI_EMBEDDING_MODEL", "models/text-embedding-004")
+HASHING_DIMENSIONS = int(os.getenv("HASHING_EMBEDDING_DIMENSIONS", "1024"))
+EMBED_BATCH_SIZE = 100  # Gemini's batch limit for embed_content
+
+INITIAL_CAPACITY = 256
+
+
+def embedding_text(product):
+    """The listing text that is embedded (English source fields only)."""
+    return "\n".join(str(product.get(field) or "") for field in FIELD_WEIGHTS)
+
+
+# --- Section 1: Embedders ---
+
+class HashingEmbedder:
+    """Local embedder: weighted bag of words hashed into a fixed number of dimensions.
+
+    Needs no API calls and is deterministic, so every process computes the same vectors.
+    """
+
+    name = "hashing"
+
+    def __init__(self, dimensions=HASHING_DIMENSIONS):
+        self.dimensions = dimensions
+
+    def _bucket(self, token):
+        digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        return value % self.dimensions, 1.0 if value >> 63 else -1.0
+
+    def embed(self, products):
+        vectors = np.zeros((len(products), self.dimensions), dtype=np.float32)
+        for row, product in enumerate(products):
+            counts = {}
+            for field, weight in FIELD_WEIGHTS.items():
+                for token in tokenize(product.get(field, "")):
+                    counts[token] = counts.get(token, 0.0) + weight
+            for token, count in counts.items():
+                bucket, sign = self._bucket(token)
+                vectors[row, bucket] += sign * (1.0 + np.log(count))
+        return vectors
+
+
+class GeminiEmbedder:
+    """Semantic embeddings from the Gemini embedding model."""
+
+    name = "gemini"
+
+    @metrics.instrument("gemini")
+    def embed(self, products):
+        from google_ai_services import get_gemini_model
+        from ai_executor import run_ai_call
+
+        if get_gemini_model() is None:  # Also configures the SDK's API key
+            raise RuntimeError("Google AI model not configured.")
+        if use_fakes():
+            from fake_providers import fake_embed_content as embed_content
+        else:
+            from google.generativeai import embed_content
+
+        texts = [embedding_text(product) for product in products]
+        vectors = []
+        for start in range(0, len(texts), EMBED_BATCH_SIZE):
+            response = run_ai_call(
+                "gemini", embed_content,
+                model=GEMINI_EMBEDDING_MODEL,
+                content=texts[start:start + EMBED_BATCH_SIZE],
+                task_type="SEMANTIC_SIMILARITY",
+            )
+            vectors.extend(response["embedding"])
+        return np.asarray(vectors, dtype=np.float32)
+
+
+def get_embedder():
+    """Returns the configured embedder (see the EMBEDDER setting)."""
+    choice = EMBEDDER
+    if choice == "auto":
+        choice = "gemini" if os.getenv("GOOGLE_API_KEY") and not use_fakes() else "hashing"
+    return GeminiEmbedder() if choice == "gemini" else HashingEmbedder()
+
+
+# --- Section 2: Memory-Mapped Vector Index ---
+
+class _Snapshot:
+    """One published version of the index. Readers keep using the snapshot they
+    picked up, so a refresh never blocks them."""
+
+    def __init__(self, ids=(), text_hashes=(), matrix=None, seq=None, version=None, vectors_file=None):
+        self.ids = list(ids)                  # row -> product_id, or None for a superseded row
+        self.text_hashes = list(text_hashes)
+        self.rows = {product_id: row for row, product_id in enumerate(self.ids) if product_id is not None}
+        self.live = np.fromiter((product_id is not None for product_id in self.ids), dtype=bool, count=len(self.ids))
+        self.matrix = matrix
+        self.seq = seq
+        self.version = version
+        self.vectors_file = vectors_file
+
+    def stored_hash(self, product_id):
+        row = self.rows.get(product_id)
+        return self.text_hashes[row] if row is not None else None
+
+
+class SimilarityIndex:
+    """Unit vectors for every listing in a memory-mapped matrix, one row per product.
+
+    index.json holds the row order, a hash of each row's text (so unchanged
+    listings are never re-embedded) and the storage change counter it is current with.
+    Refreshes append new vectors after the rows index.json lists and then
+    replace index.json, so readers only ever see complete rows.
+    """
+
+    def __init__(self, directory=INDEX_DIR, embedder=None):
+        self.embedder = embedder or get_embedder()
+        self.directory = os.path.join(directory, self.embedder.name)
+        self.meta_path = os.path.join(self.directory, "index.json")
+        self.lock_path = os.path.join(self.directory, "write.lock")
+        self._state = _Snapshot()
+        self._refresh_lock = threading.Lock()  # One refresh at a time in this process
+        self._write_lock = threading.Lock()
+
+    @property
+    def seq(self):
+        return self._state.seq
+
+    # --- Loading ---
+
+    def reload(self):
+        """Picks up a newer index written by another process (or thread), if there is one."""
+        for _ in range(3):
+            try:
+                stat = os.stat(self.meta_path)
+                version = (stat.st_mtime_ns, stat.st_ino)
+                if version == self._state.version:
+                    return
+                with open(self.meta_path, "r") as f:
+                    meta = json.load(f)
+                vectors_file = meta.get("vectors", "vectors.npy")
+                matrix = np.load(os.path.join(self.directory, vectors_file), mmap_mode="r")
+            except FileNotFoundError:
+                # No index yet, or a writer replaced the matrix between the two reads
+                continue
+            self._state = _Snapshot(meta["ids"], meta["text_hashes"], matrix, meta["seq"], version, vectors_file)
+            return
+
+    @contextmanager
+    def _writer(self):
+        """Serializes index writers across threads and processes without touching the database."""
+        with self._write_lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.lock_path, "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write_rows(self, state, changed, vectors):
+        """Writes the changed listings' vectors; returns (ids, text_hashes, vectors_file).
+
+        Vectors go into spare rows past the end of the published ones, which no
+        reader looks at until the new index.json is published. Edited listings
+        get a new row and their old row is marked superseded. When the matrix is
+        full, the live rows are copied into a new file with twice the room.
+        """
+        ids, text_hashes = list(state.ids), list(state.text_hashes)
+        for product in changed:
+            old_row = state.rows.get(product["product_id"])
+            if old_row is not None:
+                ids[old_row] = text_hashes[old_row] = None
+        new_vectors = np.stack([_normalize(np.asarray(vectors[p["product_id"]], dtype=np.float32)) for p in changed])
+
+        matrix, vectors_file = state.matrix, state.vectors_file
+        fits = matrix is not None and matrix.shape[1] == new_vectors.shape[1] and len(ids) + len(changed) <= matrix.shape[0]
+        if fits:
+            writable = np.load(os.path.join(self.directory, vectors_file), mmap_mode="r+")
+            writable[len(ids):len(ids) + len(changed)] = new_vectors
+        else:
+            keep = [row for row, product_id in enumerate(ids) if product_id is not None]
+            needed = len(keep) + len(changed)
+            vectors_file = f"vectors-{uuid.uuid4().hex}.npy"
+            writable = np.lib.format.open_memmap(
+                os.path.join(self.directory, vectors_file), mode="w+", dtype=np.float32,
+                shape=(max(INITIAL_CAPACITY, needed * 2), new_vectors.shape[1]),
+            )
+            if keep:
+                writable[:len(keep)] = matrix[keep]
+            writable[len(keep):needed] = new_vectors
+            ids, text_hashes = [ids[row] for row in keep], [text_hashes[row] for row in keep]
+        writable.flush()
+        del writable
+        ids += [p["product_id"] for p in changed]
+        text_hashes += [self._text_hash(p) for p in changed]
+        return ids, text_hashes, vectors_file
+
+    def _publish(self, ids, text_hashes, seq, vectors_file):
+        """Atomically replaces index.json, then removes a matrix file it no longer uses."""
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".json")
+        with os.fdopen(fd, "w") as f:
+            json.dump({"ids": ids, "text_hashes": text_hashes, "seq": seq, "vectors": vectors_file}, f)
+        os.replace(temp_path, self.meta_path)
+        previous = self._state.vectors_file
+        if previous and previous != vectors_file:
+            # Open memory maps keep working after the unlink (readers retry on a missing file)
+            try:
+                os.remove(os.path.join(self.directory, previous))
+            except OSError:
+                pass
+
+    # --- Updates ---
+
+    def refresh(self):
+        """Embeds the listings added or edited since the last refresh and writes them to disk."""
+        with self._refresh_lock:
+            self.reload()
+            state = self._state
+            seq = storage.current_seq()
+            if seq == state.seq:
+                return 0
+            changed = [
+                product for product in storage.list_catalog(since_seq=state.seq)
+                if self._text_hash(product) != state.stored_hash(product["product_id"])
+            ]
+            # Embedding (possibly API calls) happens with no lock held; pages keep
+            # reading the current snapshot meanwhile
+            vectors = dict(zip((p["product_id"] for p in changed), self.embedder.embed(changed))) if changed else {}
+
+            with self._writer():
+                self.reload()  # Another process may have written these rows meanwhile
+                state = self._state
+                changed = [p for p in changed if self._text_hash(p) != state.stored_hash(p["product_id"])]
+                ids, text_hashes, vectors_file = state.ids, state.text_hashes, state.vectors_file
+                if changed:
+                    ids, text_hashes, vectors_file = self._write_rows(state, changed, vectors)
+                if vectors_file is not None:
+                    self._publish(ids, text_hashes, max(seq, state.seq or 0), vectors_file)
+                    self.reload()
+            return len(changed)
+
+    def _text_hash(self, product):
+        return hashlib.sha1(embedding_text(product).encode("utf-8")).hexdigest()
+
+    # --- Queries ---
+
+    def similar(self, product_id, k=4):
+        """Returns up to k product IDs most similar to the given one, most similar first."""
+        return self.similar_many([product_id], k)[product_id]
+
+    def similar_many(self, product_ids, k=4):
+        """Returns {product_id: up to k most similar product IDs} for a whole page of listings.
+
+        All listings are scored in one matrix product instead of one per listing.
+        """
+        state = self._state
+        result = {product_id: [] for product_id in product_ids}
+        queries = [(product_id, state.rows[product_id]) for product_id in product_ids if product_id in state.rows]
+        k = min(k, int(state.live.sum()) - 1)
+        if not queries or state.matrix is None or k <= 0:
+            return result
+        matrix = state.matrix[:len(state.ids)]
+        query_rows = np.array([row for _, row in queries])
+        scores = matrix[query_rows] @ matrix.T
+        scores[:, ~state.live] = -np.inf
+        scores[np.arange(len(queries)), query_rows] = -np.inf
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        for i, (product_id, _) in enumerate(queries):
+            order = top[i][np.argsort(-scores[i, top[i]])]
+            result[product_id] = [state.ids[j] for j in order if scores[i, j] > 0]
+        return result
+
+
+def _normalize(vector):
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+# --- Process-wide Index ---
+_index = None
+_index_lock = threading.Lock()
+_background = ThreadPoolExecutor(max_workers=1, thread_name_prefix="similarity-index")
+_pending = None
+
+
+def _run_refresh():
+    try:
+        get_similarity_index(refresh=False).refresh()
+    except Exception as e:
+        print(f"Similarity Index Error: {e}")
+
+
+def schedule_index_update():
+    """Embeds new or edited listings in the background (call after saving a product)."""
+    global _pending
+    with _index_lock:
+        if _pending is None or _pending.done():
+            _pending = _background.submit(_run_refresh)
+        return _pending
+
+
+def get_similarity_index(refresh=True):
+    """Returns the shared index, re-opened if another process updated it.
+
+    Listings the index has not caught up with yet are embedded in the
+    background, so a page render never waits on embedding calls.
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = SimilarityIndex()
+    _index.reload()
+    if refresh and _index.seq != storage.current_seq():
+        schedule_index_update()
+    return _index
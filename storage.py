@@ -0,0 +1,381 @@
+import os
+import json
+import uuid
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import metrics
+import render_profiler
+
+# --- Shared storage engine for every page ---
+# Artisans and products live in a SQLite database instead of one big JSON file,
+# so a write only touches the rows that changed and concurrent saves from two
+# sessions are serialized by SQLite's own locking instead of overwriting each other.
+# Public reads and writes show up as storage frames in render profiles.
+
+DB_PATH = os.getenv("KALAKRITI_DB", "marketplace.db")
+LEGACY_JSON_PATH = os.getenv("KALAKRITI_LEGACY_JSON", "database.json")
+
+# Product fields stored in their own columns (for indexed reads); everything
+# else in a product record is kept in the JSON "data" column.
+PRODUCT_COLUMNS = ("name", "price", "craft_type")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS artisans (
+    username        TEXT PRIMARY KEY,
+    password_hash   TEXT NOT NULL,
+    name            TEXT NOT NULL DEFAULT '',
+    craft           TEXT NOT NULL DEFAULT '',
+    art_description TEXT NOT NULL DEFAULT '',
+    translations    TEXT NOT NULL DEFAULT '{}',
+    seq             INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS products (
+    product_id  TEXT PRIMARY KEY,
+    username    TEXT NOT NULL REFERENCES artisans(username),
+    name        TEXT NOT NULL,
+    price       REAL NOT NULL DEFAULT 0,
+    craft_type  TEXT NOT NULL DEFAULT '',
+    data        TEXT NOT NULL DEFAULT '{}',
+    seq         INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_products_username ON products(username);
+CREATE INDEX IF NOT EXISTS idx_products_seq ON products(seq);
+CREATE INDEX IF NOT EXISTS idx_artisans_seq ON artisans(seq);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('seq', 0);
+"""
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized = set()
+
+
+# --- Section 1: Connections & Transactions ---
+
+def get_connection():
+    """Returns this thread's connection, creating the schema (and migrating) on first use."""
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "path", None) != DB_PATH:
+        conn = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        _local.conn, _local.path = conn, DB_PATH
+        with _init_lock:
+            if DB_PATH not in _initialized:
+                conn.executescript(SCHEMA)
+                _add_missing_columns(conn)
+                _maybe_migrate_legacy_json(conn)
+                _initialized.add(DB_PATH)
+    return conn
+
+
+@contextmanager
+def transaction():
+    """Runs the block in one atomic write transaction and yields the connection."""
+    conn = get_connection()
+    if conn.in_transaction:
+        # Nested use joins the outer transaction
+        yield conn
+        return
+    # Time spent here is waiting for the database write lock (held by another thread or process)
+    start = time.perf_counter()
+    with render_profiler.span("storage.write_lock", render_profiler.STORAGE):
+        conn.execute("BEGIN IMMEDIATE")
+    metrics.observe("kalakriti_lock_wait_seconds", time.perf_counter() - start, lock="sqlite_write")
+    try:
+        yield conn
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def _add_missing_columns(conn):
+    """Upgrades databases created before a column was added to the schema."""
+    artisan_columns = {row["name"] for row in conn.execute("PRAGMA table_info(artisans)")}
+    if "translations" not in artisan_columns:
+        conn.execute("ALTER TABLE artisans ADD COLUMN translations TEXT NOT NULL DEFAULT '{}'")
+
+
+def _next_seq(conn):
+    """Bumps and returns the global change counter (used for incremental readers)."""
+    conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'seq'")
+    return conn.execute("SELECT value FROM meta WHERE key = 'seq'").fetchone()[0]
+
+
+@render_profiler.traced(render_profiler.STORAGE)
+def current_seq():
+    """Returns the change counter; it increases on every artisan or product write."""
+    return get_connection().execute("SELECT value FROM meta WHERE key = 'seq'").fetchone()[0]
+
+
+# --- Section 2: Row Conversion ---
+
+def _artisan_from_row(row):
+    return {
+        "password_hash": row["password_hash"],
+        "name": row["name"],
+        "craft": row["craft"],
+        "art_description": row["art_description"],
+    }
+
+
+def _product_from_row(row):
+    product = json.loads(row["data"])
+    product.update({column: row[column] for column in PRODUCT_COLUMNS})
+    return product
+
+
+def _split_product(product):
+    """Splits a product dict into its indexed columns and the JSON remainder."""
+    columns = {
+        "name": product.get("name", ""),
+        "price": float(product.get("price") or 0),
+        "craft_type": product.get("craft_type", ""),
+    }
+    extra = {k: v for k, v in product.items() if k not in PRODUCT_COLUMNS and k not in ("product_id", "username")}
+    return columns, json.dumps(extra)
+
+
+# --- Section 3: Artisans ---
+
+@render_profiler.traced(render_profiler.STORAGE)
+def get_artisan(username, include_products=True):
+    """Returns an artisan record in the legacy layout, or None if it does not exist."""
+    conn = get_connection()
+    row = conn.execute("SELECT * FROM artisans WHERE username = ?", (username,)).fetchone()
+    if row is None:
+        return None
+    artisan = _artisan_from_row(row)
+    if include_products:
+        artisan["products"] = get_products_for_artisan(username)
+    return artisan
+
+
+@render_profiler.traced(render_profiler.STORAGE)
+def create_artisan(username, password_hash):
+    """Registers a new artisan. Returns False if the username is already taken."""
+    with transaction() as conn:
+        exists = conn.execute("SELECT 1 FROM artisans WHERE username = ?", (username,)).fetchone()
+        if exists:
+            return False
+        conn.execute(
+            "INSERT INTO artisans (username, password_hash, seq) VALUES (?, ?, ?)",
+            (username, password_hash, _next_seq(conn)),
+        )
+    return True
+
+
+@render_profiler.traced(render_profiler.STORAGE)
+def update_artisan_profile(username, **fields):
+    """Updates the given profile fields (name, craft, art_description) of one artisan."""
+    allowed = {k: v for k, v in fields.items() if k in ("name", "craft", "art_description")}
+    if not allowed:
+        return
+    assignments = ", ".join(f"{column} = ?" for column in allowed)
+    with transaction() as conn:
+        conn.execute(
+            f"UPDATE artisans SET {assignments}, seq = ? WHERE username = ?",
+            (*allowed.values(), _next_seq(conn), username),
+        )
+
+
+@render_profiler.traced(render_profiler.STORAGE)
+def get_artisan_translations(username):
+    """Returns the stored {lang: {field: text}} translations of an artisan's profile."""
+    row = get_connection().execute("SELECT translations FROM artisans WHERE username = ?", (username,)).fetchone()
+    return json.loads(row["translations"]) if row else {}
+
+
+@render_profiler.traced(render_profiler.STORAGE)
+def update_artisan_translations(username, translations):
+    """Stores pre-translated profile fields ({lang: {field: text}}) for an artisan."""
+    with transaction() as conn:
+        conn.execute(
+            "UPDATE artisans SET translations = ?, seq = ? WHERE username = ?",
+            (json.dumps(translations), _next_seq(conn), username),
+        )
+
+
+@render_profiler.traced(render_profiler.STORAGE)
+def changed_artisans(since_seq):
+    """Returns the usernames whose profile or products were written after since_seq."""
+    rows = get_connection().execute(
+        "SELECT username FROM artisans WHERE seq > ? UNION SELECT username FROM products WHERE seq > ?",
+        (since_seq, since_seq),
+    ).fetchall()
+    return {row["username"] for row in rows}
+
+
+@render_profiler.traced(render_profiler.STORAGE)
+def list_artisans():
+    """Returns {username: artisan record without products} for every artisan."""
+    rows = get_connection().execute("SELECT * FROM artisans ORDER BY username").fetchall()
+    return {row["username"]: _artisan_from_row(row) for row in rows}
+
+
+# --- Section 4: Products ---
+
+@render_profiler.traced(render_profiler.STORAGE)
+def get_products_for_artisan(username):
+    """Returns {product_id: product} for one artisan, using the username index."""
+    rows = get_connection().execute(
+        "SELECT * FROM products WHERE username = ? ORDER BY rowid", (username,)
+    ).fetchall()
+    return {row["product_id"]: _product_from_row(row) for row in rows}
+
+
+@render_profiler.traced(render_profiler.STORAGE)
+def get_product(product_id):
+    """Returns a single product (with its product_id and username), or None."""
+    row = get_connection().execute("SELECT * FROM products WHERE product_id = ?", (product_id,)).fetchone()
+    if row is None:
+        return None
+    product = _product_from_row(row)
+    product.update({"product_id": row["product_id"], "username": row["username"]})
+    return product
+
+
+@render_profiler.traced(render_profiler.STORAGE)
+def add_product(username, product, product_id=None):
+    """Inserts a product for an artisan and returns its product_id."""
+    product_id = product_id or str(uuid.uuid4())
+    columns, data = _split_product(product)
+    with transaction() as conn:
+        conn.execute(
+            "INSERT INTO products (product_id, username, name, price, craft_type, data, seq)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (product_id, username, columns["name"], columns["price"], columns["craft_type"], data, _next_seq(conn)),
+        )
+    return product_id
+
+
+@render_profiler.traced(render_profiler.STORAGE)
+def add_products(username, products):
+    """Inserts many {product_id: product} entries for an artisan in a single transaction.
+
+    Product IDs that already exist are skipped, so re-running an interrupted
+    bulk import never creates duplicates.
+    """
+    inserted = 0
+    with transaction() as conn:
+        for product_id, product in products.items():
+            columns, data = _split_product(product)
+            inserted += conn.execute(
+                "INSERT OR IGNORE INTO products (product_id, username, name, price, craft_type, data, seq)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (product_id, username, columns["name"], columns["price"], columns["craft_type"], data, _next_seq(conn)),
+            ).rowcount
+    return inserted
+
+
+@render_profiler.traced(render_profiler.STORAGE)
+def update_product(product_id, **fields):
+    """Merges the given fields into an existing product record."""
+    with transaction() as conn:
+        row = conn.execute("SELECT * FROM products WHERE product_id = ?", (product_id,)).fetchone()
+        if row is None:
+            return False
+        product = _product_from_row(row)
+        product.update(fields)
+        columns, data = _split_product(product)
+        conn.execute(
+            "UPDATE products SET name = ?, price = ?, craft_type = ?, data = ?, seq = ? WHERE product_id = ?",
+            (columns["name"], columns["price"], columns["craft_type"], data, _next_seq(conn), product_id),
+        )
+    return True
+
+
+@render_profiler.traced(render_profiler.STORAGE)
+def list_catalog(since_seq=None):
+    """Returns every product joined with its artisan's name and story, for the storefront.
+
+    With since_seq, only products written (or whose artisan was edited) after that
+    change counter are returned, which lets derived indexes refresh incrementally.
+    """
+    query = (
+        "SELECT p.*, a.name AS artisan_display_name, a.art_description AS artisan_story_text,"
+        " a.translations AS artisan_translations"
+        " FROM products p JOIN artisans a ON a.username = p.username"
+    )
+    params = ()
+    if since_seq is not None:
+        query += " WHERE p.seq > ? OR a.seq > ?"
+        params = (since_seq, since_seq)
+    rows = get_connection().execute(query + " ORDER BY p.rowid", params).fetchall()
+    catalog = []
+    for row in rows:
+        product = _product_from_row(row)
+        product.update({
+            "product_id": row["product_id"],
+            "username": row["username"],
+            "artisan_name": row["artisan_display_name"] or row["username"],
+            "artisan_story": row["artisan_story_text"] or "No story provided.",
+        })
+        # Merge the artisan's stored translations into the product's, per language
+        for lang, fields in json.loads(row["artisan_translations"]).items():
+            product.setdefault("translations", {}).setdefault(lang, {}).update(fields)
+        catalog.append(product)
+    return catalog
+
+
+# --- Section 5: One-shot Migration from database.json ---
+
+def migrate_from_json(json_path=LEGACY_JSON_PATH, conn=None):
+    """Imports the legacy database.json layout. Existing rows are left untouched."""
+    try:
+        with open(json_path, "r") as f:
+            legacy = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return 0
+
+    conn = conn or get_connection()
+    imported = 0
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for username, data in legacy.items():
+            conn.execute(
+                "INSERT OR IGNORE INTO artisans (username, password_hash, name, craft, art_description, seq)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    username,
+                    data.get("password_hash", ""),
+                    data.get("name", ""),
+                    data.get("craft", ""),
+                    data.get("art_description", ""),
+                    _next_seq(conn),
+                ),
+            )
+            for product_id, product in data.get("products", {}).items():
+                columns, extra = _split_product(product)
+                conn.execute(
+                    "INSERT OR IGNORE INTO products (product_id, username, name, price, craft_type, data, seq)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (product_id, username, columns["name"], columns["price"], columns["craft_type"], extra, _next_seq(conn)),
+                )
+                imported += 1
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return imported
+
+
+def _maybe_migrate_legacy_json(conn):
+    """Runs the migrator automatically the first time an empty database is opened."""
+    has_artisans = conn.execute("SELECT 1 FROM artisans LIMIT 1").fetchone()
+    if not has_artisans and os.path.exists(LEGACY_JSON_PATH):
+        count = migrate_from_json(LEGACY_JSON_PATH, conn)
+        print(f"Migrated {count} products from {LEGACY_JSON_PATH} into {DB_PATH}.")
+
+
+if __name__ == "__main__":
+    get_connection()  # Creates the schema and migrates database.json if needed
+    print(f"{DB_PATH}: {len(list_artisans())} artisans, {len(list_catalog())} products.")